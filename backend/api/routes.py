@@ -1,13 +1,16 @@
 """API route definitions"""
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from api.websocket import manager
-from services.openai_client import OpenAIResponsesClient
-from services.agent_manager import AgentManager
-from services.facilitator import Facilitator
-from services.discussion_engine import DiscussionEngine
+from services.client_registry import ClientRegistry
 from services.context_retriever import ContextRetriever
+from services.metrics import metrics
+from services.session_registry import (
+    AdmissionError, DiscussionJob, FINISHED_STATUS_VALUES, SessionRegistry, SessionStatus,
+)
+from services.tracing import InMemorySpanExporter
 from config import settings
 import logging
 import asyncio
@@ -16,6 +19,9 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Events after which a discussion sends nothing more
+TERMINAL_EVENT_TYPES = ("discussion_completed", "discussion_cancelled", "error")
+
 
 class StartDiscussionRequest(BaseModel):
     """Start discussion request"""
@@ -28,22 +34,185 @@ class ContextRetrievalRequest(BaseModel):
     keywords: List[str] = []
 
 
-@router.post("/api/discussions/start")
-async def start_discussion_endpoint(request: StartDiscussionRequest):
-    """Start discussion endpoint (HTTP-based)"""
+@router.post("/api/discussions/start", status_code=202)
+async def start_discussion_endpoint(request: StartDiscussionRequest, http_request: Request):
+    """Start discussion endpoint (HTTP-based)
+
+    The discussion runs in the background; attach to /ws/discussion/{discussion_id}
+    for its messages or poll GET /api/discussions/{discussion_id}.
+    """
+    sessions: SessionRegistry = http_request.app.state.session_registry
     try:
-        # TODO: Implementation
-        return {"message": "Starting discussion", "topic": request.topic}
+        job = await sessions.start(request.topic)
+    except AdmissionError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(int(e.retry_after))})
     except Exception as e:
         logger.error(f"Discussion start error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    return {
+        "discussion_id": job.id,
+        "status": job.status.value,
+        "websocket_url": f"/ws/discussion/{job.id}",
+    }
+
+
+@router.get("/api/discussions")
+async def list_discussions(request: Request):
+    """Sessions of all workers and this worker's admission control state"""
+    sessions: SessionRegistry = request.app.state.session_registry
+    return {
+        "discussions": await sessions.list_sessions(),
+        "worker_id": sessions.worker_id,
+        "stats": sessions.get_stats(),
+    }
+
+
+@router.get("/api/discussions/{discussion_id}")
+async def get_discussion(discussion_id: str, request: Request):
+    """Current state of a discussion (for polling)"""
+    sessions: SessionRegistry = request.app.state.session_registry
+    snapshot = await sessions.describe(discussion_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Discussion not found")
+    return snapshot
+
+
+@router.get("/api/discussions/{discussion_id}/events")
+async def get_discussion_events(discussion_id: str, request: Request, after_seq: int = 0, limit: int = 500):
+    """Events after after_seq (for clients that poll instead of holding a WebSocket)"""
+    sessions: SessionRegistry = request.app.state.session_registry
+    snapshot = await sessions.describe(discussion_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Discussion not found")
+    return {
+        "discussion_id": discussion_id,
+        "first_available_seq": await sessions.first_available_seq(discussion_id),
+        "last_seq": snapshot["last_seq"],
+        "events": await sessions.read_events(discussion_id, after_seq=after_seq, limit=limit),
+    }
+
+
+@router.post("/api/discussions/{discussion_id}/resume", status_code=202)
+async def resume_discussion(discussion_id: str, request: Request):
+    """Continue a failed or interrupted discussion from its last checkpoint"""
+    sessions: SessionRegistry = request.app.state.session_registry
+    try:
+        job = await sessions.resume(discussion_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {
+        "discussion_id": job.id,
+        "status": job.status.value,
+        "websocket_url": f"/ws/discussion/{job.id}",
+    }
+
+
+@router.post("/api/discussions/{discussion_id}/cancel")
+async def cancel_discussion(discussion_id: str, request: Request):
+    """Stop a queued or running discussion"""
+    sessions: SessionRegistry = request.app.state.session_registry
+    snapshot = await sessions.describe(discussion_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Discussion not found")
+    if not await sessions.request_cancel(discussion_id):
+        raise HTTPException(status_code=409, detail=f"Discussion already {snapshot['status']}")
+    return {"discussion_id": discussion_id, "status": "cancelling"}
+
+
+async def _receive_until_disconnect(websocket: WebSocket, discussion_id: str, sessions: SessionRegistry):
+    """Read client messages until the client goes away (cancel_discussion stops the run)"""
+    try:
+        while True:
+            data = await websocket.receive_json()
+            if data.get("type") == "cancel_discussion":
+                await sessions.request_cancel(discussion_id)
+    except WebSocketDisconnect:
+        pass
+
+
+async def _send_missed(websocket: WebSocket, cursor: int, to_seq: int) -> int:
+    """Report the events after the one with seq cursor up to to_seq as gone"""
+    if to_seq > cursor:
+        await websocket.send_json({
+            "type": "events_missed",
+            "data": {"from_seq": cursor + 1, "to_seq": to_seq},
+        })
+    return max(cursor, to_seq)
+
+
+async def _send_event(websocket: WebSocket, event: dict, cursor: int) -> int:
+    """Send an event after the one with seq cursor, reporting any events in between that are gone"""
+    await _send_missed(websocket, cursor, event["seq"] - 1)
+    await websocket.send_json(event)
+    return event["seq"]
+
+
+async def _attach(websocket: WebSocket, job: DiscussionJob, sessions: SessionRegistry, last_seq: int = 0):
+    """Replay the events after last_seq to an accepted WebSocket, then follow the discussion until it ends
+
+    Disconnecting only detaches the client; the discussion keeps running.
+    """
+    # A cursor past the end of the log comes from a run lost before this one resumed from its
+    # checkpoint (events after the checkpoint were never saved): send the resumed run from its start
+    cursor = last_seq if last_seq <= job.log.last_seq else job.log.start_seq
+    # Subscribing right after the last replayed event (no await in between) cannot miss or repeat one
+    while cursor < job.log.last_seq:
+        last_seq = job.log.last_seq
+        events = await sessions.read_events(job.id, after_seq=cursor)
+        if not events:
+            # What is left was lost with an earlier run (e.g. events before the checkpoint this run
+            # resumed from after a restart); reading again would find nothing and never yield
+            cursor = await _send_missed(websocket, cursor, last_seq)
+            continue
+        for event in events:
+            cursor = await _send_event(websocket, event, cursor)
+    subscriber = manager.subscribe(websocket, job.id)
+
+    receiver = asyncio.create_task(_receive_until_disconnect(websocket, job.id, sessions))
+    finished = asyncio.create_task(job.finished.wait())
+    try:
+        await asyncio.wait({receiver, finished}, return_when=asyncio.FIRST_COMPLETED)
+        if finished.done():
+            # Deliver the final events still queued for this client before closing
+            await subscriber.drain(timeout=settings.websocket_drain_timeout_seconds)
+    finally:
+        receiver.cancel()
+        finished.cancel()
+        manager.disconnect(websocket, job.id)
+
+
+async def _relay(websocket: WebSocket, discussion_id: str, sessions: SessionRegistry, last_seq: int, finished: bool):
+    """Send the events of a discussion run by another worker from the event bus"""
+    cursor = last_seq
+    if finished:
+        for event in await sessions.read_events(discussion_id, after_seq=cursor):
+            cursor = await _send_event(websocket, event, cursor)
+        return
+    async for event in sessions.event_bus.follow(discussion_id, after_seq=cursor):
+        cursor = await _send_event(websocket, event, cursor)
+        if event["type"] in TERMINAL_EVENT_TYPES:
+            return
+
+
+async def _attach_remote(websocket: WebSocket, discussion_id: str, sessions: SessionRegistry, last_seq: int, finished: bool):
+    """Like _attach, for a discussion run by another worker (it may also be taken over while followed)"""
+    receiver = asyncio.create_task(_receive_until_disconnect(websocket, discussion_id, sessions))
+    relay = asyncio.create_task(_relay(websocket, discussion_id, sessions, last_seq, finished))
+    try:
+        await asyncio.wait({receiver, relay}, return_when=asyncio.FIRST_COMPLETED)
+        if relay.done():
+            relay.result()
+    finally:
+        receiver.cancel()
+        relay.cancel()
+
 
 @router.websocket("/ws/discussion")
 async def websocket_discussion_endpoint(websocket: WebSocket):
-    """WebSocket endpoint - Real-time discussion communication"""
-    discussion_id = None
-
+    """WebSocket endpoint - Start a discussion and follow it in real time"""
     try:
         await websocket.accept()
         logger.info("WebSocket connection accepted")
@@ -68,31 +237,18 @@ async def websocket_discussion_endpoint(websocket: WebSocket):
             await websocket.close()
             return
 
-        # Initialize OpenAI client
-        openai_client = OpenAIResponsesClient(api_key=settings.openai_api_key)
-        agent_manager = AgentManager(openai_client)
-        facilitator = Facilitator(openai_client, agent_manager)
-
-        # Message sending callback
-        async def send_message(message: dict):
-            try:
-                await websocket.send_json(message)
-            except Exception as e:
-                logger.error(f"WebSocket message send error: {e}")
-
-        # Initialize DiscussionEngine
-        discussion_engine = DiscussionEngine(
-            facilitator=facilitator,
-            agent_manager=agent_manager,
-            message_callback=send_message,
-        )
-
-        # Start discussion
-        logger.info(f"Starting discussion: {topic}")
-        session = await discussion_engine.start_discussion(topic)
-        discussion_id = session.id
+        # The discussion runs as a background job, so it survives this connection
+        sessions: SessionRegistry = websocket.app.state.session_registry
+        try:
+            job = await sessions.start(topic)
+        except AdmissionError as e:
+            await websocket.send_json({
+                "type": "error",
+                "data": {"message": str(e), "retry_after": e.retry_after}
+            })
+            return
 
-        logger.info(f"Discussion completed: {discussion_id}")
+        await _attach(websocket, job, sessions)
 
     except WebSocketDisconnect:
         logger.info("WebSocket disconnected")
@@ -112,17 +268,55 @@ async def websocket_discussion_endpoint(websocket: WebSocket):
             pass
 
 
+@router.websocket("/ws/discussion/{discussion_id}")
+async def websocket_attach_endpoint(websocket: WebSocket, discussion_id: str, last_seq: int = 0):
+    """WebSocket endpoint - Attach to a running (or finished) discussion
+
+    A reconnecting client passes the seq of the last event it received as
+    `last_seq` and only gets the events after it. Any worker can serve the
+    attach, whichever worker runs the discussion.
+    """
+    try:
+        await websocket.accept()
+
+        sessions: SessionRegistry = websocket.app.state.session_registry
+        job = sessions.get(discussion_id)
+        if job is not None:
+            await _attach(websocket, job, sessions, last_seq=last_seq)
+            return
+
+        snapshot = await sessions.describe(discussion_id)
+        if snapshot is None:
+            await websocket.send_json({
+                "type": "error",
+                "data": {"message": "Discussion not found"}
+            })
+            return
+
+        finished = snapshot["status"] in FINISHED_STATUS_VALUES
+        await _attach_remote(websocket, discussion_id, sessions, last_seq, finished)
+
+    except WebSocketDisconnect:
+        logger.info(f"WebSocket detached: {discussion_id}")
+    except Exception as e:
+        logger.error(f"WebSocket error: {e}")
+    finally:
+        try:
+            await websocket.close()
+        except:
+            pass
+
+
 @router.post("/api/context/retrieve")
 async def retrieve_context_endpoint(request: ContextRetrievalRequest):
     """
     Context retrieval endpoint (for testing)
 
-    Retrieves background knowledge related to discussion topics from Notion/Slack/Atlassian.
-    Currently returns mock data.
+    Retrieves background knowledge related to discussion topics from Notion/Slack/Atlassian
+    (or mock data, depending on CONTEXT_RETRIEVAL_SOURCE).
     """
     try:
-        # Initialize ContextRetriever (mock mode)
-        retriever = ContextRetriever(use_mock=True)
+        retriever = ContextRetriever.from_settings()
 
         # Automatically extract keywords if not specified
         keywords = request.keywords
@@ -183,6 +377,55 @@ async def get_context_sources():
     }
 
 
+@router.get("/api/metrics/llm-pool")
+async def get_llm_pool_metrics(request: Request):
+    """
+    Shared OpenAI connection pool metrics (for sizing the pool)
+    """
+    registry: ClientRegistry = request.app.state.client_registry
+    return registry.get_metrics()
+
+
+@router.get("/api/metrics/llm-cache")
+async def get_llm_cache_metrics(request: Request):
+    """
+    LLM response cache hit/miss counters
+    """
+    registry: ClientRegistry = request.app.state.client_registry
+    return registry.get_cache_stats()
+
+
+@router.get("/api/traces")
+async def get_recent_spans(request: Request, session_id: Optional[str] = None, limit: int = 200):
+    """
+    Most recent spans (available with the in-memory span exporter)
+    """
+    exporter = request.app.state.span_exporter
+    if not isinstance(exporter, InMemorySpanExporter):
+        raise HTTPException(status_code=404, detail="In-memory span exporter is not enabled")
+    return {"spans": [span.to_dict() for span in exporter.get_spans(session_id=session_id, limit=limit)]}
+
+
+@router.get("/metrics")
+async def prometheus_metrics(request: Request):
+    """
+    Prometheus metrics (latency histograms and LLM client gauges)
+    """
+    registry: ClientRegistry = request.app.state.client_registry
+    pool = registry.get_metrics()
+    metrics.gauge("websocket_subscribers", "WebSocket clients following a discussion").set(manager.subscriber_count())
+    metrics.gauge("llm_in_flight_requests", "LLM requests currently in flight").set(pool["in_flight_requests"])
+    if pool["rate_limiter"]:
+        queued = metrics.gauge("llm_queued_requests", "LLM requests waiting for a rate limiter slot", ("priority",))
+        for priority, count in pool["rate_limiter"]["queued"].items():
+            queued.set(count, priority=priority)
+    sessions: SessionRegistry = request.app.state.session_registry
+    session_gauge = metrics.gauge("discussion_sessions", "Discussion sessions by status", ("status",))
+    for status in SessionStatus:
+        session_gauge.set(sessions.count(status), status=status.value)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @router.get("/api/health")
 async def health_check():
     """Health check"""
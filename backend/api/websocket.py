@@ -1,55 +1,171 @@
 """WebSocket connection management"""
-from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict, Set
+from fastapi import WebSocket
+from typing import Dict, Optional
+import asyncio
 import json
 import logging
+from config import settings
+from services.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+EVENTS_DROPPED = metrics.counter(
+    "websocket_events_dropped_total",
+    "Events discarded because a subscriber's send queue was full",
+)
+SLOW_CONSUMER_DISCONNECTS = metrics.counter(
+    "websocket_slow_consumer_disconnects_total",
+    "Subscribers disconnected because their send queue was full",
+)
+
+# Close code asking the client to reconnect later (it resumes from its last seq)
+TRY_AGAIN_LATER = 1013
+
+
+class Subscriber:
+    """One connection following a discussion, with its own bounded send queue and writer task
+
+    The engine only ever enqueues, so a slow client delays nobody but itself.
+    When the queue is full the subscriber either drops its oldest queued event
+    ("drop") or is disconnected ("disconnect") and resumes from its last seq.
+    """
+
+    def __init__(self, websocket: WebSocket, discussion_id: str, max_queue: int, policy: str):
+        self.websocket = websocket
+        self.discussion_id = discussion_id
+        self.policy = policy
+        self.queue: asyncio.Queue[Optional[str]] = asyncio.Queue(maxsize=max(1, max_queue))
+        self.dropped = 0
+        self.closed = False
+        self.writer = asyncio.get_running_loop().create_task(self._write())
+        # Closes the socket of a slow consumer (kept here: the loop only holds weak references to tasks)
+        self.closer: Optional[asyncio.Task] = None
+
+    def offer(self, text: str):
+        """Enqueue a serialized event without waiting"""
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(text)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        if self.policy == "drop":
+            self.queue.get_nowait()
+            self.queue.put_nowait(text)
+            self.dropped += 1
+            EVENTS_DROPPED.inc()
+            return
+
+        logger.warning(f"Disconnecting slow WebSocket subscriber of {self.discussion_id}")
+        SLOW_CONSUMER_DISCONNECTS.inc()
+        self.close()
+        self.closer = asyncio.get_running_loop().create_task(self._close_socket())
+
+    async def drain(self, timeout: float):
+        """Let the writer send everything queued so far, then stop it"""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            await asyncio.wait_for(self._finish_writer(), timeout)
+        except asyncio.TimeoutError:
+            self.writer.cancel()
+
+    async def _finish_writer(self):
+        # Queue the end marker as soon as the writer makes room for it
+        while not self.writer.done():
+            try:
+                self.queue.put_nowait(None)
+                break
+            except asyncio.QueueFull:
+                await asyncio.sleep(0.01)
+        await asyncio.shield(self.writer)
+
+    def close(self):
+        """Stop sending immediately"""
+        self.closed = True
+        self.writer.cancel()
+
+    async def _write(self):
+        try:
+            while True:
+                text = await self.queue.get()
+                if text is None:
+                    return
+                await self.websocket.send_text(text)
+        except Exception as e:
+            logger.info(f"WebSocket send to {self.discussion_id} subscriber failed: {e}")
+            self.closed = True
+
+    async def _close_socket(self):
+        try:
+            await self.websocket.close(code=TRY_AGAIN_LATER)
+        except Exception:
+            pass
+
 
 class ConnectionManager:
-    """Class to manage WebSocket connections"""
+    """Class to manage WebSocket connections
+
+    Each event is serialized once and handed to every subscriber's queue.
+    """
 
-    def __init__(self):
-        self.active_connections: Dict[str, Set[WebSocket]] = {}
+    def __init__(self, max_queue: int = 256, slow_consumer_policy: str = "disconnect"):
+        if slow_consumer_policy not in ("disconnect", "drop"):
+            raise ValueError(f"Unknown slow consumer policy: {slow_consumer_policy}")
+        self.max_queue = max_queue
+        self.slow_consumer_policy = slow_consumer_policy
+        self.active_connections: Dict[str, Dict[WebSocket, Subscriber]] = {}
 
-    async def connect(self, websocket: WebSocket, discussion_id: str):
+    async def connect(self, websocket: WebSocket, discussion_id: str) -> Subscriber:
         """Connect client"""
         await websocket.accept()
-        if discussion_id not in self.active_connections:
-            self.active_connections[discussion_id] = set()
-        self.active_connections[discussion_id].add(websocket)
+        return self.subscribe(websocket, discussion_id)
+
+    def subscribe(self, websocket: WebSocket, discussion_id: str) -> Subscriber:
+        """Start sending a discussion's messages to an accepted connection"""
+        subscriber = Subscriber(websocket, discussion_id, self.max_queue, self.slow_consumer_policy)
+        self.active_connections.setdefault(discussion_id, {})[websocket] = subscriber
         logger.info(f"WebSocket connected: {discussion_id}")
+        return subscriber
 
     def disconnect(self, websocket: WebSocket, discussion_id: str):
         """Disconnect client"""
-        if discussion_id in self.active_connections:
-            self.active_connections[discussion_id].discard(websocket)
-            if not self.active_connections[discussion_id]:
-                del self.active_connections[discussion_id]
+        subscribers = self.active_connections.get(discussion_id)
+        if subscribers is None or websocket not in subscribers:
+            return
+        subscribers.pop(websocket).close()
+        if not subscribers:
+            del self.active_connections[discussion_id]
         logger.info(f"WebSocket disconnected: {discussion_id}")
 
     async def send_message(self, message: dict, discussion_id: str):
         """Send message to all clients participating in a specific discussion"""
-        if discussion_id not in self.active_connections:
+        subscribers = self.active_connections.get(discussion_id)
+        if not subscribers:
             return
-
-        disconnected = set()
-        for connection in self.active_connections[discussion_id]:
-            try:
-                await connection.send_text(json.dumps(message, ensure_ascii=False))
-            except Exception as e:
-                logger.error(f"Message send error: {e}")
-                disconnected.add(connection)
-
-        # Remove disconnected clients
-        for connection in disconnected:
-            self.disconnect(connection, discussion_id)
+        self._fan_out(json.dumps(message, ensure_ascii=False), subscribers)
 
     async def broadcast(self, message: dict):
         """Send message to all clients"""
+        text = json.dumps(message, ensure_ascii=False)
         for discussion_id in list(self.active_connections.keys()):
-            await self.send_message(message, discussion_id)
+            self._fan_out(text, self.active_connections[discussion_id])
+
+    def subscriber_count(self, discussion_id: Optional[str] = None) -> int:
+        if discussion_id is not None:
+            return len(self.active_connections.get(discussion_id, {}))
+        return sum(len(subscribers) for subscribers in self.active_connections.values())
+
+    def _fan_out(self, text: str, subscribers: Dict[WebSocket, Subscriber]):
+        # Closed subscribers ignore the event; their handlers remove them on disconnect
+        for subscriber in list(subscribers.values()):
+            subscriber.offer(text)
 
 
-manager = ConnectionManager()
+manager = ConnectionManager(
+    max_queue=settings.websocket_send_queue_size,
+    slow_consumer_policy=settings.websocket_slow_consumer_policy,
+)
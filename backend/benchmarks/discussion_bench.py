@@ -0,0 +1,383 @@
+"""End-to-end discussion benchmark
+
+Starts the FastAPI app in-process with the mock LLM backend and drives
+concurrent `/ws/discussion` sessions against it, measuring throughput,
+time-to-first-message, per-phase durations and server event-loop lag.
+
+Usage (from the backend directory):
+    python -m benchmarks.discussion_bench --sessions 20 --concurrency 10
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import socket
+import statistics
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PHASES = ["agenda", "agents", "opinions", "voting", "persuasion"]
+
+# Event that opens each discussion phase, and the event that closes it
+_PHASE_BOUNDARIES = {
+    "agenda": ("discussion_started", "agenda_created"),
+    "agents": ("agenda_created", "agents_created"),
+    "opinions": ("phase:independent_opinions", "phase:voting"),
+    "voting": ("phase:voting", "phase:persuasion"),
+    "persuasion": ("phase:persuasion", "agenda_completed"),
+}
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Percentile with linear interpolation (None for no values)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def summarize(values: List[float]) -> dict:
+    """Distribution summary in seconds"""
+    return {
+        "count": len(values),
+        "mean": statistics.fmean(values) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+class SessionResult:
+    """Timings collected by one benchmark session"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.started_at = 0.0
+        self.finished_at: Optional[float] = None
+        self.first_event_at: Optional[float] = None
+        self.first_message_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.event_counts: Dict[str, int] = defaultdict(int)
+        self.phase_durations: Dict[str, float] = defaultdict(float)
+        self._open_phases: Dict[str, float] = {}
+        # Token usage reported with discussion_completed
+        self.usage: Optional[dict] = None
+
+    def record(self, event: dict, now: float):
+        """Update timings from a received event"""
+        event_type = event.get("type")
+        data = event.get("data") or {}
+        self.event_counts[event_type] += 1
+        if self.first_event_at is None:
+            self.first_event_at = now
+
+        # First message written by a participant (system progress messages excluded)
+        if (
+            self.first_message_at is None
+            and event_type in ("message", "message_delta")
+            and data.get("message_type") != "system"
+        ):
+            self.first_message_at = now
+
+        if event_type == "discussion_completed":
+            self.usage = data.get("usage")
+
+        marker = f"phase:{data.get('phase')}" if event_type == "phase_changed" else event_type
+        for phase, (start_marker, end_marker) in _PHASE_BOUNDARIES.items():
+            if marker == end_marker and phase in self._open_phases:
+                self.phase_durations[phase] += now - self._open_phases.pop(phase)
+            if marker == start_marker:
+                self._open_phases[phase] = now
+
+    def to_dict(self) -> dict:
+        return {
+            "index": self.index,
+            "ok": self.error is None,
+            "error": self.error,
+            "duration": self.finished_at - self.started_at if self.finished_at else None,
+            "time_to_first_event": self.first_event_at - self.started_at if self.first_event_at else None,
+            "time_to_first_message": self.first_message_at - self.started_at if self.first_message_at else None,
+            "phase_durations": dict(self.phase_durations),
+            "event_counts": dict(self.event_counts),
+            "usage": self.usage,
+        }
+
+
+def summarize_prompt_cache(results: List[SessionResult]) -> dict:
+    """Input tokens served from the prompt cache, overall and per phase"""
+    totals: Dict[str, Dict[str, int]] = defaultdict(lambda: {"input_tokens": 0, "cached_input_tokens": 0})
+    for result in results:
+        if not result.usage:
+            continue
+        breakdowns = {"total": result.usage["total"], **result.usage["by_phase"]}
+        for key, usage in breakdowns.items():
+            totals[key]["input_tokens"] += usage["input_tokens"]
+            totals[key]["cached_input_tokens"] += usage["cached_input_tokens"]
+    return {
+        key: {
+            **counts,
+            "cached_input_ratio": counts["cached_input_tokens"] / counts["input_tokens"] if counts["input_tokens"] else 0.0,
+        }
+        for key, counts in totals.items()
+    }
+
+
+class EventLoopLagMonitor:
+    """Measure how late the event loop wakes up from a periodic sleep"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._stopped = False
+
+    async def run(self):
+        while not self._stopped:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - expected))
+
+    def stop(self):
+        self._stopped = True
+
+
+class ServerThread:
+    """Run the FastAPI app under uvicorn on its own event loop thread"""
+
+    def __init__(self, port: int):
+        import uvicorn
+        from main import app
+
+        self.port = port
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", ws_max_size=2**24))
+        self.loop = asyncio.new_event_loop()
+        self.lag_monitor = EventLoopLagMonitor()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.server.serve())
+
+    def start(self, timeout: float = 30.0):
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("Benchmark server failed to start")
+            time.sleep(0.05)
+        asyncio.run_coroutine_threadsafe(self.lag_monitor.run(), self.loop)
+
+    def get_json(self, path: str) -> dict:
+        """Fetch a metrics endpoint from the running server"""
+        import httpx
+        return httpx.get(f"http://127.0.0.1:{self.port}{path}", timeout=10).json()
+
+    def stop(self):
+        self.lag_monitor.stop()
+        self.server.should_exit = True
+        self._thread.join(timeout=30)
+
+
+async def run_session(index: int, url: str, topic: str, timeout: float) -> SessionResult:
+    """Drive one discussion over the WebSocket until it completes"""
+    import websockets
+
+    result = SessionResult(index)
+    result.started_at = time.perf_counter()
+    try:
+        async with websockets.connect(url, max_size=None, open_timeout=timeout) as websocket:
+            await websocket.send(json.dumps({"type": "start_discussion", "data": {"topic": topic}}))
+            async with asyncio.timeout(timeout):
+                async for raw in websocket:
+                    event = json.loads(raw)
+                    result.record(event, time.perf_counter())
+                    if event.get("type") == "error":
+                        result.error = event.get("data", {}).get("message", "error")
+                        break
+                    if event.get("type") == "discussion_completed":
+                        break
+            if result.error is None and not result.event_counts.get("discussion_completed"):
+                result.error = "Connection closed before discussion_completed"
+    except TimeoutError:
+        result.error = f"Timed out after {timeout}s"
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    result.finished_at = time.perf_counter()
+    return result
+
+
+async def run_sessions(args, url: str) -> tuple[List[SessionResult], float]:
+    """Run all sessions with at most args.concurrency in flight"""
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def bounded(index: int) -> SessionResult:
+        async with semaphore:
+            return await run_session(index, url, f"{args.topic} #{index}", args.timeout)
+
+    started_at = time.perf_counter()
+    results = await asyncio.gather(*[bounded(index) for index in range(args.sessions)])
+    return results, time.perf_counter() - started_at
+
+
+def build_report(args, results: List[SessionResult], elapsed: float, lag_samples: List[float], server_metrics: dict) -> dict:
+    """Aggregate session results into the JSON report"""
+    succeeded = [result for result in results if result.error is None]
+    return {
+        "benchmark": "discussion",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "config": {
+            "sessions": args.sessions,
+            "concurrency": args.concurrency,
+            "mock_latency_ms": args.latency_ms,
+            "mock_jitter_ms": args.jitter_ms,
+            "mock_latency_distribution": args.latency_distribution,
+            "mock_error_rate": args.error_rate,
+            "mock_rate_limit_rate": args.rate_limit_rate,
+            "seed": args.seed,
+            "llm_requests_per_minute": args.requests_per_minute,
+            "llm_tokens_per_minute": args.tokens_per_minute,
+        },
+        "summary": {
+            "elapsed_seconds": elapsed,
+            "completed_sessions": len(succeeded),
+            "failed_sessions": len(results) - len(succeeded),
+            "sessions_per_second": len(succeeded) / elapsed if elapsed else 0.0,
+            "session_duration": summarize([r.finished_at - r.started_at for r in succeeded]),
+            "time_to_first_event": summarize([r.first_event_at - r.started_at for r in succeeded if r.first_event_at]),
+            "time_to_first_message": summarize([r.first_message_at - r.started_at for r in succeeded if r.first_message_at]),
+            "phase_durations": {
+                phase: summarize([r.phase_durations[phase] for r in succeeded if phase in r.phase_durations])
+                for phase in PHASES
+            },
+            "event_loop_lag": summarize(lag_samples),
+            "prompt_cache": summarize_prompt_cache(succeeded),
+        },
+        "server_metrics": server_metrics,
+        "errors": [result.error for result in results if result.error],
+        "sessions": [result.to_dict() for result in results],
+    }
+
+
+def print_summary(report: dict):
+    """Human-readable summary on stdout"""
+    summary = report["summary"]
+
+    def ms(value: Optional[float]) -> str:
+        return f"{value * 1000:8.1f}ms" if value is not None else "     n/a"
+
+    print(f"sessions: {summary['completed_sessions']} ok, {summary['failed_sessions']} failed "
+          f"in {summary['elapsed_seconds']:.2f}s ({summary['sessions_per_second']:.2f} sessions/s)")
+    rows = [
+        ("time to first message", summary["time_to_first_message"]),
+        ("session duration", summary["session_duration"]),
+        *[(f"phase: {phase}", summary["phase_durations"][phase]) for phase in PHASES],
+        ("event loop lag", summary["event_loop_lag"]),
+    ]
+    print(f"{'':24}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for label, stats in rows:
+        print(f"{label:24}{ms(stats['p50'])}{ms(stats['p95'])}{ms(stats['p99'])}{ms(stats['max'])}")
+
+    prompt_cache = summary["prompt_cache"]
+    if prompt_cache:
+        ratios = ", ".join(
+            f"{key} {counts['cached_input_ratio']:.1%}" for key, counts in prompt_cache.items() if key != "total"
+        )
+        print(f"cached input tokens: {prompt_cache['total']['cached_input_ratio']:.1%} ({ratios})")
+
+
+def configure_environment(args):
+    """Point the app at the mock LLM backend (must run before config is imported)"""
+    os.environ["LLM_BACKEND"] = "mock"
+    os.environ["MOCK_LLM_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["MOCK_LLM_JITTER_MS"] = str(args.jitter_ms)
+    os.environ["MOCK_LLM_LATENCY_DISTRIBUTION"] = args.latency_distribution
+    os.environ["MOCK_LLM_ERROR_RATE"] = str(args.error_rate)
+    os.environ["MOCK_LLM_RATE_LIMIT_RATE"] = str(args.rate_limit_rate)
+    os.environ["MOCK_LLM_SEED"] = str(args.seed)
+    os.environ["MOCK_LLM_PROMPT_CACHE_MIN_TOKENS"] = str(args.prompt_cache_min_tokens)
+    os.environ["MOCK_LLM_PROMPT_CACHE_BLOCK_TOKENS"] = str(args.prompt_cache_block_tokens)
+    os.environ["MOCK_LLM_PREFILL_MS_PER_1K_TOKENS"] = str(args.prefill_ms_per_1k_tokens)
+    os.environ["LLM_REQUESTS_PER_MINUTE"] = str(args.requests_per_minute)
+    os.environ["LLM_TOKENS_PER_MINUTE"] = str(args.tokens_per_minute)
+    # Every concurrent benchmark session must be admitted and running, not queued
+    os.environ["MAX_CONCURRENT_SESSIONS"] = str(args.concurrency)
+    # Checkpoints of earlier runs must not be resumed into the measurement
+    os.environ["CHECKPOINT_RESUME_ON_STARTUP"] = "false"
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end discussion benchmark against the mock LLM backend")
+    parser.add_argument("--sessions", type=int, default=20, help="Total number of discussions")
+    parser.add_argument("--concurrency", type=int, default=10, help="Discussions in flight at once")
+    parser.add_argument("--topic", default="Should we continue investing in the new product line?")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Per-session timeout in seconds")
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--latency-distribution", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    # The mock's prompts are a few hundred tokens, far below the provider's 1024-token caching
+    # threshold, so caching is simulated at a matching smaller scale by default
+    parser.add_argument("--prompt-cache-min-tokens", type=int, default=128,
+                        help="Shortest prefix the simulated prompt cache serves (provider: 1024)")
+    parser.add_argument("--prompt-cache-block-tokens", type=int, default=16,
+                        help="Granularity of simulated cached prefixes (provider: 128)")
+    parser.add_argument("--prefill-ms-per-1k-tokens", type=float, default=0.0,
+                        help="Mock latency added per 1000 uncached input tokens")
+    parser.add_argument("--requests-per-minute", type=int, default=0, help="LLM rate limit (0 = unlimited)")
+    parser.add_argument("--tokens-per-minute", type=int, default=0, help="LLM token rate limit (0 = unlimited)")
+    parser.add_argument("--output", default="benchmarks/results/discussion.json", help="JSON report path")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment(args)
+    logging.basicConfig(level=logging.WARNING)
+
+    server = ServerThread(free_port())
+    server.start()
+    # Keep the app's INFO logging from dominating the measurement
+    logging.getLogger().setLevel(logging.WARNING)
+    try:
+        results, elapsed = asyncio.run(run_sessions(args, f"ws://127.0.0.1:{server.port}/ws/discussion"))
+        server_metrics = {
+            "llm_pool": server.get_json("/api/metrics/llm-pool"),
+            "llm_cache": server.get_json("/api/metrics/llm-cache"),
+        }
+    finally:
+        server.stop()
+
+    report = build_report(args, results, elapsed, list(server.lag_monitor.samples), server_metrics)
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+
+    print_summary(report)
+    print(f"report written to {output}")
+    return 0 if not report["errors"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
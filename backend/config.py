@@ -21,11 +21,81 @@ class Settings(BaseSettings):
     # OpenAI Settings
     openai_api_key: str = ""
 
+    # OpenAI HTTP connection pool (shared by all sessions for the app lifetime)
+    openai_max_connections: int = 100
+    openai_max_keepalive_connections: int = 20
+    openai_keepalive_expiry: float = 30.0  # seconds
+    openai_http2: bool = True
+
+    # LLM rate limiting (process-wide, 0 disables a limit)
+    llm_requests_per_minute: int = 500
+    llm_tokens_per_minute: int = 200000
+    llm_max_concurrency: int = 64
+    llm_priority_aging_seconds: float = 10.0  # Queued calls move up one lane per interval (0 = strict priority)
+
+    # LLM response cache (opt-in, keyed by model + prompt + previous_response_id)
+    llm_cache_enabled: bool = False
+    llm_cache_max_entries: int = 1024
+    llm_cache_ttl_seconds: float = 86400
+    llm_cache_sqlite_path: str = ""  # Empty = in-memory tier only
+    llm_cache_sqlite_max_entries: int = 100000
+
+    # LLM pricing for cost estimates (USD per million tokens)
+    llm_input_cost_per_million: float = 0.05
+    llm_cached_input_cost_per_million: float = 0.005
+    llm_output_cost_per_million: float = 0.40
+
+    # LLM backend: "openai" or "mock" (offline, deterministic, for load testing)
+    llm_backend: str = "openai"
+    mock_llm_latency_ms: float = 800
+    mock_llm_jitter_ms: float = 400
+    mock_llm_latency_distribution: str = "lognormal"  # fixed, uniform or lognormal
+    mock_llm_error_rate: float = 0.0
+    mock_llm_rate_limit_rate: float = 0.0
+    mock_llm_retry_after_seconds: float = 1.0
+    mock_llm_agreement_rate: float = 0.7
+    mock_llm_seed: int = 0
+    # Simulated prompt caching: cached prefixes need this many tokens and grow in blocks of this size
+    mock_llm_prompt_cache_min_tokens: int = 1024
+    mock_llm_prompt_cache_block_tokens: int = 128
+    # Added latency per 1000 uncached input tokens (0 = latency independent of the prompt)
+    mock_llm_prefill_ms_per_1k_tokens: float = 0.0
+
+    # Tracing (span exporter: none, memory, jsonl or otlp; durations always feed /metrics)
+    tracing_exporter: str = "memory"
+    tracing_memory_max_spans: int = 10000
+    tracing_jsonl_path: str = ".cache/spans.jsonl"
+    tracing_otlp_endpoint: str = "http://localhost:4318/v1/traces"
+    tracing_service_name: str = "pangaea-kaigi-backend"
+    tracing_export_interval_seconds: float = 2.0
+
     # Dedalus Labs Settings
     dedalus_api_key: str = ""
 
     # MCP Integration Settings
     enable_context_retrieval: bool = True
+    # Where background knowledge comes from: "mock" (mock_data.txt), "dedalus" (the configured
+    # Notion/Slack/Atlassian sources through Dedalus) or "auto" (dedalus once DEDALUS_API_KEY and
+    # a source token are set, mock otherwise)
+    context_retrieval_source: str = "auto"
+
+    # Per-source deadlines; slower sources are delivered later as context_updated
+    context_notion_deadline_seconds: float = 8.0
+    context_slack_deadline_seconds: float = 8.0
+    context_atlassian_deadline_seconds: float = 8.0
+    context_late_results_timeout_seconds: float = 120.0
+
+    # Per-agenda-item context packing (most relevant chunks within a token budget, 0 = no limit)
+    context_token_budget: int = 1500
+    context_chunk_chars: int = 800
+
+    # Context cache (per source TTL, served stale while refreshing for context_cache_stale_seconds)
+    context_cache_enabled: bool = True
+    context_cache_notion_ttl_seconds: float = 3600
+    context_cache_slack_ttl_seconds: float = 600
+    context_cache_atlassian_ttl_seconds: float = 1800
+    context_cache_stale_seconds: float = 86400
+    context_cache_sqlite_path: str = ".cache/context.sqlite3"  # Empty = in-memory only
 
     # Notion MCP Settings (optional)
     notion_token: str = ""
@@ -39,6 +109,82 @@ class Settings(BaseSettings):
     atlassian_api_token: str = ""
     atlassian_domain: str = ""
 
+    # Discussion Settings
+    # 1 keeps persuasion responses sequential; >1 fans them out concurrently
+    persuasion_concurrency: int = 1
+    # 1 discusses agenda items one after another; >1 runs that many items concurrently
+    agenda_concurrency: int = 1
+    # Consecutive persuasion rounds without any stance change after which persuasion ends
+    # with the most supported opinion (0 = always run every round)
+    persuasion_stalemate_rounds: int = 2
+    # Stream opinions, persuasion and agenda creation as message_delta events
+    enable_streaming: bool = True
+    # Query context for each agenda item while agents are being generated
+    prefetch_agenda_context: bool = True
+    # Per-session token budget; persuasion ends early once it is used up (0 = unlimited)
+    session_token_budget: int = 0
+    # Minimum seconds between usage_update events
+    usage_update_interval_seconds: float = 1.0
+    # Where conversation state lives: "server" (response_id chains stored by the provider)
+    # or "local" (each call is stateless and carries the agent's recent transcript)
+    conversation_state: str = "server"
+    # Local mode: turns sent verbatim; beyond this the older half is condensed into notes
+    agent_transcript_window: int = 6
+    # Local mode: characters of each condensed turn kept in an agent's notes
+    agent_note_chars: int = 300
+    # Local mode: lines kept in an agent's notes (the oldest are dropped beyond this)
+    agent_notes_max_lines: int = 20
+    # Agent context (estimated tokens of its unsummarized turns) at which it is condensed
+    # into a short summary in the background and a new chain is started (0 = never)
+    context_compaction_tokens: int = 0
+    # Maximum characters of such a summary
+    context_summary_chars: int = 1500
+
+    # Session Settings
+    # Discussions running at the same time; further sessions wait in a queue
+    max_concurrent_sessions: int = 8
+    # Sessions allowed to wait for a slot; beyond this new sessions are refused
+    max_queued_sessions: int = 16
+    # Seconds a finished session stays available for polling and replay
+    session_retention_seconds: float = 3600.0
+
+    # Events kept in memory per session for replay to reconnecting clients
+    event_log_max_events: int = 2000
+    # Where older events go: "" (dropped), "jsonl" or "sqlite"
+    event_log_spill: str = ""
+    event_log_jsonl_dir: str = ".cache/events"
+    event_log_sqlite_path: str = ".cache/events.sqlite3"
+
+    # Events queued per WebSocket subscriber before the slow consumer policy applies
+    websocket_send_queue_size: int = 256
+    # "disconnect" (client resumes from its last seq) or "drop" (discard the oldest queued event)
+    websocket_slow_consumer_policy: str = "disconnect"
+    # Seconds to finish sending queued events once a discussion ends
+    websocket_drain_timeout_seconds: float = 10.0
+
+    # Discussion checkpoints for resuming after a failure or restart: "sqlite", "file" or "" (disabled)
+    checkpoint_store: str = ""
+    checkpoint_sqlite_path: str = ".cache/checkpoints.sqlite3"
+    checkpoint_dir: str = ".cache/checkpoints"  # Used by "file" and when SQLite is unavailable
+    # Resume unfinished checkpointed discussions when the server starts (their LLM calls
+    # continue with nobody attached, so this is opt-in)
+    checkpoint_resume_on_startup: bool = False
+    # Give up on a checkpoint after this many consecutive resumes that did not complete a phase
+    checkpoint_max_resume_attempts: int = 3
+
+    # Shared session state for running several workers: "memory" (single worker) or "redis"
+    session_store: str = "memory"
+    redis_url: str = "redis://localhost:6379/0"
+    redis_key_prefix: str = "pangaea"
+    # Events kept per session on the Redis event bus (replay for clients reconnecting to any worker)
+    event_bus_max_events: int = 10000
+    # Name of this worker in session leases (default: hostname-pid)
+    worker_id: str = ""
+    # Seconds a session lease lasts without a heartbeat; then another worker takes the session over
+    session_lease_seconds: float = 15.0
+    # Seconds between lease heartbeats (and scans for abandoned sessions)
+    session_heartbeat_seconds: float = 5.0
+
     # Database (configure as needed)
     database_url: str = ""
 
@@ -1,7 +1,12 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from config import settings
 from api.routes import router
+from api.websocket import manager
+from services.client_registry import ClientRegistry
+from services.session_registry import SessionRegistry
+from services.tracing import configure_tracing, tracer
 import logging
 
 # Logging configuration
@@ -10,10 +15,31 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create clients shared by all sessions for the application lifetime"""
+    app.state.span_exporter = configure_tracing()
+    app.state.client_registry = ClientRegistry.from_settings()
+    app.state.session_registry = SessionRegistry.from_settings(app.state.client_registry)
+    app.state.session_registry.add_listener(lambda job, event: manager.send_message(event, job.id))
+    if settings.checkpoint_resume_on_startup:
+        await app.state.session_registry.resume_unfinished()
+    app.state.session_registry.start_heartbeat()
+    try:
+        yield
+    finally:
+        await app.state.session_registry.shutdown()
+        await app.state.client_registry.aclose()
+        await tracer.shutdown()
+
+
 app = FastAPI(
     title=settings.app_name,
     version=settings.api_version,
     debug=settings.debug,
+    lifespan=lifespan,
 )
 
 # CORS configuration (allow requests from frontend)
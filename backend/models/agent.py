@@ -1,6 +1,6 @@
 """Agent model definitions"""
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 
 
@@ -10,6 +10,13 @@ class AgentRole(str, Enum):
     PARTICIPANT = "participant"
 
 
+class TranscriptTurn(BaseModel):
+    """One exchange kept in an Agent's local conversation state"""
+    label: str = Field("", description="Kind of turn, e.g. the agenda item an opinion was given on")
+    prompt: str = Field(..., description="What the agent was asked (without the fixed rules and background context)")
+    response: str = Field(..., description="What the agent answered")
+
+
 class Agent(BaseModel):
     """Agent model"""
     id: str = Field(..., description="Agent's unique ID")
@@ -17,6 +24,9 @@ class Agent(BaseModel):
     role: AgentRole = Field(..., description="Agent's role")
     perspective: str = Field(..., description="Agent's perspective and expertise")
     response_id: Optional[str] = Field(None, description="OpenAI response_id chain")
+    # Local conversation state (not sent to clients; checkpoints save it explicitly)
+    notes: str = Field("", exclude=True, description="Condensed earlier turns")
+    transcript: List[TranscriptTurn] = Field(default_factory=list, exclude=True, description="Recent turns")
 
     class Config:
         json_schema_extra = {
@@ -0,0 +1,39 @@
+"""Structured output models for votes and decisions"""
+from pydantic import BaseModel, Field
+from enum import Enum
+
+
+class VoteDecision(BaseModel):
+    """Vote for one of the presented opinions"""
+    opinion_id: str = Field(..., description="ID of the selected opinion")
+    reason: str = Field(..., description="Brief reason for the choice")
+
+
+class PersuasionDecision(str, Enum):
+    """Reaction to a persuasion"""
+    AGREE = "agree"
+    COUNTER_ARGUE = "counter_argue"
+
+
+class PersuasionResponse(BaseModel):
+    """Response to a persuasion"""
+    decision: PersuasionDecision = Field(..., description="Whether you agree or counter-argue")
+    reason: str = Field(..., description="Reasons for agreeing, or the counter-argument")
+
+
+class CounterArgumentDecision(str, Enum):
+    """Reaction to a counter-argument"""
+    SUPPORT_ORIGINAL = "support_original"
+    AGREE_WITH_COUNTER_ARGUMENT = "agree_with_counter_argument"
+
+
+class CounterArgumentResponse(BaseModel):
+    """Response of the original opinion holder to a counter-argument"""
+    decision: CounterArgumentDecision = Field(..., description="Whether you keep your original opinion")
+    reason: str = Field(..., description="Brief reason")
+
+
+class FinalDecision(BaseModel):
+    """Final decision on a proposed opinion"""
+    agrees: bool = Field(..., description="Whether you agree with the proposed opinion")
+    reason: str = Field(..., description="Brief reason")
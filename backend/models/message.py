@@ -23,6 +23,7 @@ class Message(BaseModel):
     content: str = Field(..., description="Message content")
     message_type: MessageType = Field(..., description="Message type")
     timestamp: datetime = Field(default_factory=datetime.now, description="Timestamp sent")
+    agenda_index: Optional[int] = Field(default=None, description="Agenda item the message belongs to")
 
 
 class Opinion(BaseModel):
@@ -1,27 +1,106 @@
 """Agent generation and management"""
+import asyncio
+import re
 import uuid
-from typing import List, Dict, Optional
-from models.agent import Agent, AgentRole
+from typing import Iterable, List, Dict, Optional, Callable, Awaitable, Tuple
+from config import settings
+from models.agent import Agent, AgentRole, TranscriptTurn
 from models.message import Opinion
+from models.decision import (
+    VoteDecision,
+    PersuasionDecision,
+    PersuasionResponse,
+    CounterArgumentDecision,
+    CounterArgumentResponse,
+    FinalDecision,
+)
 from services.openai_client import OpenAIResponsesClient
+from services.rate_limiter import Priority, estimate_tokens
+from services.tracing import tracer
+from utils.prompt_builder import build_prompt
 from utils.prompts import (
+    AGENDA_ITEM,
     AGENT_INDEPENDENT_OPINION,
+    AGENT_INDEPENDENT_OPINION_RULES,
     AGENT_VOTE,
+    AGENT_VOTE_RULES,
     AGENT_PERSUASION,
+    AGENT_PERSUASION_RULES,
     AGENT_RESPOND_TO_PERSUASION,
+    AGENT_RESPOND_TO_PERSUASION_RULES,
+    AGENT_RESPOND_TO_COUNTER_ARGUMENT,
+    AGENT_RESPOND_TO_COUNTER_ARGUMENT_RULES,
     AGENT_FINAL_DECISION,
+    AGENT_FINAL_DECISION_RULES,
+    AGENT_HISTORY,
+    AGENT_HISTORY_NOTES,
+    AGENT_HISTORY_TURN,
+    AGENT_SUMMARIZE,
+    AGENT_SUMMARIZE_RULES,
 )
+from utils.structured_output import json_schema_format, parse_structured
 import logging
 
 logger = logging.getLogger(__name__)
 
+PERSUASION_RESPONSE_FORMAT = json_schema_format(PersuasionResponse, "persuasion_response")
+COUNTER_ARGUMENT_RESPONSE_FORMAT = json_schema_format(CounterArgumentResponse, "counter_argument_response")
+FINAL_DECISION_FORMAT = json_schema_format(FinalDecision, "final_decision")
+
+CONVERSATION_STATES = ("server", "local")
+
+# How each kind of call is labelled in an Agent's notes
+TURN_LABELS = {
+    "generate_independent_opinion": "Opinion",
+    "vote_for_opinion": "Vote",
+    "persuade": "Persuasion",
+    "respond_to_persuasion": "Response to persuasion",
+    "respond_to_counter_argument": "Response to a counter-argument",
+    "make_final_decision": "Final decision",
+}
+
 
 class AgentManager:
-    """Class for generating and managing Agents"""
+    """Class for generating and managing Agents
+
+    With conversation_state "server", each Agent continues its own stored
+    response chain (previous_response_id). With "local", nothing is stored by
+    the provider: every call is stateless and carries the Agent's persona,
+    condensed notes and last few turns, which are kept on the Agent itself.
+
+    Once an Agent's unsummarized turns exceed compaction_tokens, they can be
+    condensed into its notes by a background summarizer (start_compaction /
+    apply_compactions); in server mode the Agent then starts a new chain
+    seeded with the notes.
+    """
 
-    def __init__(self, openai_client: OpenAIResponsesClient):
+    def __init__(
+        self,
+        openai_client: OpenAIResponsesClient,
+        conversation_state: Optional[str] = None,
+        transcript_window: Optional[int] = None,
+        note_chars: Optional[int] = None,
+        notes_max_lines: Optional[int] = None,
+        compaction_tokens: Optional[int] = None,
+        summary_chars: Optional[int] = None,
+    ):
         self.openai_client = openai_client
         self.agents: Dict[str, Agent] = {}
+        self.conversation_state = conversation_state or settings.conversation_state
+        if self.conversation_state not in CONVERSATION_STATES:
+            raise ValueError(f"Unknown conversation state: {self.conversation_state}")
+        self.transcript_window = max(1, transcript_window or settings.agent_transcript_window)
+        self.note_chars = note_chars or settings.agent_note_chars
+        self.notes_max_lines = max(1, notes_max_lines or settings.agent_notes_max_lines)
+        self.compaction_tokens = settings.context_compaction_tokens if compaction_tokens is None else compaction_tokens
+        self.summary_chars = summary_chars or settings.context_summary_chars
+        # Summaries being written in the background: id(agent) -> (agent, summarized turn count, task)
+        self._compactions: Dict[int, Tuple[Agent, int, asyncio.Task]] = {}
+
+    @property
+    def local_state(self) -> bool:
+        """Whether conversations are kept locally instead of as stored response chains"""
+        return self.conversation_state == "local"
 
     def create_agent(self, name: str, perspective: str, role: AgentRole = AgentRole.PARTICIPANT) -> Agent:
         """Create a new Agent"""
@@ -44,31 +123,201 @@ class AgentManager:
         """Get all Agents"""
         return list(self.agents.values())
 
+    async def _call(
+        self,
+        operation: str,
+        agent: Agent,
+        priority: Priority,
+        rules: str,
+        request: str,
+        context: str = "",
+        agenda: str = "",
+        on_stream: Optional[Callable[[str], Awaitable[None]]] = None,
+        text_format: Optional[dict] = None,
+        label: Optional[str] = None,
+    ) -> dict:
+        """Send a prompt as the Agent and advance its conversation
+
+        In server mode the call continues the Agent's response chain and
+        advances its response_id; in local mode it
+        carries the Agent's history and the exchange is appended to it.
+        Streams text deltas to on_stream when given. The call is traced as an
+        `agent.<operation>` span. label names the turn in the Agent's notes
+        (defaults to the operation's TURN_LABELS entry).
+        """
+        previous_response_id = None if self.local_state else agent.response_id
+        # A new server chain after a compaction starts from the Agent's notes and later turns
+        history = "" if previous_response_id or not (self.local_state or agent.notes) else self._history(agent)
+        prompt = build_prompt(rules=rules, context=context, agenda=agenda, history=history, request=request)
+
+        with tracer.span(
+            f"agent.{operation}",
+            agent_id=agent.id,
+            agent_name=agent.name,
+            prompt_length=len(prompt),
+        ) as span:
+            if on_stream:
+                response = await self.openai_client.create_with_streaming(
+                    input_text=prompt,
+                    previous_response_id=previous_response_id,
+                    store=not self.local_state,
+                    on_chunk=on_stream,
+                    priority=priority,
+                    text_format=text_format,
+                )
+            else:
+                response = await self.openai_client.create_with_retry(
+                    input_text=prompt,
+                    previous_response_id=previous_response_id,
+                    store=not self.local_state,
+                    priority=priority,
+                    text_format=text_format,
+                )
+            span.set_attribute("output_length", len(response["content"]))
+
+        # Update the state on the given object, which may be a per-agenda-item fork
+        if not self.local_state:
+            agent.response_id = response["id"]
+        # Server chains only need the turns recorded when they may be compacted
+        if self.local_state or self.compaction_tokens:
+            self._remember(
+                agent,
+                TranscriptTurn(
+                    label=label or TURN_LABELS.get(operation, operation),
+                    prompt=build_prompt(rules="", agenda=agenda, request=request),
+                    response=response["content"],
+                ),
+            )
+        return response
+
+    def _history(self, agent: Agent, turn_count: Optional[int] = None) -> str:
+        """The Agent's persona, notes and recent turns (the first turn_count of them) as a prompt section"""
+        sections = [AGENT_HISTORY.format(name=agent.name, perspective=agent.perspective)]
+        if agent.notes:
+            sections.append(AGENT_HISTORY_NOTES.format(notes=agent.notes))
+        sections.extend(
+            AGENT_HISTORY_TURN.format(prompt=turn.prompt, response=turn.response)
+            for turn in agent.transcript[:turn_count]
+        )
+        return "\n\n".join(sections)
+
+    def _remember(self, agent: Agent, turn: TranscriptTurn):
+        """Append a turn, folding the oldest local turns into notes once the window is full"""
+        agent.transcript.append(turn)
+        # A pending summary replaces the turns it covers, so they must stay in place until it is applied
+        if not self.local_state or id(agent) in self._compactions or len(agent.transcript) <= self.transcript_window:
+            return
+        # Fold half a window at a time so the history section changes only every few calls
+        fold_count = len(agent.transcript) - self.transcript_window // 2
+        folded, agent.transcript = agent.transcript[:fold_count], agent.transcript[fold_count:]
+        lines = agent.notes.splitlines() + [self._note(turn) for turn in folded]
+        # The oldest notes go first, so the history stays bounded even without compaction
+        agent.notes = "\n".join(lines[-self.notes_max_lines:])
+
+    def _note(self, turn: TranscriptTurn) -> str:
+        """One line for a folded turn: its label and the start of the answer"""
+        answer = " ".join(turn.response.split())
+        if len(answer) > self.note_chars:
+            answer = answer[:self.note_chars].rstrip() + "..."
+        return f"- {turn.label or 'Turn'}: {answer}"
+
+    def context_tokens(self, agent: Agent) -> int:
+        """Estimated tokens of the Agent's notes and unsummarized turns"""
+        return estimate_tokens(self._history(agent), output_tokens=0)
+
+    def needs_compaction(self, agent: Agent) -> bool:
+        """Whether the Agent's context has outgrown the compaction threshold (and no summary is pending)"""
+        return (
+            bool(self.compaction_tokens)
+            and id(agent) not in self._compactions
+            and bool(agent.transcript)
+            and self.context_tokens(agent) >= self.compaction_tokens
+        )
+
+    def start_compaction(self, agent: Agent):
+        """Summarize the Agent's notes and turns so far in the background
+
+        The Agent keeps being used meanwhile; apply_compactions swaps in the
+        summary once it is ready.
+        """
+        turn_count = len(agent.transcript)
+        task = asyncio.create_task(self._summarize(agent, turn_count))
+        self._compactions[id(agent)] = (agent, turn_count, task)
+
+    def apply_compactions(self, agents: Iterable[Agent]):
+        """Replace summarized turns with their summary for every finished compaction of the given Agents"""
+        for agent in agents:
+            entry = self._compactions.get(id(agent))
+            if entry is None or not entry[2].done():
+                continue
+            del self._compactions[id(agent)]
+            _, turn_count, task = entry
+            if task.cancelled():
+                continue
+            if task.exception():
+                logger.warning(f"Context compaction of {agent.name} failed: {task.exception()}")
+                continue
+            if not task.result():
+                continue
+            agent.notes = task.result()
+            agent.transcript = agent.transcript[turn_count:]
+            # The next call starts a new chain seeded with the notes and the turns since
+            agent.response_id = None
+            logger.info(f"{agent.name}'s context compacted ({turn_count} turns summarized)")
+
+    def cancel_compactions(self):
+        """Drop every pending compaction (the discussion is over)"""
+        for _, _, task in self._compactions.values():
+            task.cancel()
+        self._compactions.clear()
+
+    async def _summarize(self, agent: Agent, turn_count: int) -> str:
+        """Condense the Agent's notes and first turn_count turns into new notes"""
+        prompt = build_prompt(
+            rules=AGENT_SUMMARIZE_RULES.format(max_chars=self.summary_chars),
+            history=self._history(agent, turn_count),
+            request=AGENT_SUMMARIZE,
+        )
+        with tracer.span(
+            "agent.compact_context",
+            agent_id=agent.id,
+            agent_name=agent.name,
+            phase="compaction",
+            turns=turn_count,
+            prompt_length=len(prompt),
+        ) as span:
+            response = await self.openai_client.create_with_retry(
+                input_text=prompt,
+                store=False,
+                priority=Priority.LOW,
+            )
+            span.set_attribute("output_length", len(response["content"]))
+
+        summary = response["content"].strip()
+        if len(summary) > self.summary_chars:
+            summary = summary[:self.summary_chars].rstrip() + "..."
+        return summary
+
     async def generate_independent_opinion(
         self,
         agent: Agent,
         agenda_title: str,
         agenda_description: str,
         background_context: str = "",
+        on_stream: Optional[Callable[[str], Awaitable[None]]] = None,
     ) -> tuple[str, str]:
-        """Have the Agent generate an independent opinion"""
-        prompt = AGENT_INDEPENDENT_OPINION.format(
-            name=agent.name,
-            perspective=agent.perspective,
-            agenda_title=agenda_title,
-            agenda_description=agenda_description,
-            background_context=background_context,
-        )
-
-        response = await self.openai_client.create_with_retry(
-            input_text=prompt,
-            previous_response_id=agent.response_id,
+        """Have the Agent generate an independent opinion (streaming text deltas to on_stream if given)"""
+        # Everything before the agent's own identity is the same for every participant of the agenda item
+        response = await self._call(
+            "generate_independent_opinion", agent, Priority.LOW,
+            rules=AGENT_INDEPENDENT_OPINION_RULES,
+            context=background_context,
+            agenda=AGENDA_ITEM.format(agenda_title=agenda_title, agenda_description=agenda_description),
+            request=AGENT_INDEPENDENT_OPINION.format(name=agent.name, perspective=agent.perspective),
+            on_stream=on_stream,
+            label=f'Opinion on "{agenda_title}"',
         )
 
-        # Update response_id
-        agent.response_id = response["id"]
-        self.agents[agent.id] = agent
-
         logger.info(f"{agent.name} generated opinion")
         return response["content"], response["id"]
 
@@ -83,20 +332,24 @@ class AgentManager:
             for op in opinions
         ])
 
-        prompt = AGENT_VOTE.format(
-            name=agent.name,
-            opinions=opinions_text,
-        )
-
-        response = await self.openai_client.create_with_retry(
-            input_text=prompt,
-            previous_response_id=agent.response_id,
+        # The schema only admits the presented opinion IDs
+        opinion_ids = [op.id for op in opinions]
+        text_format = json_schema_format(VoteDecision, "vote", enums={"opinion_id": opinion_ids})
+        response = await self._call(
+            "vote_for_opinion", agent, Priority.NORMAL,
+            rules=AGENT_VOTE_RULES,
+            request=AGENT_VOTE.format(name=agent.name, opinions=opinions_text),
+            text_format=text_format,
         )
 
-        agent.response_id = response["id"]
-        self.agents[agent.id] = agent
-
-        voted_opinion_id = response["content"].strip()
+        content = response["content"]
+        vote = parse_structured(content, VoteDecision)
+        if vote and vote.opinion_id in opinion_ids:
+            voted_opinion_id = vote.opinion_id
+        else:
+            # Unstructured reply: take the first presented ID it mentions
+            mentioned = [(content.find(opinion_id), opinion_id) for opinion_id in opinion_ids if opinion_id in content]
+            voted_opinion_id = min(mentioned)[1] if mentioned else content.strip()
         logger.info(f"{agent.name} voted: {voted_opinion_id}")
         return voted_opinion_id
 
@@ -104,21 +357,16 @@ class AgentManager:
         self,
         agent: Agent,
         opinion: Opinion,
+        on_stream: Optional[Callable[[str], Awaitable[None]]] = None,
     ) -> tuple[str, str]:
-        """Have the Agent perform persuasion"""
-        prompt = AGENT_PERSUASION.format(
-            name=agent.name,
-            your_opinion=opinion.content,
+        """Have the Agent perform persuasion (streaming text deltas to on_stream if given)"""
+        response = await self._call(
+            "persuade", agent, Priority.NORMAL,
+            rules=AGENT_PERSUASION_RULES,
+            request=AGENT_PERSUASION.format(name=agent.name, your_opinion=opinion.content),
+            on_stream=on_stream,
         )
 
-        response = await self.openai_client.create_with_retry(
-            input_text=prompt,
-            previous_response_id=agent.response_id,
-        )
-
-        agent.response_id = response["id"]
-        self.agents[agent.id] = agent
-
         logger.info(f"{agent.name} started persuasion")
         return response["content"], response["id"]
 
@@ -136,24 +384,29 @@ class AgentManager:
         """
         other_opinions_text = "\n".join([f"- {op}" for op in other_opinions])
 
-        prompt = AGENT_RESPOND_TO_PERSUASION.format(
-            name=agent.name,
-            your_opinion=your_opinion,
-            other_opinions=other_opinions_text,
-            persuasion_message=persuasion_message,
+        response = await self._call(
+            "respond_to_persuasion", agent, Priority.NORMAL,
+            rules=AGENT_RESPOND_TO_PERSUASION_RULES,
+            request=AGENT_RESPOND_TO_PERSUASION.format(
+                name=agent.name,
+                your_opinion=your_opinion,
+                other_opinions=other_opinions_text,
+                persuasion_message=persuasion_message,
+            ),
+            text_format=PERSUASION_RESPONSE_FORMAT,
         )
 
-        response = await self.openai_client.create_with_retry(
-            input_text=prompt,
-            previous_response_id=agent.response_id,
-        )
-
-        agent.response_id = response["id"]
-        self.agents[agent.id] = agent
-
-        content = response["content"]
-        # Determine if it's agreement or counter-argument
-        is_agreement = "Agree" in content or "agree" in content
+        parsed = parse_structured(response["content"], PersuasionResponse)
+        if parsed:
+            is_agreement = parsed.decision == PersuasionDecision.AGREE
+            content = f"Decision: {'Agree' if is_agreement else 'Counter-argue'}\nReason: {parsed.reason}"
+        else:
+            content = response["content"]
+            # "Counter-argue" wins over "agree", and "disagree" is not agreement
+            is_agreement = (
+                not re.search(r"counter[- ]?argu", content, re.IGNORECASE)
+                and re.search(r"(?<!dis)agree", content, re.IGNORECASE) is not None
+            )
 
         logger.info(f"{agent.name} responded: {'Agreement' if is_agreement else 'Counter-argument'}")
         return content, response["id"], is_agreement
@@ -169,30 +422,25 @@ class AgentManager:
         Returns:
             tuple[content, response_id, maintains_position]: Response content, response_id, whether to maintain original opinion
         """
-        prompt = f"""You are {agent.name}.
-
-Your original opinion: {original_opinion}
-
-The following counter-argument was made: {counter_argument}
-
-Please state your thoughts on this counter-argument.
-Indicate whether you will continue to support your original opinion or agree with the counter-argument, and state your reasons.
-
-Output format:
-Decision: [Support original opinion/Agree with counter-argument]
-Reason: [Briefly state your thoughts]"""
-
-        response = await self.openai_client.create_with_retry(
-            input_text=prompt,
-            previous_response_id=agent.response_id,
+        response = await self._call(
+            "respond_to_counter_argument", agent, Priority.NORMAL,
+            rules=AGENT_RESPOND_TO_COUNTER_ARGUMENT_RULES,
+            request=AGENT_RESPOND_TO_COUNTER_ARGUMENT.format(
+                name=agent.name,
+                original_opinion=original_opinion,
+                counter_argument=counter_argument,
+            ),
+            text_format=COUNTER_ARGUMENT_RESPONSE_FORMAT,
         )
 
-        agent.response_id = response["id"]
-        self.agents[agent.id] = agent
-
-        content = response["content"]
-        # Determine whether to maintain original opinion
-        maintains_position = "Support" in content or "support" in content
+        parsed = parse_structured(response["content"], CounterArgumentResponse)
+        if parsed:
+            maintains_position = parsed.decision == CounterArgumentDecision.SUPPORT_ORIGINAL
+            decision = "Support original opinion" if maintains_position else "Agree with counter-argument"
+            content = f"Decision: {decision}\nReason: {parsed.reason}"
+        else:
+            content = response["content"]
+            maintains_position = not re.search(r"agree with (the )?counter", content, re.IGNORECASE)
 
         logger.info(f"{agent.name} responded to counter-argument: {'Maintains original opinion' if maintains_position else 'Agrees with counter-argument'}")
         return content, response["id"], maintains_position
@@ -203,21 +451,20 @@ Reason: [Briefly state your thoughts]"""
         proposed_opinion: str,
     ) -> tuple[bool, str]:
         """Have the Agent make a final decision"""
-        prompt = AGENT_FINAL_DECISION.format(
-            name=agent.name,
-            proposed_opinion=proposed_opinion,
-        )
-
-        response = await self.openai_client.create_with_retry(
-            input_text=prompt,
-            previous_response_id=agent.response_id,
+        response = await self._call(
+            "make_final_decision", agent, Priority.HIGH,
+            rules=AGENT_FINAL_DECISION_RULES,
+            request=AGENT_FINAL_DECISION.format(name=agent.name, proposed_opinion=proposed_opinion),
+            text_format=FINAL_DECISION_FORMAT,
         )
 
-        agent.response_id = response["id"]
-        self.agents[agent.id] = agent
-
-        content = response["content"]
-        agrees = "Yes" in content or "yes" in content
+        parsed = parse_structured(response["content"], FinalDecision)
+        if parsed:
+            agrees = parsed.agrees
+            content = f"Decision: {'Yes' if agrees else 'No'}\nReason: {parsed.reason}"
+        else:
+            content = response["content"]
+            agrees = re.search(r"\byes\b", content, re.IGNORECASE) is not None
 
         logger.info(f"{agent.name}'s decision: {'Agree' if agrees else 'Disagree'}")
         return agrees, content
@@ -0,0 +1,139 @@
+"""Durable storage for discussion checkpoints"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointStore:
+    """Latest checkpoint of each discussion session
+
+    A checkpoint is a JSON-serializable dict written by the DiscussionEngine at
+    phase boundaries; saving replaces the previous checkpoint of the session.
+    """
+
+    async def save(self, session_id: str, checkpoint: dict):
+        raise NotImplementedError
+
+    async def load(self, session_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def delete(self, session_id: str):
+        raise NotImplementedError
+
+    async def list_unfinished(self) -> List[str]:
+        """IDs of sessions whose last checkpoint is not final"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release store resources"""
+
+
+class SqliteCheckpointStore(CheckpointStore):
+    """Checkpoints in a SQLite table (one row per session)"""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db_lock = threading.Lock()
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS discussion_checkpoints ("
+            "session_id TEXT PRIMARY KEY, checkpoint TEXT NOT NULL, finished INTEGER NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._db.commit()
+        logger.info(f"Checkpoint store: SQLite ({path})")
+
+    async def save(self, session_id: str, checkpoint: dict):
+        row = (session_id, json.dumps(checkpoint, ensure_ascii=False), int(checkpoint.get("finished", False)), time.time())
+        await asyncio.to_thread(self._execute, (
+            "INSERT OR REPLACE INTO discussion_checkpoints (session_id, checkpoint, finished, updated_at) "
+            "VALUES (?, ?, ?, ?)"
+        ), row)
+
+    async def load(self, session_id: str) -> Optional[dict]:
+        rows = await asyncio.to_thread(
+            self._execute, "SELECT checkpoint FROM discussion_checkpoints WHERE session_id = ?", (session_id,)
+        )
+        return json.loads(rows[0][0]) if rows else None
+
+    async def delete(self, session_id: str):
+        await asyncio.to_thread(self._execute, "DELETE FROM discussion_checkpoints WHERE session_id = ?", (session_id,))
+
+    async def list_unfinished(self) -> List[str]:
+        rows = await asyncio.to_thread(
+            self._execute, "SELECT session_id FROM discussion_checkpoints WHERE finished = 0 ORDER BY updated_at", ()
+        )
+        return [session_id for (session_id,) in rows]
+
+    def close(self):
+        with self._db_lock:
+            self._db.close()
+
+    def _execute(self, sql: str, params: tuple) -> list:
+        with self._db_lock:
+            rows = self._db.execute(sql, params).fetchall()
+            self._db.commit()
+            return rows
+
+
+class FileCheckpointStore(CheckpointStore):
+    """One JSON file per session, replaced atomically on each save"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        logger.info(f"Checkpoint store: files ({directory})")
+
+    def _path(self, session_id: str) -> Path:
+        return self.directory / f"{session_id}.json"
+
+    async def save(self, session_id: str, checkpoint: dict):
+        await asyncio.to_thread(self._write, self._path(session_id), json.dumps(checkpoint, ensure_ascii=False))
+
+    async def load(self, session_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._read, self._path(session_id))
+
+    async def delete(self, session_id: str):
+        await asyncio.to_thread(self._path(session_id).unlink, missing_ok=True)
+
+    async def list_unfinished(self) -> List[str]:
+        return await asyncio.to_thread(self._list_unfinished)
+
+    def _write(self, path: Path, text: str):
+        # Write then rename, so a crash mid-write leaves the previous checkpoint intact
+        temporary = path.with_suffix(".tmp")
+        temporary.write_text(text, encoding="utf-8")
+        os.replace(temporary, path)
+
+    def _read(self, path: Path) -> Optional[dict]:
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def _list_unfinished(self) -> List[str]:
+        paths = sorted(self.directory.glob("*.json"), key=lambda path: path.stat().st_mtime)
+        return [path.stem for path in paths if not (self._read(path) or {}).get("finished")]
+
+
+def create_checkpoint_store() -> Optional[CheckpointStore]:
+    """Create the store selected by settings.checkpoint_store"""
+    store_name = settings.checkpoint_store
+    if store_name == "sqlite":
+        try:
+            return SqliteCheckpointStore(settings.checkpoint_sqlite_path)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"SQLite checkpoint store unavailable ({e}); falling back to files")
+            return FileCheckpointStore(settings.checkpoint_dir)
+    if store_name == "file":
+        return FileCheckpointStore(settings.checkpoint_dir)
+    if store_name in ("", "none"):
+        return None
+    raise ValueError(f"Unknown checkpoint store: {store_name}")
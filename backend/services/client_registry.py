@@ -0,0 +1,132 @@
+"""Application-lifetime registry of shared LLM clients"""
+import importlib.util
+import logging
+from typing import Optional
+import httpx
+from openai import DefaultAsyncHttpxClient
+from config import settings
+from services.llm_backends import LLMBackend
+from services.mock_llm_backend import MockLLMBackend
+from services.openai_client import OpenAIResponsesClient
+from services.rate_limiter import RateLimiter
+from services.response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+
+class ClientRegistry:
+    """Holds the clients shared by every discussion session
+
+    Created once in the FastAPI lifespan hook so that all WebSocket sessions
+    reuse the same keep-alive HTTP connection pool instead of opening a new
+    AsyncOpenAI instance (and new TLS connections) per connection.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        rate_limiter: Optional[RateLimiter] = None,
+        response_cache: Optional[ResponseCache] = None,
+        backend: Optional[LLMBackend] = None,
+    ):
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed; falling back to HTTP/1.1")
+            http2 = False
+
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        # An injected backend (e.g. the mock) makes no HTTP calls, so no pool is opened that nothing would close
+        self.http_client: Optional[httpx.AsyncClient] = (
+            DefaultAsyncHttpxClient(limits=self.limits, http2=http2) if backend is None else None
+        )
+        self.rate_limiter = rate_limiter
+        self.response_cache = response_cache
+        self.openai_client = OpenAIResponsesClient(
+            api_key=api_key,
+            http_client=self.http_client,
+            rate_limiter=rate_limiter,
+            response_cache=response_cache,
+            backend=backend,
+        )
+
+        logger.info(
+            f"ClientRegistry initialized (max_connections={max_connections}, "
+            f"keepalive={max_keepalive_connections}/{keepalive_expiry}s, http2={http2}, "
+            f"backend={type(self.openai_client.backend).__name__})"
+        )
+
+    @classmethod
+    def from_settings(cls) -> "ClientRegistry":
+        """Create a registry configured from application settings"""
+        return cls(
+            api_key=settings.openai_api_key,
+            max_connections=settings.openai_max_connections,
+            max_keepalive_connections=settings.openai_max_keepalive_connections,
+            keepalive_expiry=settings.openai_keepalive_expiry,
+            http2=settings.openai_http2,
+            rate_limiter=RateLimiter(
+                requests_per_minute=settings.llm_requests_per_minute,
+                tokens_per_minute=settings.llm_tokens_per_minute,
+                max_concurrency=settings.llm_max_concurrency,
+                aging_seconds=settings.llm_priority_aging_seconds,
+            ),
+            response_cache=ResponseCache(
+                max_entries=settings.llm_cache_max_entries,
+                ttl_seconds=settings.llm_cache_ttl_seconds,
+                sqlite_path=settings.llm_cache_sqlite_path,
+                sqlite_max_entries=settings.llm_cache_sqlite_max_entries,
+            ) if settings.llm_cache_enabled else None,
+            backend=MockLLMBackend.from_settings() if settings.llm_backend == "mock" else None,
+        )
+
+    def get_metrics(self) -> dict:
+        """Connection pool saturation metrics"""
+        client = self.openai_client
+        max_connections = self.limits.max_connections or 0
+        open_connections, idle_connections = self._pool_connection_counts()
+
+        return {
+            "http2": self.http2,
+            "max_connections": max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "open_connections": open_connections,
+            "idle_connections": idle_connections,
+            "in_flight_requests": client.in_flight,
+            "peak_in_flight_requests": client.peak_in_flight,
+            "total_requests": client.total_requests,
+            "saturation": client.in_flight / max_connections if max_connections else 0.0,
+            "peak_saturation": client.peak_in_flight / max_connections if max_connections else 0.0,
+            "rate_limiter": self.rate_limiter.get_metrics() if self.rate_limiter else None,
+            "backend": type(client.backend).__name__,
+            "mock_backend": client.backend.get_stats() if isinstance(client.backend, MockLLMBackend) else None,
+        }
+
+    def _pool_connection_counts(self) -> tuple[int, int]:
+        """Count open and idle connections in the httpcore pool (best effort, private API)"""
+        transport = getattr(self.http_client, "_transport", None)
+        pool = getattr(transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return len(connections), idle
+
+    def get_cache_stats(self) -> dict:
+        """Response cache hit/miss counters"""
+        if not self.response_cache:
+            return {"enabled": False}
+        return {"enabled": True, **self.response_cache.get_stats()}
+
+    async def aclose(self):
+        """Close shared clients"""
+        await self.openai_client.close()
+        if self.response_cache:
+            self.response_cache.close()
+        logger.info("ClientRegistry closed")
@@ -0,0 +1,47 @@
+"""Incremental consensus detection for the persuasion phase"""
+import copy
+from typing import Dict, Iterable, List
+from models.message import Opinion
+
+
+class ConsensusTracker:
+    """Each agent's latest stance on each opinion, built from signals the persuasion phase already collects
+
+    Stances come from persuasion responses (Agree/Counter-argue), rebuttals
+    (a persuader agreeing with a counter-argument concedes its own opinion) and
+    final decisions. With them the engine can tell when an outcome is already
+    determined, which agents still need to be asked, and when a whole round
+    changed nothing.
+    """
+
+    def __init__(self, agent_ids: Iterable[str]):
+        self.agent_ids = list(agent_ids)
+        # opinion_id -> agent_id -> agrees
+        self.stances: Dict[str, Dict[str, bool]] = {}
+        self._round_snapshot: Dict[str, Dict[str, bool]] = {}
+
+    def record(self, opinion_id: str, agent_id: str, agrees: bool):
+        self.stances.setdefault(opinion_id, {})[agent_id] = agrees
+
+    def agreeing(self, opinion_id: str) -> List[str]:
+        stances = self.stances.get(opinion_id, {})
+        return [agent_id for agent_id in self.agent_ids if stances.get(agent_id)]
+
+    def unresolved(self, opinion_id: str) -> List[str]:
+        """Agents that have not agreed (dissenting or not yet asked)"""
+        stances = self.stances.get(opinion_id, {})
+        return [agent_id for agent_id in self.agent_ids if not stances.get(agent_id)]
+
+    def is_unanimous(self, opinion_id: str) -> bool:
+        return not self.unresolved(opinion_id)
+
+    def leading_opinion(self, opinions: List[Opinion]) -> Opinion:
+        """Opinion with the most agreeing agents (votes break ties)"""
+        return max(opinions, key=lambda op: (len(self.agreeing(op.id)), op.votes))
+
+    def start_round(self):
+        self._round_snapshot = copy.deepcopy(self.stances)
+
+    def round_changed(self) -> bool:
+        """Whether any stance changed since start_round"""
+        return self.stances != self._round_snapshot
@@ -0,0 +1,158 @@
+"""Persistent cache for retrieved background knowledge"""
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ContextCache:
+    """Cache of ContextItem results (stored as dicts) per source and normalized query
+
+    Entries younger than the source's TTL are fresh. Entries past the TTL but
+    within the stale window are still served, and the caller is told to refresh
+    them in the background (stale-while-revalidate). Anything older is a miss.
+    With a SQLite path the cache survives process restarts.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: Dict[str, float],
+        default_ttl_seconds: float = 600,
+        stale_seconds: float = 3600,
+        sqlite_path: str = "",
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.default_ttl_seconds = default_ttl_seconds
+        self.stale_seconds = stale_seconds
+        self._memory: Dict[str, tuple[float, list]] = {}
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        if sqlite_path:
+            Path(sqlite_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS context_cache ("
+                "key TEXT PRIMARY KEY, source TEXT NOT NULL, items TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+            logger.info(f"ContextCache persisted to {sqlite_path}")
+
+        # Counters
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(source: str, query: str, keywords: List[str]) -> str:
+        """Key from source plus normalized query and keywords (case, spacing and order insensitive)"""
+        normalized_query = " ".join(query.lower().split())
+        normalized_keywords = sorted({" ".join(keyword.lower().split()) for keyword in keywords if keyword.strip()})
+        payload = json.dumps([source, normalized_query, normalized_keywords], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, source: str, key: str) -> Optional[tuple[List[dict], bool]]:
+        """Look up cached items
+
+        Returns:
+            (item dicts, is_stale), or None on a miss
+        """
+        entry = self._memory.get(key)
+        if entry is None and self._db:
+            entry = await asyncio.to_thread(self._db_get, key)
+            if entry:
+                self._memory[key] = entry
+
+        if entry:
+            created_at, items_data = entry
+            age = time.time() - created_at
+            ttl = self.ttl_seconds.get(source, self.default_ttl_seconds)
+            if age < ttl + self.stale_seconds:
+                is_stale = age >= ttl
+                if is_stale:
+                    self.stale_hits += 1
+                else:
+                    self.hits += 1
+                return items_data, is_stale
+
+        self.misses += 1
+        return None
+
+    async def set(self, source: str, key: str, items_data: List[dict]):
+        """Store item dicts for a source query"""
+        now = time.time()
+        self._memory[key] = (now, items_data)
+        self._prune_memory(now)
+        if self._db:
+            await asyncio.to_thread(self._db_set, key, source, items_data, now)
+
+    def get_stats(self) -> dict:
+        """Hit/miss counters"""
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory),
+            "persistent": self._db is not None,
+        }
+
+    def _max_age(self) -> float:
+        """Age after which no source's entries can be served"""
+        return max([*self.ttl_seconds.values(), self.default_ttl_seconds]) + self.stale_seconds
+
+    def _prune_memory(self, now: float):
+        """Drop in-memory entries past their stale window"""
+        max_age = self._max_age()
+        for key in [key for key, (created_at, _) in self._memory.items() if now - created_at >= max_age]:
+            del self._memory[key]
+
+    def _db_get(self, key: str) -> Optional[tuple[float, list]]:
+        """Read an entry from SQLite (runs in a worker thread)"""
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT created_at, items FROM context_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if not row:
+            return None
+        created_at, items = row
+        return created_at, json.loads(items)
+
+    def _db_set(self, key: str, source: str, items_data: list, now: float):
+        """Write an entry to SQLite and drop entries past their stale window (runs in a worker thread)"""
+        max_age = self._max_age()
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO context_cache (key, source, items, created_at) VALUES (?, ?, ?, ?)",
+                (key, source, json.dumps(items_data, ensure_ascii=False), now),
+            )
+            self._db.execute("DELETE FROM context_cache WHERE created_at < ?", (now - max_age,))
+            self._db.commit()
+
+
+_shared_cache: Optional[ContextCache] = None
+
+
+def get_shared_context_cache() -> Optional[ContextCache]:
+    """Process-wide context cache built from settings (None when disabled)"""
+    global _shared_cache
+    if not settings.context_cache_enabled:
+        return None
+    if _shared_cache is None:
+        _shared_cache = ContextCache(
+            ttl_seconds={
+                "notion": settings.context_cache_notion_ttl_seconds,
+                "slack": settings.context_cache_slack_ttl_seconds,
+                "atlassian": settings.context_cache_atlassian_ttl_seconds,
+            },
+            stale_seconds=settings.context_cache_stale_seconds,
+            sqlite_path=settings.context_cache_sqlite_path,
+        )
+    return _shared_cache
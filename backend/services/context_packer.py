@@ -0,0 +1,124 @@
+"""Relevance ranking and token-budgeted packing of background knowledge"""
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from services.context_retriever import ContextItem
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+_CJK_PATTERN = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]+")
+
+
+def estimate_prompt_tokens(text: str) -> int:
+    """Rough token count (about 4 ASCII characters per token, 1 token per other character)"""
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word terms plus character bigrams for CJK text (which has no spaces)"""
+    text = text.lower()
+    terms = _WORD_PATTERN.findall(text)
+    for run in _CJK_PATTERN.findall(text):
+        if len(run) == 1:
+            terms.append(run)
+        terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+@dataclass
+class ContextChunk:
+    """A piece of a ContextItem considered for packing"""
+    item_index: int
+    chunk_index: int
+    text: str
+    tokens: int
+    score: float = 0.0
+
+
+class ContextPacker:
+    """Select the background knowledge chunks most relevant to a query within a token budget
+
+    Items are split into paragraph-based chunks, scored with BM25 against the
+    query, and taken greedily by score until the budget is used. Selected
+    chunks are returned in their original document order.
+    """
+
+    K1 = 1.5
+    B = 0.75
+
+    def __init__(self, chunk_chars: int = 800):
+        self.chunk_chars = chunk_chars
+
+    def chunk(self, contexts: List["ContextItem"]) -> List[ContextChunk]:
+        """Split every item into chunks of at most chunk_chars (paragraphs are kept together where possible)"""
+        chunks = []
+        for item_index, ctx in enumerate(contexts):
+            current = ""
+            chunk_index = 0
+            for paragraph in self._split(ctx.content):
+                if current and len(current) + len(paragraph) + 1 > self.chunk_chars:
+                    chunks.append(ContextChunk(item_index, chunk_index, current, estimate_prompt_tokens(current)))
+                    chunk_index += 1
+                    current = ""
+                current = f"{current}\n{paragraph}" if current else paragraph
+            if current:
+                chunks.append(ContextChunk(item_index, chunk_index, current, estimate_prompt_tokens(current)))
+        return chunks
+
+    def pack(self, contexts: List["ContextItem"], query: str, token_budget: int) -> List[ContextChunk]:
+        """Rank chunks by BM25 relevance to the query and keep the best ones that fit the budget"""
+        chunks = self.chunk(contexts)
+        if not chunks:
+            return []
+
+        # Item titles count towards each chunk's relevance
+        documents = [tokenize(f"{contexts[chunk.item_index].title} {chunk.text}") for chunk in chunks]
+        self._score(chunks, documents, tokenize(query))
+
+        selected = []
+        used = 0
+        for chunk in sorted(chunks, key=lambda c: (-c.score, c.item_index, c.chunk_index)):
+            if used + chunk.tokens > token_budget:
+                continue
+            selected.append(chunk)
+            used += chunk.tokens
+
+        return sorted(selected, key=lambda c: (c.item_index, c.chunk_index))
+
+    def _score(self, chunks: List[ContextChunk], documents: List[List[str]], query_terms: List[str]):
+        """Assign Okapi BM25 scores"""
+        document_count = len(documents)
+        average_length = sum(len(doc) for doc in documents) / document_count or 1
+        document_frequency = Counter()
+        for doc in documents:
+            document_frequency.update(set(doc))
+
+        query_counts = Counter(query_terms)
+        for chunk, doc in zip(chunks, documents):
+            term_counts = Counter(doc)
+            score = 0.0
+            for term in query_counts:
+                frequency = term_counts.get(term, 0)
+                if not frequency:
+                    continue
+                idf = math.log(1 + (document_count - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+                score += idf * frequency * (self.K1 + 1) / (
+                    frequency + self.K1 * (1 - self.B + self.B * len(doc) / average_length)
+                )
+            chunk.score = score
+
+    def _split(self, text: str) -> List[str]:
+        """Split text into paragraphs, hard-wrapping any longer than chunk_chars"""
+        pieces = []
+        for paragraph in text.split("\n"):
+            paragraph = paragraph.strip()
+            while len(paragraph) > self.chunk_chars:
+                pieces.append(paragraph[:self.chunk_chars])
+                paragraph = paragraph[self.chunk_chars:]
+            if paragraph:
+                pieces.append(paragraph)
+        return pieces
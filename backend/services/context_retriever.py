@@ -1,14 +1,25 @@
 """Service for retrieving background knowledge (Dedalus Labs MCP integration)"""
+import asyncio
 import logging
 import os
 from pathlib import Path
-from typing import List, Dict, Optional
-from dataclasses import dataclass
+from typing import List, Dict, Optional, Callable, Awaitable, Set
+from dataclasses import dataclass, asdict
 from dedalus_labs import AsyncDedalus
 from config import settings
+from services.context_cache import ContextCache, get_shared_context_cache
+from services.context_packer import ContextPacker
+from services.metrics import metrics
+from services.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
+CONTEXT_DEADLINE_MISSES = metrics.counter(
+    "context_source_deadline_misses_total",
+    "Context source queries that missed their deadline",
+    label_names=("source",),
+)
+
 
 @dataclass
 class ContextItem:
@@ -23,10 +34,18 @@ class ContextItem:
 class ContextRetriever:
     """Retrieve background knowledge from multiple MCP services using Dedalus Labs"""
 
-    def __init__(self, use_mock: bool = True):
+    def __init__(self, use_mock: bool = True, cache: Optional[ContextCache] = None):
         self.enabled = settings.enable_context_retrieval
         self.use_mock = use_mock  # Mock data usage flag
         self.dedalus_client: Optional[AsyncDedalus] = None
+        # Source results cache (shared across sessions unless given explicitly)
+        self.cache = cache or get_shared_context_cache()
+        # Cache keys being refreshed in the background, and the refresh tasks
+        self._refreshing: Set[str] = set()
+        self._refresh_tasks: Set[asyncio.Task] = set()
+        self.packer = ContextPacker(chunk_chars=settings.context_chunk_chars)
+        # Background tasks waiting for sources that missed their deadline
+        self._late_tasks: Set[asyncio.Task] = set()
 
         if self.enabled and settings.dedalus_api_key and not use_mock:
             self.dedalus_client = AsyncDedalus(
@@ -39,45 +58,182 @@ class ContextRetriever:
             else:
                 logger.warning("ContextRetriever disabled or missing API key")
 
-    async def retrieve_context(self, topic: str, keywords: List[str]) -> List[ContextItem]:
+    @classmethod
+    def from_settings(cls, cache: Optional[ContextCache] = None) -> "ContextRetriever":
+        """Create a retriever reading from the source selected by settings.context_retrieval_source"""
+        source = settings.context_retrieval_source
+        if source == "auto":
+            has_source = settings.notion_token or settings.slack_bot_token or settings.atlassian_api_token
+            source = "dedalus" if settings.dedalus_api_key and has_source else "mock"
+        if source not in ("mock", "dedalus"):
+            raise ValueError(f"Unknown context retrieval source: {source}")
+        return cls(use_mock=source == "mock", cache=cache)
+
+    async def retrieve_context(
+        self,
+        topic: str,
+        keywords: List[str],
+        on_late_results: Optional[Callable[[List[ContextItem]], Awaitable[None]]] = None,
+    ) -> List[ContextItem]:
         """
         Retrieve background knowledge based on discussion topic and keywords
 
+        All enabled sources are queried concurrently. Each source has its own
+        deadline; results from sources that miss it are delivered later through
+        on_late_results (or dropped if no callback is given), so a slow source
+        never blocks the caller.
+
         Args:
             topic: Discussion topic
             keywords: Keywords extracted from topic
+            on_late_results: Called with each late source's results once they arrive
 
         Returns:
-            List of retrieved context information
+            List of context information retrieved within the deadlines
         """
         # Use mock data
         if self.use_mock:
-            return await self._retrieve_from_mock()
+            with tracer.span("context.source", source="mock") as span:
+                contexts = await self._retrieve_from_mock()
+                span.set_attribute("item_count", len(contexts))
+                return contexts
 
         if not self.enabled or not self.dedalus_client:
             logger.info("Context retrieval is disabled")
             return []
 
-        contexts = []
-
-        # Retrieve information from Notion
+        sources = []
         if settings.notion_token:
-            notion_contexts = await self._retrieve_from_notion(topic, keywords)
-            contexts.extend(notion_contexts)
-
-        # Retrieve information from Slack
+            sources.append(("notion", self._retrieve_from_notion, settings.context_notion_deadline_seconds))
         if settings.slack_bot_token:
-            slack_contexts = await self._retrieve_from_slack(topic, keywords)
-            contexts.extend(slack_contexts)
-
-        # Retrieve information from Atlassian
+            sources.append(("slack", self._retrieve_from_slack, settings.context_slack_deadline_seconds))
         if settings.atlassian_api_token:
-            atlassian_contexts = await self._retrieve_from_atlassian(topic, keywords)
-            contexts.extend(atlassian_contexts)
+            sources.append(("atlassian", self._retrieve_from_atlassian, settings.context_atlassian_deadline_seconds))
+
+        tasks = [
+            asyncio.create_task(self._fetch_source(name, fetch, topic, keywords))
+            for name, fetch, _ in sources
+        ]
+        results = await asyncio.gather(*[
+            self._wait_for_source(name, task, deadline, on_late_results)
+            for (name, _, deadline), task in zip(sources, tasks)
+        ])
+
+        contexts = []
+        for source_contexts in results:
+            contexts.extend(source_contexts)
 
         logger.info(f"Retrieved {len(contexts)} context items for topic: {topic}")
         return contexts
 
+    async def _fetch_source(
+        self,
+        name: str,
+        fetch: Callable[[str, List[str]], Awaitable[List[ContextItem]]],
+        topic: str,
+        keywords: List[str],
+    ) -> List[ContextItem]:
+        """Fetch from a source through the cache (stale entries are served and refreshed in the background)"""
+        with tracer.span("context.source", source=name, query_length=len(topic)) as span:
+            contexts, cache_status = await self._fetch_source_cached(name, fetch, topic, keywords)
+            span.set_attributes(cache=cache_status, item_count=len(contexts))
+            return contexts
+
+    async def _fetch_source_cached(
+        self,
+        name: str,
+        fetch: Callable[[str, List[str]], Awaitable[List[ContextItem]]],
+        topic: str,
+        keywords: List[str],
+    ) -> tuple[List[ContextItem], str]:
+        """Returns (items, cache status: disabled, hit, stale or miss)"""
+        if not self.cache:
+            return await fetch(topic, keywords), "disabled"
+
+        key = ContextCache.make_key(name, topic, keywords)
+        cached = await self.cache.get(name, key)
+        if cached is not None:
+            items_data, is_stale = cached
+            if is_stale and key not in self._refreshing:
+                self._refreshing.add(key)
+                refresh_task = asyncio.create_task(self._refresh_source(name, fetch, topic, keywords, key))
+                self._refresh_tasks.add(refresh_task)
+                refresh_task.add_done_callback(self._refresh_tasks.discard)
+            logger.info(f"Context cache {'stale ' if is_stale else ''}hit for {name}")
+            return [ContextItem(**item) for item in items_data], "stale" if is_stale else "hit"
+
+        contexts = await fetch(topic, keywords)
+        # Failed fetches return an empty list; don't cache those
+        if contexts:
+            await self.cache.set(name, key, [asdict(ctx) for ctx in contexts])
+        return contexts, "miss"
+
+    async def _refresh_source(
+        self,
+        name: str,
+        fetch: Callable[[str, List[str]], Awaitable[List[ContextItem]]],
+        topic: str,
+        keywords: List[str],
+        key: str,
+    ):
+        """Re-fetch a stale cache entry"""
+        try:
+            contexts = await fetch(topic, keywords)
+            if contexts:
+                await self.cache.set(name, key, [asdict(ctx) for ctx in contexts])
+                logger.info(f"Refreshed stale context cache entry for {name}")
+        finally:
+            self._refreshing.discard(key)
+
+    async def _wait_for_source(
+        self,
+        name: str,
+        task: asyncio.Task,
+        deadline: float,
+        on_late_results: Optional[Callable[[List[ContextItem]], Awaitable[None]]],
+    ) -> List[ContextItem]:
+        """Wait for a source until its deadline, handing it off for late delivery if it misses it"""
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout=deadline)
+        except asyncio.TimeoutError:
+            CONTEXT_DEADLINE_MISSES.inc(source=name)
+            if not on_late_results:
+                logger.warning(f"{name} missed its {deadline}s deadline; dropping its results")
+                task.cancel()
+                return []
+
+            logger.info(f"{name} missed its {deadline}s deadline; results will be delivered late")
+            late_task = asyncio.create_task(self._deliver_late_results(name, task, on_late_results))
+            self._late_tasks.add(late_task)
+            late_task.add_done_callback(self._late_tasks.discard)
+            return []
+
+    async def _deliver_late_results(
+        self,
+        name: str,
+        task: asyncio.Task,
+        on_late_results: Callable[[List[ContextItem]], Awaitable[None]],
+    ):
+        """Wait (bounded) for a slow source and pass its results to the callback"""
+        try:
+            contexts = await asyncio.wait_for(task, timeout=settings.context_late_results_timeout_seconds)
+        except asyncio.TimeoutError:
+            logger.warning(f"{name} did not respond within the late results timeout")
+            return
+        except Exception as e:
+            # Retrieves the exception, which would otherwise only be reported when the task is collected
+            logger.warning(f"{name} failed after missing its deadline: {e}")
+            return
+
+        if contexts:
+            logger.info(f"Delivering {len(contexts)} late context items from {name}")
+            await on_late_results(contexts)
+
+    def cancel_late_results(self):
+        """Stop waiting for late source results (e.g. when the discussion has finished)"""
+        for task in list(self._late_tasks):
+            task.cancel()
+
     async def _retrieve_from_mock(self) -> List[ContextItem]:
         """Load background knowledge from mock data file"""
         try:
@@ -362,16 +518,31 @@ class ContextRetriever:
 
         return contexts
 
-    def format_contexts_for_prompt(self, contexts: List[ContextItem]) -> str:
+    def format_contexts_for_prompt(
+        self,
+        contexts: List[ContextItem],
+        query: Optional[str] = None,
+        token_budget: Optional[int] = None,
+    ) -> str:
         """
         Format retrieved contexts into a string for embedding in prompts
 
+        When a query is given, only the chunks most relevant to it (BM25) are
+        included, up to token_budget (defaults to settings.context_token_budget;
+        0 disables packing).
+
         Returns:
             Formatted context string
         """
         if not contexts:
             return ""
 
+        if token_budget is None:
+            token_budget = settings.context_token_budget
+
+        if query and token_budget > 0:
+            return self._format_packed_contexts(contexts, query, token_budget)
+
         formatted = ["## Background Knowledge\n"]
 
         for ctx in contexts:
@@ -381,3 +552,25 @@ class ContextRetriever:
                 formatted.append(f"URL: {ctx.url}\n")
 
         return "\n".join(formatted)
+
+    def _format_packed_contexts(self, contexts: List[ContextItem], query: str, token_budget: int) -> str:
+        """Format only the chunks selected for the query, grouped under their item headings"""
+        chunks = self.packer.pack(contexts, query, token_budget)
+        if not chunks:
+            return ""
+
+        formatted = ["## Background Knowledge\n"]
+        current_item_index = None
+        for chunk in chunks:
+            ctx = contexts[chunk.item_index]
+            if chunk.item_index != current_item_index:
+                if current_item_index is not None and contexts[current_item_index].url:
+                    formatted.append(f"URL: {contexts[current_item_index].url}\n")
+                formatted.append(f"### [{ctx.source.upper()}] {ctx.title}")
+                current_item_index = chunk.item_index
+            formatted.append(f"{chunk.text}\n")
+
+        if contexts[current_item_index].url:
+            formatted.append(f"URL: {contexts[current_item_index].url}\n")
+
+        return "\n".join(formatted)
@@ -1,19 +1,66 @@
 """Discussion flow control engine"""
+import copy
 import uuid
 import asyncio
-from typing import List, Dict, Callable, Awaitable, Optional
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import partial
+from typing import List, Dict, Callable, Awaitable, Optional, AsyncIterator, Any
 from collections import Counter
 from models.discussion import DiscussionSession, AgendaItem, DiscussionPhase
 from models.agent import Agent
 from models.message import Message, Opinion, MessageType
 from services.facilitator import Facilitator
 from services.agent_manager import AgentManager
-from services.context_retriever import ContextRetriever
+from services.context_retriever import ContextRetriever, ContextItem
+from services.startup_pipeline import StartupPipeline
+from services.checkpoint_store import CheckpointStore
+from services.consensus_tracker import ConsensusTracker
+from services.metrics import metrics
+from services.tracing import tracer
+from services.usage_tracker import UsageTracker, track_usage
+from config import settings
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
+CONSENSUS_CHECKS = metrics.counter(
+    "consensus_checks_total",
+    "Consensus checks by how they were resolved",
+    label_names=("outcome",),
+)
+
+# Agenda item the current task is discussing (tags its messages with agenda_index)
+_current_agenda_index: ContextVar[Optional[int]] = ContextVar("current_agenda_index", default=None)
+
+
+@dataclass
+class AgendaItemRun:
+    """State of one agenda item's opinions/voting/persuasion pipeline
+
+    In concurrent mode each item gets its own copies of the agents, so every
+    item continues an independent fork of their conversation chains.
+    `step` is the last completed phase ("pending", "opinions", "voting" or
+    "completed"), from which a resumed discussion continues. During
+    persuasion, `persuasion_round`, `stances` (the consensus tracker's
+    state) and `stalled_rounds` (consecutive rounds in which no stance
+    changed) record the last completed round.
+    """
+    index: int
+    item: AgendaItem
+    agents: List[Agent]
+    step: str = "pending"
+    opinions: List[Opinion] = field(default_factory=list)
+    persuasion_round: int = 0
+    stances: Dict[str, Dict[str, bool]] = field(default_factory=dict)
+    stalled_rounds: int = 0
+    # Phase the item is in (None until its discussion starts)
+    phase: Optional[DiscussionPhase] = None
+
+    def get_agent(self, agent_id: str) -> Optional[Agent]:
+        return next((agent for agent in self.agents if agent.id == agent_id), None)
+
 
 class DiscussionEngine:
     """Discussion flow control engine"""
@@ -24,40 +71,193 @@ class DiscussionEngine:
         agent_manager: AgentManager,
         message_callback: Callable[[Dict], Awaitable[None]],
         context_retriever: Optional[ContextRetriever] = None,
+        persuasion_concurrency: Optional[int] = None,
+        streaming: Optional[bool] = None,
+        agenda_concurrency: Optional[int] = None,
+        stalemate_rounds: Optional[int] = None,
+        checkpoint_store: Optional[CheckpointStore] = None,
+        event_seq: Optional[Callable[[], int]] = None,
     ):
         self.facilitator = facilitator
         self.agent_manager = agent_manager
         self.message_callback = message_callback
-        self.context_retriever = context_retriever or ContextRetriever()
+        self.context_retriever = context_retriever or ContextRetriever.from_settings()
+        # Maximum number of in-flight LLM calls during persuasion (1 = sequential)
+        self.persuasion_concurrency = max(1, persuasion_concurrency or settings.persuasion_concurrency)
+        # Maximum number of agenda items discussed at the same time (1 = one after another)
+        self.agenda_concurrency = max(1, agenda_concurrency or settings.agenda_concurrency)
+        # Consecutive rounds without a stance change that end persuasion (0 = never)
+        self.stalemate_rounds = max(
+            0, settings.persuasion_stalemate_rounds if stalemate_rounds is None else stalemate_rounds
+        )
+        # Forward LLM text deltas as message_delta events
+        self.streaming = settings.enable_streaming if streaming is None else streaming
         self.session: Optional[DiscussionSession] = None
         self.agents: List[Agent] = []
         self.background_context: str = ""
-
-    async def start_discussion(self, topic: str) -> DiscussionSession:
+        self.context_items: List[ContextItem] = []
+        # Background knowledge prepared for each agenda item (by agenda index)
+        self.agenda_context_items: List[List[ContextItem]] = []
+        self.agenda_contexts: List[str] = []
+        self.startup_durations: Dict[str, float] = {}
+        self.usage: Optional[UsageTracker] = None
+        # Per-agenda-item progress (created once startup has finished)
+        self.runs: List[AgendaItemRun] = []
+        # Session state is saved here at phase boundaries so a discussion can be resumed
+        self.checkpoint_store = checkpoint_store
+        self._checkpoint_lock = asyncio.Lock()
+        # Times this session has been resumed from a checkpoint
+        self.resume_attempts = 0
+        # Seq of the last event sent (saved with checkpoints so a resumed log continues after it)
+        self.event_seq = event_seq
+
+    async def start_discussion(self, topic: str, session_id: Optional[str] = None) -> DiscussionSession:
         """Start discussion"""
-        session_id = f"session_{uuid.uuid4().hex[:8]}"
+        session_id = session_id or f"session_{uuid.uuid4().hex[:8]}"
         self.session = DiscussionSession(
             id=session_id,
             topic=topic,
         )
+        self.usage = self._create_usage_tracker(session_id)
+
+        try:
+            with tracer.span("discussion", session_id=session_id, topic_length=len(topic)) as span, track_usage(self.usage):
+                await self._run_discussion(topic)
+                span.set_attributes(
+                    agenda_items=len(self.session.agenda),
+                    agents=len(self.agents),
+                    total_tokens=self.usage.total.total_tokens,
+                )
+        finally:
+            # Late context can no longer be used (the discussion completed, failed or was cancelled)
+            self.context_retriever.cancel_late_results()
+
+        return self.session
+
+    async def resume_discussion(self, checkpoint: dict) -> DiscussionSession:
+        """Continue a discussion from a checkpoint, skipping the phases it had completed
+
+        Agents keep their saved response_id chains, so they remember the
+        discussion so far.
+        """
+        self._restore_checkpoint(checkpoint)
+        self.resume_attempts = checkpoint.get("resume_attempts", 0) + 1
+        self.usage = self._create_usage_tracker(self.session.id)
+        self.usage.restore(checkpoint.get("usage") or {})
+        # Count the attempt before any LLM call, so a checkpoint that cannot be resumed is eventually given up
+        await self._checkpoint(progressed=False)
+
+        try:
+            with tracer.span("discussion", session_id=self.session.id, resumed=True) as span, track_usage(self.usage):
+                await self._send_event("discussion_resumed", {
+                    "discussion_id": self.session.id,
+                    "topic": self.session.topic,
+                    "agenda_index": self.session.current_agenda_index,
+                })
+                await self._send_event("agenda_created", {
+                    "agenda": [item.model_dump() for item in self.session.agenda],
+                })
+                await self._send_event("agents_created", {
+                    "agents": [agent.model_dump() for agent in self.agents],
+                })
+                logger.info(
+                    f"Resuming {self.session.id}: "
+                    f"{sum(run.step == 'completed' for run in self.runs)}/{len(self.runs)} agenda items completed"
+                )
+
+                await self._discuss_agenda()
+                await self._complete_discussion()
+                span.set_attributes(
+                    agenda_items=len(self.session.agenda),
+                    agents=len(self.agents),
+                    total_tokens=self.usage.total.total_tokens,
+                )
+        finally:
+            self.context_retriever.cancel_late_results()
+
+        return self.session
+
+    def _create_usage_tracker(self, session_id: str) -> UsageTracker:
+        return UsageTracker(
+            session_id,
+            token_budget=settings.session_token_budget,
+            on_update=partial(self._send_event, "usage_update"),
+            update_interval=settings.usage_update_interval_seconds,
+        )
 
+    async def _run_discussion(self, topic: str):
+        """Run the whole discussion for the current session"""
         await self._send_event("discussion_started", {
-            "discussion_id": session_id,
+            "discussion_id": self.session.id,
             "topic": topic,
         })
 
-        # Initialize facilitator
+        # Run startup stages as a dependency graph so independent work overlaps:
+        # source queries start while the facilitator is initialized, and
+        # per-agenda-item context is prefetched while agents are generated.
+        pipeline = StartupPipeline()
+        pipeline.add_stage(
+            "context",
+            lambda: self._retrieve_background_context(topic, on_late_results=self._on_late_context),
+        )
+        pipeline.add_stage("facilitator", self._initialize_facilitator)
+        pipeline.add_stage(
+            "agenda",
+            lambda context, facilitator: self._create_agenda(topic, context),
+            depends_on=["context", "facilitator"],
+        )
+        pipeline.add_stage(
+            "agents",
+            lambda agenda: self._generate_agents(topic, agenda),
+            depends_on=["agenda"],
+        )
+        pipeline.add_stage(
+            "agenda_contexts",
+            self._prefetch_agenda_contexts,
+            depends_on=["agenda"],
+        )
+
+        results = await pipeline.run()
+        self.agents = results["agents"]
+        self.startup_durations = pipeline.durations
+        self._create_runs()
+        await self._checkpoint()
+
+        await self._discuss_agenda()
+        await self._complete_discussion()
+
+    async def _complete_discussion(self):
+        """Announce the end of the discussion and its conclusion"""
+        self.session.phase = DiscussionPhase.COMPLETED
+        await self._send_message(
+            agent=self.facilitator.agent,
+            content=f"Agreement has been reached on all agenda items.",
+            message_type=MessageType.SYSTEM,
+        )
+
+        self.session.final_conclusion = self._generate_final_conclusion()
+        await self._checkpoint(finished=True)
+        await self.usage.flush()
+        await self._send_event("discussion_completed", {
+            "final_conclusion": self.session.final_conclusion,
+            "usage": self.usage.snapshot(),
+        })
+
+    async def _initialize_facilitator(self):
+        """Startup stage: initialize the facilitator"""
         self.facilitator.initialize()
 
-        # Retrieve background knowledge
         await self._send_message(
             agent=self.facilitator.agent,
             content="Collecting relevant background knowledge...",
             message_type=MessageType.SYSTEM,
         )
 
-        context_items = await self._retrieve_background_context(topic)
-        self.background_context = self.context_retriever.format_contexts_for_prompt(context_items)
+    async def _create_agenda(self, topic: str, context_items: List[ContextItem]) -> List[AgendaItem]:
+        """Startup stage: create the agenda from the topic and background knowledge"""
+        # Late results may already have arrived while the facilitator was starting up
+        self.context_items = self._merge_context_items(context_items, self.context_items)
+        self.background_context = self.context_retriever.format_contexts_for_prompt(self.context_items)
 
         if context_items:
             await self._send_event("context_retrieved", {
@@ -78,19 +278,31 @@ class DiscussionEngine:
             message_type=MessageType.SYSTEM,
         )
 
-        # Disable streaming for now (prioritize stability)
+        agenda_message_id, on_agenda_delta = self._message_stream(self.facilitator.agent, MessageType.SYSTEM)
         agenda = await self.facilitator.create_agenda_with_context(
             topic,
             self.background_context,
-            on_stream=None,
+            on_stream=on_agenda_delta,
+            on_item=self._on_agenda_item_created,
         )
         self.session.agenda = agenda
 
+        if on_agenda_delta:
+            # Replace the streamed raw output with a readable agenda
+            await self._send_message(
+                agent=self.facilitator.agent,
+                content="Agenda:\n" + "\n".join(f"{item.order}. {item.title}" for item in agenda),
+                message_type=MessageType.SYSTEM,
+                message_id=agenda_message_id,
+            )
+
         await self._send_event("agenda_created", {
             "agenda": [item.model_dump() for item in agenda],
         })
+        return agenda
 
-        # Generate agents
+    async def _generate_agents(self, topic: str, agenda: List[AgendaItem]) -> List[Agent]:
+        """Startup stage: generate participating agents"""
         self.session.phase = DiscussionPhase.AGENT_GENERATION
         await self._send_message(
             agent=self.facilitator.agent,
@@ -98,61 +310,223 @@ class DiscussionEngine:
             message_type=MessageType.SYSTEM,
         )
 
-        self.agents = await self.facilitator.generate_agents(topic, agenda)
+        agents = await self.facilitator.generate_agents(
+            topic,
+            agenda,
+            on_agent=self._on_agent_created,
+        )
 
         await self._send_event("agents_created", {
-            "agents": [agent.model_dump() for agent in self.agents],
+            "agents": [agent.model_dump() for agent in agents],
         })
+        return agents
+
+    async def _prefetch_agenda_contexts(self, agenda: List[AgendaItem]):
+        """Startup stage: prepare the background knowledge for each agenda item
+
+        With prefetch_agenda_context enabled, each item's own title is also queried
+        (concurrently) and merged with the topic-level results.
+        """
+        item_results = [[] for _ in agenda]
+        if settings.prefetch_agenda_context:
+            item_results = await asyncio.gather(*[
+                self._retrieve_background_context(f"{item.title} {item.description}")
+                for item in agenda
+            ])
+
+        self.agenda_context_items = [
+            self._merge_context_items(self.context_items, item_context_items)
+            for item_context_items in item_results
+        ]
+        self.agenda_contexts = [
+            self._format_agenda_context(item, items)
+            for item, items in zip(agenda, self.agenda_context_items)
+        ]
+
+    async def _on_late_context(self, context_items: List[ContextItem]):
+        """Add context from a source that missed its deadline to the remaining discussion"""
+        self.context_items = self._merge_context_items(self.context_items, context_items)
+        self.background_context = self.context_retriever.format_contexts_for_prompt(self.context_items)
+
+        # Items whose opinions have not been generated yet pick up the new context; the others
+        # keep what their opinions were based on
+        for idx, items in enumerate(self.agenda_context_items):
+            if not self._awaiting_opinions(idx):
+                continue
+            self.agenda_context_items[idx] = self._merge_context_items(items, context_items)
+            self.agenda_contexts[idx] = self._format_agenda_context(
+                self.session.agenda[idx], self.agenda_context_items[idx]
+            )
 
-        # Discuss each agenda item
-        for idx, agenda_item in enumerate(self.session.agenda):
-            self.session.current_agenda_index = idx
-            await self._discuss_agenda_item(agenda_item)
+        if self.facilitator.agent is None:
+            return
 
-        # Discussion complete
-        self.session.phase = DiscussionPhase.COMPLETED
+        await self._send_event("context_updated", {
+            "count": len(context_items),
+            "total": len(self.context_items),
+            "sources": list(set(ctx.source for ctx in context_items)),
+        })
         await self._send_message(
             agent=self.facilitator.agent,
-            content=f"Agreement has been reached on all agenda items.",
+            content=f"Received {len(context_items)} additional pieces of relevant information",
             message_type=MessageType.SYSTEM,
         )
 
-        await self._send_event("discussion_completed", {
-            "final_conclusion": self._generate_final_conclusion(),
-        })
-
-        return self.session
-
-    async def _discuss_agenda_item(self, agenda_item: AgendaItem):
-        """Discuss individual agenda item"""
-        await self._send_message(
-            agent=self.facilitator.agent,
-            content=f"Agenda {agenda_item.order}: {agenda_item.title}",
-            message_type=MessageType.SYSTEM,
+    def _awaiting_opinions(self, agenda_index: int) -> bool:
+        """Whether an agenda item's opinion phase has not started yet (all items during startup)"""
+        if agenda_index >= len(self.runs):
+            return True
+        run = self.runs[agenda_index]
+        return run.step == "pending" and run.phase is None
+
+    def _format_agenda_context(self, agenda_item: AgendaItem, context_items: List[ContextItem]) -> str:
+        """Pack the background knowledge most relevant to an agenda item into its token budget"""
+        return self.context_retriever.format_contexts_for_prompt(
+            context_items,
+            query=f"{agenda_item.title} {agenda_item.description}",
         )
 
-        # Phase 1: Independent opinions
-        opinions = await self._run_independent_opinions_phase(agenda_item)
+    def _merge_context_items(
+        self,
+        base: List[ContextItem],
+        additional: List[ContextItem],
+    ) -> List[ContextItem]:
+        """Append context items not already present (by source and title)"""
+        merged = list(base)
+        seen = {(ctx.source, ctx.title) for ctx in merged}
+        for ctx in additional:
+            if (ctx.source, ctx.title) not in seen:
+                seen.add((ctx.source, ctx.title))
+                merged.append(ctx)
+        return merged
+
+    async def _on_agenda_item_created(self, agenda_item: AgendaItem):
+        """Notify each agenda item as soon as it is parsed from the stream"""
+        await self._send_event("agenda_item_created", {
+            "agenda_item": agenda_item.model_dump(),
+        })
 
-        # Phase 2: Voting
-        opinions = await self._run_voting_phase(opinions)
+    async def _on_agent_created(self, agent: Agent):
+        """Notify each participant as soon as it is parsed from the stream"""
+        await self._send_event("agent_created", {
+            "agent": agent.model_dump(),
+        })
 
-        # Phase 3: Persuasion process
-        conclusion = await self._run_persuasion_phase(opinions, agenda_item)
+    def _create_runs(self):
+        """Set up each agenda item's pipeline once the agenda and agents exist"""
+        self.runs = [
+            AgendaItemRun(idx, agenda_item, self._agents_for_item())
+            for idx, agenda_item in enumerate(self.session.agenda)
+        ]
+
+    def _set_phase(self, run: AgendaItemRun, phase: DiscussionPhase):
+        """Move an agenda item to a phase
+
+        The session's own phase and current_agenda_index follow the earliest
+        unfinished item, so with concurrent items they are not overwritten by
+        whichever item changed phase last.
+        """
+        run.phase = phase
+        self._sync_session_progress()
+
+    def _sync_session_progress(self):
+        """Point the session at the earliest agenda item not completed yet"""
+        unfinished = [run for run in self.runs if run.step != "completed"]
+        if not unfinished:
+            return
+        self.session.current_agenda_index = unfinished[0].index
+        if unfinished[0].phase is not None:
+            self.session.phase = unfinished[0].phase
+
+    def _agents_for_item(self) -> List[Agent]:
+        """Sequential items share the agents; concurrent items work on forks of their chains"""
+        if self.agenda_concurrency == 1:
+            return self.agents
+        return [agent.model_copy(deep=True) for agent in self.agents]
+
+    async def _discuss_agenda(self):
+        """Discuss every agenda item not completed yet, one after another or up to agenda_concurrency at a time
+
+        Sequential items share the agents' conversation chains, so later items
+        build on earlier discussions. Concurrent items each fork the chains from
+        the end of startup and never see each other's discussions.
+        """
+        runs = [run for run in self.runs if run.step != "completed"]
+        try:
+            if self.agenda_concurrency == 1:
+                for run in runs:
+                    await self._discuss_agenda_item(run)
+                return
+
+            semaphore = asyncio.Semaphore(self.agenda_concurrency)
+
+            async def discuss(run: AgendaItemRun):
+                async with semaphore:
+                    await self._discuss_agenda_item(run)
+
+            tasks = [asyncio.create_task(discuss(run)) for run in runs]
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    if not task.done():
+                        task.cancel()
+        finally:
+            # Summaries still being written can no longer be used
+            self.agent_manager.cancel_compactions()
+
+    async def _discuss_agenda_item(self, run: AgendaItemRun):
+        """Discuss individual agenda item"""
+        token = _current_agenda_index.set(run.index)
+        try:
+            await self._send_message(
+                agent=self.facilitator.agent,
+                content=f"Agenda {run.item.order}: {run.item.title}",
+                message_type=MessageType.SYSTEM,
+            )
 
-        agenda_item.conclusion = conclusion
-        await self._send_event("agenda_completed", {
-            "agenda_index": self.session.current_agenda_index,
-            "conclusion": conclusion,
-        })
+            # Phases completed before a resume are skipped
+            with tracer.span("discussion.agenda_item", agenda_index=run.index):
+                # Phase 1: Independent opinions
+                if run.step == "pending":
+                    with tracer.span("phase.opinions", phase="opinions") as span:
+                        run.opinions = await self._run_independent_opinions_phase(run)
+                        span.set_attribute("opinions", len(run.opinions))
+                    run.step = "opinions"
+                    self._compact_contexts(run)
+                    await self._checkpoint()
+
+                # Phase 2: Voting
+                if run.step == "opinions":
+                    with tracer.span("phase.voting", phase="voting"):
+                        run.opinions = await self._run_voting_phase(run, run.opinions)
+                    run.step = "voting"
+                    self._compact_contexts(run)
+                    await self._checkpoint()
+
+                # Phase 3: Persuasion process
+                with tracer.span("phase.persuasion", phase="persuasion"):
+                    conclusion = await self._run_persuasion_phase(run, run.opinions)
+
+            run.item.conclusion = conclusion
+            run.step = "completed"
+            self._set_phase(run, DiscussionPhase.COMPLETED)
+            self._compact_contexts(run)
+            await self._checkpoint()
+            await self._send_event("agenda_completed", {
+                "agenda_index": run.index,
+                "conclusion": conclusion,
+            })
+        finally:
+            _current_agenda_index.reset(token)
 
-    async def _run_independent_opinions_phase(self, agenda_item: AgendaItem) -> List[Opinion]:
+    async def _run_independent_opinions_phase(self, run: AgendaItemRun) -> List[Opinion]:
         """Phase 1: Independent opinions"""
-        self.session.phase = DiscussionPhase.INDEPENDENT_OPINIONS
+        self._set_phase(run, DiscussionPhase.INDEPENDENT_OPINIONS)
 
         await self._send_event("phase_changed", {
             "phase": "independent_opinions",
-            "agenda_index": self.session.current_agenda_index,
+            "agenda_index": run.index,
         })
 
         await self._send_message(
@@ -163,12 +537,16 @@ class DiscussionEngine:
 
         # Generate opinions from all agents in parallel (passing background knowledge)
         tasks = []
-        for agent in self.agents:
+        message_ids = []
+        for agent in run.agents:
+            message_id, on_delta = self._message_stream(agent, MessageType.OPINION)
+            message_ids.append(message_id)
             task = self.agent_manager.generate_independent_opinion(
                 agent=agent,
-                agenda_title=agenda_item.title,
-                agenda_description=agenda_item.description,
-                background_context=self.background_context,
+                agenda_title=run.item.title,
+                agenda_description=run.item.description,
+                background_context=self._agenda_context(run.index),
+                on_stream=on_delta,
             )
             tasks.append(task)
 
@@ -176,7 +554,7 @@ class DiscussionEngine:
 
         opinions = []
         for idx, (content, response_id) in enumerate(results):
-            agent = self.agents[idx]
+            agent = run.agents[idx]
             opinion = Opinion(
                 id=f"opinion_{uuid.uuid4().hex[:8]}",
                 agent_id=agent.id,
@@ -189,18 +567,19 @@ class DiscussionEngine:
                 agent=agent,
                 content=content,
                 message_type=MessageType.OPINION,
+                message_id=message_ids[idx],
             )
 
         logger.info(f"{len(opinions)} opinions submitted")
         return opinions
 
-    async def _run_voting_phase(self, opinions: List[Opinion]) -> List[Opinion]:
+    async def _run_voting_phase(self, run: AgendaItemRun, opinions: List[Opinion]) -> List[Opinion]:
         """Phase 2: Voting"""
-        self.session.phase = DiscussionPhase.VOTING
+        self._set_phase(run, DiscussionPhase.VOTING)
 
         await self._send_event("phase_changed", {
             "phase": "voting",
-            "agenda_index": self.session.current_agenda_index,
+            "agenda_index": run.index,
         })
 
         await self._send_message(
@@ -211,7 +590,7 @@ class DiscussionEngine:
 
         # Vote from all agents in parallel
         tasks = []
-        for agent in self.agents:
+        for agent in run.agents:
             task = self.agent_manager.vote_for_opinion(agent=agent, opinions=opinions)
             tasks.append(task)
 
@@ -221,7 +600,7 @@ class DiscussionEngine:
         vote_counter = Counter(votes)
         vote_details = []  # Detailed voting information
         for idx, voted_opinion_id in enumerate(votes):
-            voter = self.agents[idx]
+            voter = run.agents[idx]
             vote_details.append({
                 "voter_id": voter.id,
                 "voter_name": voter.name,
@@ -236,6 +615,7 @@ class DiscussionEngine:
 
         # Send with detailed opinion information
         await self._send_event("voting_result", {
+            "agenda_index": run.index,
             "votes": {op.id: op.votes for op in opinions},
             "vote_details": vote_details,
             "opinions": [
@@ -254,13 +634,13 @@ class DiscussionEngine:
         logger.info(f"Voting complete: {len(filtered_opinions)} opinions remaining")
         return filtered_opinions
 
-    async def _run_persuasion_phase(self, opinions: List[Opinion], agenda_item: AgendaItem) -> str:
+    async def _run_persuasion_phase(self, run: AgendaItemRun, opinions: List[Opinion]) -> str:
         """Phase 3: Persuasion process"""
-        self.session.phase = DiscussionPhase.PERSUASION
+        self._set_phase(run, DiscussionPhase.PERSUASION)
 
         await self._send_event("phase_changed", {
             "phase": "persuasion",
-            "agenda_index": self.session.current_agenda_index,
+            "agenda_index": run.index,
         })
 
         if len(opinions) == 1:
@@ -268,58 +648,91 @@ class DiscussionEngine:
 
         # Record which opinion each agent supports
         agent_opinions = {op.agent_id: op for op in opinions}
+        tracker = ConsensusTracker(agent.id for agent in run.agents)
+
+        # A resumed item continues after its last completed round
+        tracker.stances = copy.deepcopy(run.stances)
 
         # Persuade in order from minority opinions
         max_rounds = 10
-        for round_num in range(max_rounds):
+        for round_num in range(run.persuasion_round, max_rounds):
             opinions_sorted = sorted(opinions, key=lambda x: x.votes)
+            tracker.start_round()
+            if round_num > run.persuasion_round:
+                # Persuasion rounds are where contexts grow fastest
+                self._compact_contexts(run)
+                run.persuasion_round = round_num
+                run.stances = copy.deepcopy(tracker.stances)
+                await self._checkpoint()
 
             for opinion in opinions_sorted:
-                persuader = self.agent_manager.get_agent(opinion.agent_id)
+                if self.usage.budget_exceeded:
+                    return await self._conclude_on_budget(tracker.leading_opinion(opinions))
+
+                persuader = run.get_agent(opinion.agent_id)
+                tracker.record(opinion.id, persuader.id, True)
 
                 # Persuade
-                persuasion_msg, _ = await self.agent_manager.persuade(persuader, opinion)
+                persuasion_message_id, on_delta = self._message_stream(persuader, MessageType.PERSUASION)
+                persuasion_msg, _ = await self.agent_manager.persuade(persuader, opinion, on_stream=on_delta)
                 await self._send_message(
                     agent=persuader,
                     content=persuasion_msg,
                     message_type=MessageType.PERSUASION,
+                    message_id=persuasion_message_id,
                 )
 
-                # Other agents respond
+                # Other agents respond (fanned out with bounded concurrency, emitted in agent order)
+                responders = [agent for agent in run.agents if agent.id != persuader.id]
+                response_calls = []
+                for agent in responders:
+                    # Get the opinion each agent supports and other opinions
+                    your_opinion = agent_opinions.get(agent.id).content if agent.id in agent_opinions else ""
+                    other_opinions_list = [op.content for op in opinions if op.agent_id != agent.id]
+                    response_calls.append(partial(
+                        self.agent_manager.respond_to_persuasion,
+                        agent, persuasion_msg, your_opinion, other_opinions_list,
+                    ))
+
                 counter_arguments = []
-                for agent in self.agents:
-                    if agent.id != persuader.id:
-                        # Get the opinion each agent supports and other opinions
-                        your_opinion = agent_opinions.get(agent.id).content if agent.id in agent_opinions else ""
-                        other_opinions_list = [op.content for op in opinions if op.agent_id != agent.id]
-
-                        response_msg, _, is_agreement = await self.agent_manager.respond_to_persuasion(
-                            agent, persuasion_msg, your_opinion, other_opinions_list
-                        )
-                        await self._send_message(
-                            agent=agent,
-                            content=response_msg,
-                            message_type=MessageType.RESPONSE,
-                        )
+                idx = 0
+                async for response_msg, _, is_agreement in self._run_bounded(response_calls):
+                    agent = responders[idx]
+                    idx += 1
+                    tracker.record(opinion.id, agent.id, is_agreement)
+                    await self._send_message(
+                        agent=agent,
+                        content=response_msg,
+                        message_type=MessageType.RESPONSE,
+                    )
 
-                        # Record if there's a counter-argument
-                        if not is_agreement:
-                            counter_arguments.append((agent, response_msg))
+                    # Record if there's a counter-argument
+                    if not is_agreement:
+                        counter_arguments.append((agent, response_msg))
 
                 # If there are counter-arguments, original opinion holder responds
-                if counter_arguments:
-                    for counter_agent, counter_msg in counter_arguments:
-                        rebuttal_msg, _, maintains = await self.agent_manager.respond_to_counter_argument(
-                            persuader, counter_msg, opinion.content
-                        )
-                        await self._send_message(
-                            agent=persuader,
-                            content=rebuttal_msg,
-                            message_type=MessageType.RESPONSE,
-                        )
+                conceded = False
+                # Rebuttals are one after another even in concurrent mode: they all continue the
+                # persuader's own conversation, so each must see the ones before it
+                for _, counter_msg in counter_arguments:
+                    rebuttal_msg, _, maintains = await self.agent_manager.respond_to_counter_argument(
+                        persuader, counter_msg, opinion.content
+                    )
+                    conceded = conceded or not maintains
+                    await self._send_message(
+                        agent=persuader,
+                        content=rebuttal_msg,
+                        message_type=MessageType.RESPONSE,
+                    )
 
                 # Check consensus
-                if await self._check_consensus(opinion):
+                if conceded:
+                    # The persuader accepted a counter-argument, so this opinion cannot be unanimous
+                    tracker.record(opinion.id, persuader.id, False)
+                    CONSENSUS_CHECKS.inc(outcome="skipped_conceded")
+                    continue
+
+                if await self._check_consensus(run, opinion, tracker):
                     await self._send_message(
                         agent=self.facilitator.agent,
                         content=f"Consensus has been reached! All participants agree.",
@@ -327,8 +740,9 @@ class DiscussionEngine:
                     )
 
                     # If there are more agenda items, notify about moving to next topic
-                    if self.session.current_agenda_index < len(self.session.agenda) - 1:
-                        next_agenda = self.session.agenda[self.session.current_agenda_index + 1]
+                    # (concurrent items are already under way)
+                    if self.agenda_concurrency == 1 and run.index < len(self.session.agenda) - 1:
+                        next_agenda = self.session.agenda[run.index + 1]
                         await self._send_message(
                             agent=self.facilitator.agent,
                             content=f"Moving to next agenda item: {next_agenda.title}",
@@ -337,35 +751,204 @@ class DiscussionEngine:
 
                     return opinion.content
 
-        return opinions[0].content
+            # LLM answers vary between rounds, so a single round without a stance change is not yet
+            # a stalemate; only several in a row are
+            run.stalled_rounds = 0 if tracker.round_changed() else run.stalled_rounds + 1
+            if self.stalemate_rounds and run.stalled_rounds >= self.stalemate_rounds:
+                leading = tracker.leading_opinion(opinions)
+                logger.info(f"Persuasion stalemate after {round_num + 1} rounds")
+                await self._send_message(
+                    agent=self.facilitator.agent,
+                    content=f"No participant changed their position in the last {run.stalled_rounds} rounds. "
+                            "Concluding with the most supported opinion.",
+                    message_type=MessageType.CONCLUSION,
+                )
+                return leading.content
+
+        return tracker.leading_opinion(opinions).content
 
-    async def _check_consensus(self, opinion: Opinion) -> bool:
-        """Check consensus from all participants"""
-        tasks = []
-        for agent in self.agents:
-            task = self.agent_manager.make_final_decision(
+    async def _conclude_on_budget(self, leading: Opinion) -> str:
+        """End persuasion with the most supported opinion once the session's token budget is used up"""
+        logger.info(f"Token budget of {self.usage.token_budget} reached; ending persuasion early")
+        await self._send_message(
+            agent=self.facilitator.agent,
+            content="The token budget for this discussion has been reached. "
+                    "Concluding with the most supported opinion.",
+            message_type=MessageType.CONCLUSION,
+        )
+        return leading.content
+
+    async def _run_bounded(
+        self,
+        calls: List[Callable[[], Awaitable[Any]]],
+    ) -> AsyncIterator[Any]:
+        """Run calls with at most persuasion_concurrency in flight, yielding results in submission order
+
+        Results are yielded as soon as they and all earlier calls have completed,
+        so messages stay in a deterministic order while later calls keep running.
+        """
+        semaphore = asyncio.Semaphore(self.persuasion_concurrency)
+
+        async def run(call: Callable[[], Awaitable[Any]]) -> Any:
+            async with semaphore:
+                return await call()
+
+        tasks = [asyncio.create_task(run(call)) for call in calls]
+        try:
+            for task in tasks:
+                yield await task
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _check_consensus(self, run: AgendaItemRun, opinion: Opinion, tracker: ConsensusTracker) -> bool:
+        """Check consensus, asking for a final decision only from agents that have not agreed yet
+
+        When every participant already agreed during this persuasion, the outcome
+        is determined without another round of LLM calls.
+        """
+        unresolved = [run.get_agent(agent_id) for agent_id in tracker.unresolved(opinion.id)]
+        if not unresolved:
+            CONSENSUS_CHECKS.inc(outcome="determined")
+            return True
+
+        results = await asyncio.gather(*[
+            self.agent_manager.make_final_decision(
                 agent=agent,
                 proposed_opinion=opinion.content,
             )
-            tasks.append(task)
-
-        results = await asyncio.gather(*tasks)
-        return all(agrees for agrees, _ in results)
+            for agent in unresolved
+        ])
+        for agent, (agrees, _) in zip(unresolved, results):
+            tracker.record(opinion.id, agent.id, agrees)
+
+        CONSENSUS_CHECKS.inc(outcome="final_decision")
+        return tracker.is_unanimous(opinion.id)
+
+    def _compact_contexts(self, run: AgendaItemRun):
+        """At a phase boundary: swap in finished context summaries and start summarizing agents that outgrew theirs
+
+        Summaries are written in the background while the discussion goes on,
+        and only applied at a boundary, so no phase waits for them.
+        """
+        self.agent_manager.apply_compactions(run.agents)
+        for agent in run.agents:
+            if self.agent_manager.needs_compaction(agent):
+                self.agent_manager.start_compaction(agent)
+
+    async def _checkpoint(self, finished: bool = False, progressed: bool = True):
+        """Save the session state (a failed save is logged and the discussion goes on)
+
+        A checkpoint after a completed phase (progressed) clears the resume
+        attempts, so only resumes that keep failing before any progress add up.
+        """
+        if progressed:
+            self.resume_attempts = 0
+        if self.checkpoint_store is None:
+            return
+        # Saves are serialized so a slower earlier write cannot overwrite a later state
+        async with self._checkpoint_lock:
+            checkpoint = self._checkpoint_state(finished)
+            with tracer.span("checkpoint.save", finished=finished):
+                try:
+                    await self.checkpoint_store.save(self.session.id, checkpoint)
+                except Exception as e:
+                    logger.warning(f"Checkpoint of {self.session.id} failed: {e}")
+
+    def _checkpoint_state(self, finished: bool) -> dict:
+        """Everything needed to continue the discussion from its last completed phase"""
+        return {
+            "version": 1,
+            "finished": finished,
+            "resume_attempts": self.resume_attempts,
+            "event_seq": self.event_seq() if self.event_seq else 0,
+            "session": self.session.model_dump(mode="json"),
+            "facilitator": {
+                "agent": self.facilitator.agent.model_dump(mode="json") if self.facilitator.agent else None,
+                "response_id": self.facilitator.response_id,
+            },
+            "agents": [self._dump_agent(agent) for agent in self.agents],
+            "background_context": self.background_context,
+            "agenda_contexts": self.agenda_contexts,
+            "runs": [
+                {
+                    "index": run.index,
+                    "step": run.step,
+                    "opinions": [opinion.model_dump(mode="json") for opinion in run.opinions],
+                    "agents": [self._dump_agent(agent) for agent in run.agents],
+                    "persuasion_round": run.persuasion_round,
+                    "stances": run.stances,
+                    "stalled_rounds": run.stalled_rounds,
+                }
+                for run in self.runs
+            ],
+            "usage": self.usage.snapshot() if self.usage else None,
+        }
+
+    def _dump_agent(self, agent: Agent) -> dict:
+        """An Agent including its local conversation state, which is excluded from client payloads"""
+        return {
+            **agent.model_dump(mode="json"),
+            "notes": agent.notes,
+            "transcript": [turn.model_dump() for turn in agent.transcript],
+        }
+
+    def _restore_checkpoint(self, checkpoint: dict):
+        """Rebuild the session, agents and per-item progress from a checkpoint"""
+        self.session = DiscussionSession.model_validate(checkpoint["session"])
+        self.agents = [Agent.model_validate(agent) for agent in checkpoint["agents"]]
+        self.background_context = checkpoint["background_context"]
+        self.agenda_contexts = checkpoint["agenda_contexts"]
+        self.agenda_context_items = [[] for _ in self.agenda_contexts]
+
+        facilitator = checkpoint["facilitator"]
+        if facilitator["agent"]:
+            self.facilitator.agent = Agent.model_validate(facilitator["agent"])
+        self.facilitator.response_id = facilitator["response_id"]
+        self.agent_manager.agents = {
+            agent.id: agent
+            for agent in ([self.facilitator.agent] if self.facilitator.agent else []) + self.agents
+        }
+
+        self.runs = []
+        for saved, agenda_item in zip(checkpoint["runs"], self.session.agenda):
+            if self.agenda_concurrency == 1:
+                agents = self.agents
+            elif saved["step"] == "pending":
+                agents = self._agents_for_item()
+            else:
+                # Continue the item's own fork of the conversations
+                agents = [Agent.model_validate(agent) for agent in saved["agents"]]
+            self.runs.append(AgendaItemRun(
+                index=saved["index"],
+                item=agenda_item,
+                agents=agents,
+                step=saved["step"],
+                opinions=[Opinion.model_validate(opinion) for opinion in saved["opinions"]],
+                persuasion_round=saved.get("persuasion_round", 0),
+                stances=saved.get("stances", {}),
+                stalled_rounds=saved.get("stalled_rounds", 0),
+                phase=DiscussionPhase.COMPLETED if saved["step"] == "completed" else None,
+            ))
+        self._sync_session_progress()
 
     async def _send_message(
         self,
         agent: Agent,
         content: str,
         message_type: MessageType,
+        message_id: Optional[str] = None,
     ):
-        """Send message"""
+        """Send message (message_id completes a message previously streamed with that ID)"""
         message = Message(
-            id=f"msg_{uuid.uuid4().hex[:8]}",
+            id=message_id or f"msg_{uuid.uuid4().hex[:8]}",
             agent_id=agent.id,
             agent_name=agent.name,
             content=content,
             message_type=message_type,
             timestamp=datetime.now(),
+            agenda_index=_current_agenda_index.get(),
         )
 
         await self.message_callback({
@@ -373,6 +956,36 @@ class DiscussionEngine:
             "data": message.model_dump(mode="json"),
         })
 
+    def _agenda_context(self, agenda_index: int) -> str:
+        """Background knowledge for an agenda item"""
+        if agenda_index < len(self.agenda_contexts):
+            return self.agenda_contexts[agenda_index]
+        return self.background_context
+
+    def _message_stream(
+        self,
+        agent: Agent,
+        message_type: MessageType,
+    ) -> tuple[str, Optional[Callable[[str], Awaitable[None]]]]:
+        """Allocate a message ID and, when streaming is enabled, a callback forwarding text deltas for it"""
+        message_id = f"msg_{uuid.uuid4().hex[:8]}"
+        if not self.streaming:
+            return message_id, None
+
+        agenda_index = _current_agenda_index.get()
+
+        async def on_delta(delta: str):
+            await self._send_event("message_delta", {
+                "id": message_id,
+                "agenda_index": agenda_index,
+                "agent_id": agent.id,
+                "agent_name": agent.name,
+                "message_type": message_type.value,
+                "delta": delta,
+            })
+
+        return message_id, on_delta
+
     async def _send_event(self, event_type: str, data: dict):
         """Send event"""
         await self.message_callback({
@@ -380,14 +993,20 @@ class DiscussionEngine:
             "data": data,
         })
 
-    async def _retrieve_background_context(self, topic: str) -> list:
+    async def _retrieve_background_context(
+        self,
+        topic: str,
+        on_late_results: Optional[Callable[[List[ContextItem]], Awaitable[None]]] = None,
+    ) -> List[ContextItem]:
         """Retrieve background knowledge from discussion topic"""
         try:
             # Extract keywords from topic (simplified version)
             keywords = self._extract_keywords(topic)
 
             # Retrieve context
-            context_items = await self.context_retriever.retrieve_context(topic, keywords)
+            context_items = await self.context_retriever.retrieve_context(
+                topic, keywords, on_late_results=on_late_results
+            )
             return context_items
 
         except Exception as e:
@@ -0,0 +1,160 @@
+"""Discussion events published by the owning worker and readable by every worker"""
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, Optional
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EventBus:
+    """Sequence-numbered event stream per session
+
+    The worker running a discussion publishes each event (already carrying its
+    `seq`); any worker can replay a range and follow new events, so clients
+    can reconnect through any worker.
+    """
+
+    async def publish(self, session_id: str, event: dict):
+        raise NotImplementedError
+
+    async def read(self, session_id: str, after_seq: int = 0, limit: Optional[int] = None) -> List[dict]:
+        """Retained events with seq > after_seq, oldest first"""
+        raise NotImplementedError
+
+    async def follow(self, session_id: str, after_seq: int = 0) -> AsyncIterator[dict]:
+        """Retained events after after_seq, then new events as they are published"""
+        raise NotImplementedError
+        yield
+
+    async def last_seq(self, session_id: str) -> int:
+        """Seq of the newest published event (0 if none)"""
+        raise NotImplementedError
+
+    async def delete(self, session_id: str):
+        raise NotImplementedError
+
+    async def close(self):
+        """Release bus resources"""
+
+
+class InMemoryEventBus(EventBus):
+    """Single-process bus keeping the newest max_events of each session"""
+
+    def __init__(self, max_events: int = 2000):
+        self.max_events = max_events
+        self._events: Dict[str, Deque[dict]] = {}
+        self._conditions: Dict[str, asyncio.Condition] = {}
+
+    def _condition(self, session_id: str) -> asyncio.Condition:
+        return self._conditions.setdefault(session_id, asyncio.Condition())
+
+    async def publish(self, session_id: str, event: dict):
+        self._events.setdefault(session_id, deque(maxlen=self.max_events)).append(event)
+        condition = self._condition(session_id)
+        async with condition:
+            condition.notify_all()
+
+    async def read(self, session_id: str, after_seq: int = 0, limit: Optional[int] = None) -> List[dict]:
+        events = [event for event in self._events.get(session_id, ()) if event["seq"] > after_seq]
+        return events[:limit] if limit else events
+
+    async def follow(self, session_id: str, after_seq: int = 0) -> AsyncIterator[dict]:
+        condition = self._condition(session_id)
+        cursor = after_seq
+        while True:
+            events = await self.read(session_id, cursor)
+            if not events:
+                async with condition:
+                    await condition.wait_for(lambda: bool(self._events.get(session_id)) and self._events[session_id][-1]["seq"] > cursor)
+                continue
+            for event in events:
+                cursor = event["seq"]
+                yield event
+
+    async def last_seq(self, session_id: str) -> int:
+        events = self._events.get(session_id)
+        return events[-1]["seq"] if events else 0
+
+    async def delete(self, session_id: str):
+        self._events.pop(session_id, None)
+        self._conditions.pop(session_id, None)
+
+
+class RedisEventBus(EventBus):
+    """One Redis stream per session, with entry IDs `<seq>-0`
+
+    Streams are capped at roughly max_events entries and expire ttl_seconds
+    after the last publish.
+    """
+
+    def __init__(self, url: str, key_prefix: str = "pangaea", max_events: int = 10000,
+                 ttl_seconds: float = 3600.0, block_ms: int = 5000):
+        # Optional dependency: only needed when SESSION_STORE=redis
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url, decode_responses=True)
+        self.key_prefix = key_prefix
+        self.max_events = max_events
+        self.ttl_seconds = ttl_seconds
+        self.block_ms = block_ms
+        logger.info(f"Event bus: Redis streams ({url})")
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.key_prefix}:events:{session_id}"
+
+    async def publish(self, session_id: str, event: dict):
+        key = self._key(session_id)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.xadd(
+                key,
+                {"event": json.dumps(event, ensure_ascii=False)},
+                id=f"{event['seq']}-0",
+                maxlen=self.max_events,
+                approximate=True,
+            )
+            pipe.expire(key, int(self.ttl_seconds))
+            await pipe.execute()
+
+    async def read(self, session_id: str, after_seq: int = 0, limit: Optional[int] = None) -> List[dict]:
+        entries = await self._redis.xrange(self._key(session_id), min=f"{after_seq + 1}-0", count=limit)
+        return [json.loads(fields["event"]) for _, fields in entries]
+
+    async def follow(self, session_id: str, after_seq: int = 0) -> AsyncIterator[dict]:
+        key = self._key(session_id)
+        for event in await self.read(session_id, after_seq):
+            after_seq = event["seq"]
+            yield event
+        while True:
+            response = await self._redis.xread({key: f"{after_seq}-0"}, block=self.block_ms)
+            for _, entries in response or ():
+                for _, fields in entries:
+                    event = json.loads(fields["event"])
+                    after_seq = event["seq"]
+                    yield event
+
+    async def last_seq(self, session_id: str) -> int:
+        entries = await self._redis.xrevrange(self._key(session_id), count=1)
+        return int(entries[0][0].split("-")[0]) if entries else 0
+
+    async def delete(self, session_id: str):
+        await self._redis.delete(self._key(session_id))
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+def create_event_bus() -> EventBus:
+    """Create the bus matching settings.session_store"""
+    if settings.session_store == "memory":
+        return InMemoryEventBus(max_events=settings.event_log_max_events)
+    if settings.session_store == "redis":
+        return RedisEventBus(
+            settings.redis_url,
+            key_prefix=settings.redis_key_prefix,
+            max_events=settings.event_bus_max_events,
+            ttl_seconds=settings.session_retention_seconds,
+        )
+    raise ValueError(f"Unknown session store: {settings.session_store}")
@@ -0,0 +1,226 @@
+"""Append-only, replayable log of the events a discussion sends to clients"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+from collections import deque
+from itertools import islice
+from pathlib import Path
+from typing import Deque, List, Optional
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EventSpill:
+    """Storage for events that no longer fit in a log's memory buffer"""
+
+    async def write(self, session_id: str, events: List[dict]):
+        raise NotImplementedError
+
+    async def read(self, session_id: str, after_seq: int, before_seq: int) -> List[dict]:
+        """Events with after_seq < seq < before_seq, in order"""
+        raise NotImplementedError
+
+    async def last_seq(self, session_id: str) -> int:
+        """Highest spilled seq of a session (0 if none)"""
+        raise NotImplementedError
+
+    async def delete(self, session_id: str):
+        """Drop a session's spilled events"""
+
+    def close(self):
+        """Release spill resources"""
+
+
+class JsonlEventSpill(EventSpill):
+    """One JSON Lines file per session"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, session_id: str) -> Path:
+        return self.directory / f"{session_id}.jsonl"
+
+    async def write(self, session_id: str, events: List[dict]):
+        lines = "".join(json.dumps(event, ensure_ascii=False) + "\n" for event in events)
+        await asyncio.to_thread(self._append, self._path(session_id), lines)
+
+    async def read(self, session_id: str, after_seq: int, before_seq: int) -> List[dict]:
+        return await asyncio.to_thread(self._read, self._path(session_id), after_seq, before_seq)
+
+    async def last_seq(self, session_id: str) -> int:
+        return await asyncio.to_thread(self._last_seq, self._path(session_id))
+
+    async def delete(self, session_id: str):
+        await asyncio.to_thread(self._path(session_id).unlink, missing_ok=True)
+
+    def _append(self, path: Path, lines: str):
+        with path.open("a", encoding="utf-8") as file:
+            file.write(lines)
+
+    def _read(self, path: Path, after_seq: int, before_seq: int) -> List[dict]:
+        if not path.exists():
+            return []
+        events = []
+        with path.open(encoding="utf-8") as file:
+            for line in file:
+                event = json.loads(line)
+                if after_seq < event["seq"] < before_seq:
+                    events.append(event)
+        return events
+
+    def _last_seq(self, path: Path) -> int:
+        if not path.exists():
+            return 0
+        last_seq = 0
+        with path.open(encoding="utf-8") as file:
+            for line in file:
+                last_seq = max(last_seq, json.loads(line)["seq"])
+        return last_seq
+
+
+class SqliteEventSpill(EventSpill):
+    """All sessions in one SQLite table keyed by (session_id, seq)"""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db_lock = threading.Lock()
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS discussion_events ("
+            "session_id TEXT NOT NULL, seq INTEGER NOT NULL, event TEXT NOT NULL, PRIMARY KEY (session_id, seq))"
+        )
+        self._db.commit()
+
+    async def write(self, session_id: str, events: List[dict]):
+        rows = [(session_id, event["seq"], json.dumps(event, ensure_ascii=False)) for event in events]
+        await asyncio.to_thread(self._write, rows)
+
+    async def read(self, session_id: str, after_seq: int, before_seq: int) -> List[dict]:
+        return await asyncio.to_thread(self._read, session_id, after_seq, before_seq)
+
+    async def last_seq(self, session_id: str) -> int:
+        return await asyncio.to_thread(self._last_seq, session_id)
+
+    async def delete(self, session_id: str):
+        await asyncio.to_thread(self._delete, session_id)
+
+    def close(self):
+        with self._db_lock:
+            self._db.close()
+
+    def _write(self, rows: List[tuple]):
+        with self._db_lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO discussion_events (session_id, seq, event) VALUES (?, ?, ?)", rows
+            )
+            self._db.commit()
+
+    def _read(self, session_id: str, after_seq: int, before_seq: int) -> List[dict]:
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT event FROM discussion_events WHERE session_id = ? AND seq > ? AND seq < ? ORDER BY seq",
+                (session_id, after_seq, before_seq),
+            ).fetchall()
+        return [json.loads(event) for (event,) in rows]
+
+    def _last_seq(self, session_id: str) -> int:
+        with self._db_lock:
+            (last_seq,) = self._db.execute(
+                "SELECT MAX(seq) FROM discussion_events WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return last_seq or 0
+
+    def _delete(self, session_id: str):
+        with self._db_lock:
+            self._db.execute("DELETE FROM discussion_events WHERE session_id = ?", (session_id,))
+            self._db.commit()
+
+
+class EventLog:
+    """Sequence-numbered events of one session
+
+    Each appended event gets a monotonic `seq` (continuing after start_seq,
+    so a resumed session keeps numbering where it left off). The newest
+    max_events are kept in memory; beyond that `compact` moves the oldest
+    quarter to the spill in one write (or drops it when there is no spill).
+    A reconnecting client passes the last seq it saw to `read` and receives
+    only what it missed.
+    """
+
+    def __init__(self, session_id: str, max_events: int = 2000, spill: Optional[EventSpill] = None, start_seq: int = 0):
+        self.session_id = session_id
+        self.max_events = max(1, max_events)
+        self.spill = spill
+        self._buffer: Deque[dict] = deque()
+        self._compacting = False
+        self.start_seq = start_seq
+        self.last_seq = start_seq
+        # Highest seq no longer in memory (spilled or dropped)
+        self.evicted_seq = start_seq
+
+    @property
+    def first_available_seq(self) -> int:
+        """Oldest seq that can still be replayed from this log"""
+        return self.start_seq + 1 if self.spill else self.evicted_seq + 1
+
+    def append(self, event: dict) -> dict:
+        """Assign the next seq to an event and keep it in memory"""
+        self.last_seq += 1
+        event = {**event, "seq": self.last_seq}
+        self._buffer.append(event)
+        return event
+
+    async def compact(self):
+        """Move the oldest events out of memory once the buffer is over capacity
+
+        Events stay readable from memory until the spill write has finished.
+        """
+        if len(self._buffer) <= self.max_events or self._compacting:
+            return
+
+        self._compacting = True
+        try:
+            evicted = list(islice(self._buffer, max(1, self.max_events // 4)))
+            if self.spill:
+                try:
+                    await self.spill.write(self.session_id, evicted)
+                except Exception as e:
+                    logger.warning(f"Event spill failed for {self.session_id} ({len(evicted)} events dropped): {e}")
+            for _ in evicted:
+                self._buffer.popleft()
+            self.evicted_seq = evicted[-1]["seq"]
+        finally:
+            self._compacting = False
+
+    async def read(self, after_seq: int = 0, limit: Optional[int] = None) -> List[dict]:
+        """Events with seq > after_seq, oldest first (at most limit)"""
+        events: List[dict] = []
+        floor = after_seq
+        # A compaction may finish while the spill is read, so read until memory continues the sequence
+        while self.spill and floor < self.evicted_seq:
+            boundary = self.evicted_seq
+            events.extend(await self.spill.read(self.session_id, floor, boundary + 1))
+            floor = boundary
+        events.extend(event for event in self._buffer if event["seq"] > floor)
+        return events[:limit] if limit else events
+
+    async def delete(self):
+        """Drop spilled events (when the session is forgotten)"""
+        if self.spill:
+            await self.spill.delete(self.session_id)
+
+
+def create_event_spill() -> Optional[EventSpill]:
+    """Create the spill selected by settings.event_log_spill"""
+    spill_name = settings.event_log_spill
+    if spill_name == "jsonl":
+        return JsonlEventSpill(settings.event_log_jsonl_dir)
+    if spill_name == "sqlite":
+        return SqliteEventSpill(settings.event_log_sqlite_path)
+    if spill_name in ("", "none"):
+        return None
+    raise ValueError(f"Unknown event log spill: {spill_name}")
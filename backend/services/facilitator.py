@@ -6,9 +6,16 @@ from models.discussion import AgendaItem
 from models.agent import Agent, AgentRole
 from services.openai_client import OpenAIResponsesClient
 from services.agent_manager import AgentManager
+from services.rate_limiter import Priority
+from services.tracing import tracer
+from utils.json_stream import JsonArrayStreamParser
+from utils.prompt_builder import build_prompt
 from utils.prompts import (
+    FACILITATOR_AGENDA,
     FACILITATOR_CREATE_AGENDA,
+    FACILITATOR_CREATE_AGENDA_RULES,
     FACILITATOR_GENERATE_AGENTS,
+    FACILITATOR_GENERATE_AGENTS_RULES,
 )
 import logging
 
@@ -42,47 +49,33 @@ class Facilitator:
         topic: str,
         context: str,
         on_stream: Optional[Callable[[str], Awaitable[None]]] = None,
+        on_item: Optional[Callable[[AgendaItem], Awaitable[None]]] = None,
     ) -> List[AgendaItem]:
-        """Create agenda from topic and background knowledge (with streaming support)"""
-        prompt = FACILITATOR_CREATE_AGENDA.format(topic=topic)
-
-        # Add background knowledge to prompt if available
-        if context:
-            prompt = f"{context}\n\n{prompt}\n\nPlease create an agenda taking the above background knowledge into consideration."
-
-        # Streaming callback
-        async def chunk_callback(chunk: str):
-            if on_stream:
-                await on_stream(chunk)
-
-        # When streaming is enabled
-        if on_stream:
-            response = await self.openai_client.create_with_streaming(
-                input_text=prompt,
-                previous_response_id=self.response_id,
-                on_chunk=chunk_callback,
-            )
-        else:
-            response = await self.openai_client.create_with_retry(
-                input_text=prompt,
-                previous_response_id=self.response_id,
-            )
+        """Create agenda from topic and background knowledge (with streaming support)
+
+        When on_item is given, the response is streamed and each AgendaItem is
+        passed to it as soon as its JSON object is complete.
+        """
+        prompt = build_prompt(
+            rules=FACILITATOR_CREATE_AGENDA_RULES,
+            context=context,
+            request=FACILITATOR_CREATE_AGENDA.format(topic=topic),
+        )
 
-        self.response_id = response["id"]
+        agenda_items: List[AgendaItem] = []
 
-        try:
-            agenda_data = self._extract_json(response["content"])
-            agenda_items = []
-
-            for idx, item in enumerate(agenda_data):
-                agenda_id = f"agenda_{uuid.uuid4().hex[:8]}"
-                agenda_item = AgendaItem(
-                    id=agenda_id,
-                    title=item["title"],
-                    description=item["description"],
-                    order=item.get("order", idx + 1),
-                )
+        async def add_items(items_data: list):
+            for item in items_data:
+                agenda_item = self._build_agenda_item(item, len(agenda_items))
                 agenda_items.append(agenda_item)
+                if on_item:
+                    await on_item(agenda_item)
+
+        parser = JsonArrayStreamParser() if on_item else None
+        response = await self._create("create_agenda", prompt, on_stream, parser, add_items)
+
+        try:
+            await add_items(self._undelivered_elements(response["content"], parser))
 
             logger.info(f"Agenda creation complete: {len(agenda_items)} items")
             return agenda_items
@@ -92,29 +85,32 @@ class Facilitator:
             logger.error(f"Response content: {response['content']}")
             raise
 
-    async def generate_agents(self, topic: str, agenda: List[AgendaItem]) -> List[Agent]:
-        """Generate participating agents from topic and agenda"""
-        agenda_text = "\n".join([
-            f"{item.order}. {item.title}: {item.description}"
-            for item in agenda
-        ])
-
-        prompt = FACILITATOR_GENERATE_AGENTS.format(
-            topic=topic,
+    async def generate_agents(
+        self,
+        topic: str,
+        agenda: List[AgendaItem],
+        on_agent: Optional[Callable[[Agent], Awaitable[None]]] = None,
+    ) -> List[Agent]:
+        """Generate participating agents from topic and agenda
+
+        When on_agent is given, the response is streamed and each Agent is
+        created and passed to it as soon as its JSON object is complete.
+        """
+        # A stateless call does not see the agenda creation exchange, so it is sent along
+        agenda_text = ""
+        if self.agent_manager.local_state:
+            agenda_text = FACILITATOR_AGENDA.format(
+                agenda="\n".join(f"{item.order}. {item.title}: {item.description}" for item in agenda)
+            )
+        prompt = build_prompt(
+            rules=FACILITATOR_GENERATE_AGENTS_RULES,
             agenda=agenda_text,
+            request=FACILITATOR_GENERATE_AGENTS.format(topic=topic),
         )
 
-        response = await self.openai_client.create_with_retry(
-            input_text=prompt,
-            previous_response_id=self.response_id,
-        )
-
-        self.response_id = response["id"]
-
-        try:
-            agents_data = self._extract_json(response["content"])
-            agents = []
+        agents: List[Agent] = []
 
+        async def add_agents(agents_data: list):
             for agent_info in agents_data:
                 agent = self.agent_manager.create_agent(
                     name=agent_info["name"],
@@ -122,6 +118,14 @@ class Facilitator:
                     role=AgentRole.PARTICIPANT,
                 )
                 agents.append(agent)
+                if on_agent:
+                    await on_agent(agent)
+
+        parser = JsonArrayStreamParser() if on_agent else None
+        response = await self._create("generate_agents", prompt, None, parser, add_agents)
+
+        try:
+            await add_agents(self._undelivered_elements(response["content"], parser))
 
             logger.info(f"Agent generation complete: {len(agents)} agents")
             return agents
@@ -131,6 +135,73 @@ class Facilitator:
             logger.error(f"Response content: {response['content']}")
             raise
 
+    async def _create(
+        self,
+        operation: str,
+        prompt: str,
+        on_stream: Optional[Callable[[str], Awaitable[None]]],
+        parser: Optional[JsonArrayStreamParser],
+        on_objects: Callable[[list], Awaitable[None]],
+    ) -> dict:
+        """Call the LLM on the facilitator's chain (stateless calls in local conversation state)
+
+        Streams when on_stream or parser is given; with a parser, on_objects
+        receives the JSON array elements completed by each chunk.
+        """
+        store = not self.agent_manager.local_state
+        previous_response_id = self.response_id if store else None
+        with tracer.span(f"facilitator.{operation}", agent_id=self.agent.id if self.agent else "facilitator", prompt_length=len(prompt)) as span:
+            if on_stream or parser:
+                async def chunk_callback(chunk: str):
+                    if on_stream:
+                        await on_stream(chunk)
+                    if parser:
+                        completed = parser.feed(chunk)
+                        if completed:
+                            await on_objects(completed)
+
+                response = await self.openai_client.create_with_streaming(
+                    input_text=prompt,
+                    previous_response_id=previous_response_id,
+                    store=store,
+                    on_chunk=chunk_callback,
+                    priority=Priority.HIGH,
+                )
+            else:
+                response = await self.openai_client.create_with_retry(
+                    input_text=prompt,
+                    previous_response_id=previous_response_id,
+                    store=store,
+                    priority=Priority.HIGH,
+                )
+            span.set_attribute("output_length", len(response["content"]))
+
+        if store:
+            self.response_id = response["id"]
+        return response
+
+    def _undelivered_elements(self, text: str, parser: Optional[JsonArrayStreamParser]) -> list:
+        """Elements of the response's JSON array that the stream parser did not deliver
+
+        That is all of them without a parser, and otherwise those it skipped as
+        unparsable or never saw because the stream was cut off.
+        """
+        if parser is None:
+            return self._extract_json(text)
+        if parser.complete:
+            return []
+        logger.warning(f"Streamed JSON incomplete ({parser.skipped} elements skipped); parsing the full response")
+        return parser.missing(self._extract_json(text))
+
+    def _build_agenda_item(self, item: dict, index: int) -> AgendaItem:
+        """Build an AgendaItem from its parsed JSON object"""
+        return AgendaItem(
+            id=f"agenda_{uuid.uuid4().hex[:8]}",
+            title=item["title"],
+            description=item["description"],
+            order=item.get("order", index + 1),
+        )
+
     def _extract_json(self, text: str) -> dict | list:
         """Extract and parse JSON portion from text"""
         # Remove markdown code blocks
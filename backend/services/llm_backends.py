@@ -0,0 +1,41 @@
+"""Pluggable LLM backends behind OpenAIResponsesClient"""
+from typing import Any, Optional
+import httpx
+from openai import AsyncOpenAI
+
+
+class LLMBackend:
+    """Transport for Responses API calls
+
+    `create` receives the Responses API parameters and returns either a
+    response object (with `id`, `output_text` and `usage`) or, when
+    `stream=True`, an async iterator of Responses API stream events.
+    """
+
+    async def create(self, **params) -> Any:
+        raise NotImplementedError
+
+    async def close(self):
+        """Release backend resources"""
+
+
+class OpenAIBackend(LLMBackend):
+    """OpenAI Responses API backend"""
+
+    def __init__(
+        self,
+        api_key: str,
+        http_client: Optional[httpx.AsyncClient] = None,
+        max_retries: Optional[int] = None,
+    ):
+        self.client = AsyncOpenAI(
+            api_key=api_key,
+            http_client=http_client,
+            **({"max_retries": max_retries} if max_retries is not None else {}),
+        )
+
+    async def create(self, **params) -> Any:
+        return await self.client.responses.create(**params)
+
+    async def close(self):
+        await self.client.close()
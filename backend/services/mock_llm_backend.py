@@ -0,0 +1,298 @@
+"""Offline deterministic LLM backend for load testing"""
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import uuid
+from collections import OrderedDict
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, Optional
+import httpx
+from openai import BadRequestError, InternalServerError, RateLimitError
+from config import settings
+from services.llm_backends import LLMBackend
+
+logger = logging.getLogger(__name__)
+
+_MOCK_URL = "https://mock-llm.local/v1/responses"
+
+_PROMPT_CACHE_MAX_BLOCKS = 100_000
+_CHARS_PER_TOKEN = 4
+
+
+class MockLLMBackend(LLMBackend):
+    """Local fake of the Responses API
+
+    - Follows `previous_response_id` chaining: only stored responses can be
+      continued, and unknown IDs fail like the real API.
+    - Simulates latency (fixed, uniform or lognormal), random server errors
+      and 429s with a `retry-after` header.
+    - Produces scripted outputs in the formats the services parse (agenda and
+      participant JSON, opinions) and objects matching structured output
+      schemas (votes and Agree/Counter-argue and Yes/No decisions).
+    - Reports cached input tokens for the part of a prompt whose prefix was
+      sent before, like provider prompt caching (by default prefixes of 1024+
+      tokens matched in 128-token blocks, as the provider does; the mock's own
+      prompts are shorter, so benchmarks scale these down), and optionally
+      adds latency per uncached input token.
+
+    Outputs are a deterministic function of the seed and the request, so runs
+    are reproducible; latency and error injection use a separately seeded RNG.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 800,
+        jitter_ms: float = 400,
+        latency_distribution: str = "lognormal",
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after_seconds: float = 1.0,
+        agreement_rate: float = 0.7,
+        stream_chunk_chars: int = 16,
+        seed: int = 0,
+        prompt_cache_min_tokens: int = 1024,
+        prompt_cache_block_tokens: int = 128,
+        prefill_ms_per_1k_tokens: float = 0.0,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.latency_distribution = latency_distribution
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after_seconds = retry_after_seconds
+        self.agreement_rate = agreement_rate
+        self.stream_chunk_chars = stream_chunk_chars
+        self.seed = seed
+        self.prompt_cache_min_tokens = prompt_cache_min_tokens
+        self.prompt_cache_block_tokens = max(1, prompt_cache_block_tokens)
+        self.prefill_ms_per_1k_tokens = prefill_ms_per_1k_tokens
+        self._random = random.Random(seed)
+        # Stored responses: response_id -> previous_response_id
+        self._conversations: Dict[str, Optional[str]] = {}
+        # Hashes of prompt prefixes seen so far, least recently used first
+        self._prompt_cache: "OrderedDict[str, None]" = OrderedDict()
+
+        # Counters
+        self.requests = 0
+        self.injected_errors = 0
+        self.injected_rate_limits = 0
+
+    @classmethod
+    def from_settings(cls) -> "MockLLMBackend":
+        """Create a mock backend configured from application settings"""
+        return cls(
+            latency_ms=settings.mock_llm_latency_ms,
+            jitter_ms=settings.mock_llm_jitter_ms,
+            latency_distribution=settings.mock_llm_latency_distribution,
+            error_rate=settings.mock_llm_error_rate,
+            rate_limit_rate=settings.mock_llm_rate_limit_rate,
+            retry_after_seconds=settings.mock_llm_retry_after_seconds,
+            agreement_rate=settings.mock_llm_agreement_rate,
+            seed=settings.mock_llm_seed,
+            prompt_cache_min_tokens=settings.mock_llm_prompt_cache_min_tokens,
+            prompt_cache_block_tokens=settings.mock_llm_prompt_cache_block_tokens,
+            prefill_ms_per_1k_tokens=settings.mock_llm_prefill_ms_per_1k_tokens,
+        )
+
+    async def create(self, **params) -> Any:
+        self.requests += 1
+        input_text = params["input"]
+        previous_response_id = params.get("previous_response_id")
+
+        if previous_response_id and previous_response_id not in self._conversations:
+            raise BadRequestError(
+                f"Previous response with id '{previous_response_id}' not found.",
+                response=httpx.Response(400, request=httpx.Request("POST", _MOCK_URL)),
+                body=None,
+            )
+
+        self._inject_failures()
+
+        text_format = (params.get("text") or {}).get("format")
+        content = self._script(input_text, previous_response_id, text_format)
+        response_id = f"resp_mock_{uuid.uuid4().hex}"
+        if params.get("store"):
+            self._conversations[response_id] = previous_response_id
+
+        response = SimpleNamespace(
+            id=response_id,
+            output_text=content,
+            usage=self._usage(input_text, content),
+        )
+
+        if params.get("stream"):
+            return self._stream(response)
+
+        await asyncio.sleep(self._latency(response.usage))
+        return response
+
+    def get_stats(self) -> dict:
+        """Request and fault injection counters"""
+        return {
+            "requests": self.requests,
+            "injected_errors": self.injected_errors,
+            "injected_rate_limits": self.injected_rate_limits,
+            "stored_responses": len(self._conversations),
+        }
+
+    async def _stream(self, response) -> AsyncIterator[SimpleNamespace]:
+        """Stream events shaped like the Responses API (time to first token is half the latency)"""
+        latency = self._latency(response.usage)
+        await asyncio.sleep(latency / 2)
+        yield SimpleNamespace(type="response.created", response=SimpleNamespace(id=response.id))
+
+        content = response.output_text
+        chunks = [content[i:i + self.stream_chunk_chars] for i in range(0, len(content), self.stream_chunk_chars)]
+        for chunk in chunks:
+            await asyncio.sleep(latency / 2 / len(chunks))
+            yield SimpleNamespace(type="response.output_text.delta", delta=chunk)
+
+        yield SimpleNamespace(type="response.completed", response=response)
+
+    def _latency(self, usage: Optional[SimpleNamespace] = None) -> float:
+        """Sample a latency in seconds (plus prefill time for the uncached input tokens of usage)"""
+        prefill = 0.0
+        if usage is not None and self.prefill_ms_per_1k_tokens:
+            uncached_tokens = usage.input_tokens - usage.input_tokens_details.cached_tokens
+            prefill = uncached_tokens / 1000 * self.prefill_ms_per_1k_tokens / 1000
+        return prefill + self._sample_latency()
+
+    def _sample_latency(self) -> float:
+        """Sample the base latency in seconds"""
+        mean = self.latency_ms / 1000
+        jitter = self.jitter_ms / 1000
+        if self.latency_distribution == "fixed" or mean <= 0:
+            return max(0.0, mean)
+        if self.latency_distribution == "uniform":
+            return max(0.0, self._random.uniform(mean - jitter, mean + jitter))
+        # Lognormal with the given mean and standard deviation (long right tail like real APIs)
+        sigma_squared = math.log(1 + (jitter / mean) ** 2)
+        mu = math.log(mean) - sigma_squared / 2
+        return self._random.lognormvariate(mu, math.sqrt(sigma_squared))
+
+    def _inject_failures(self):
+        """Randomly raise 429s and server errors"""
+        roll = self._random.random()
+        if roll < self.rate_limit_rate:
+            self.injected_rate_limits += 1
+            raise RateLimitError(
+                "Rate limit reached (injected by mock backend)",
+                response=httpx.Response(
+                    429,
+                    headers={"retry-after": str(self.retry_after_seconds)},
+                    request=httpx.Request("POST", _MOCK_URL),
+                ),
+                body=None,
+            )
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.injected_errors += 1
+            raise InternalServerError(
+                "Server error (injected by mock backend)",
+                response=httpx.Response(500, request=httpx.Request("POST", _MOCK_URL)),
+                body=None,
+            )
+
+    def _usage(self, input_text: str, content: str) -> SimpleNamespace:
+        """Approximate token usage"""
+        input_tokens = max(1, len(input_text) // _CHARS_PER_TOKEN)
+        output_tokens = max(1, len(content) // _CHARS_PER_TOKEN)
+        return SimpleNamespace(
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=input_tokens + output_tokens,
+            input_tokens_details=SimpleNamespace(cached_tokens=self._cached_tokens(input_text)),
+            output_tokens_details=SimpleNamespace(reasoning_tokens=0),
+        )
+
+    def _cached_tokens(self, input_text: str) -> int:
+        """Tokens of the longest block-aligned prefix sent before (remembering this prompt's prefixes)"""
+        block_chars = self.prompt_cache_block_tokens * _CHARS_PER_TOKEN
+        prefix = hashlib.sha256()
+        cached_chars = 0
+        for end in range(block_chars, len(input_text) + 1, block_chars):
+            prefix.update(input_text[end - block_chars:end].encode("utf-8"))
+            key = prefix.hexdigest()
+            if key in self._prompt_cache:
+                self._prompt_cache.move_to_end(key)
+                cached_chars = end
+            else:
+                self._prompt_cache[key] = None
+        while len(self._prompt_cache) > _PROMPT_CACHE_MAX_BLOCKS:
+            self._prompt_cache.popitem(last=False)
+
+        cached_tokens = cached_chars // _CHARS_PER_TOKEN
+        return cached_tokens if cached_tokens >= self.prompt_cache_min_tokens else 0
+
+    def _script(self, input_text: str, previous_response_id: Optional[str], text_format: Optional[dict]) -> str:
+        """Produce an output in the format the prompt (or structured output schema) asks for"""
+        digest = hashlib.sha256(f"{self.seed}:{previous_response_id}:{input_text}".encode("utf-8")).digest()
+        rng = random.Random(digest)
+
+        if text_format and text_format.get("type") == "json_schema":
+            return json.dumps(self._structured(text_format["name"], text_format["schema"], rng))
+
+        if "create an agenda" in input_text:
+            items = [
+                {
+                    "title": f"Question {order}: which option best serves the goal?",
+                    "description": f"State a concrete answer for sub-topic {order}",
+                    "order": order,
+                }
+                for order in range(1, 4)
+            ]
+            return f"```json\n{json.dumps(items)}\n```"
+
+        if "appropriate participants" in input_text:
+            roles = ["Finance", "Marketing", "Technology", "Operations", "Legal", "Strategy"]
+            participants = [
+                {"name": f"{role} Lead", "perspective": f"Evaluates proposals from a {role.lower()} standpoint"}
+                for role in roles[:4 + rng.randint(0, 2)]
+            ]
+            return json.dumps(participants)
+
+        if "persuasive argument" in input_text:
+            return "This option gives the best balance of cost, risk and long-term value, so we should adopt it."
+
+        option = rng.choice(["Continue investment", "Strategic shift", "Withdraw and sell"])
+        return f"Conclusion: {option}\nRationale: It maximizes corporate value under the current constraints."
+
+    def _structured(self, name: str, schema: dict, rng: random.Random) -> dict:
+        """Produce an object matching a structured output schema"""
+        agrees = rng.random() < self.agreement_rate
+        if name == "persuasion_response":
+            return {
+                "decision": "agree" if agrees else "counter_argue",
+                "reason": "The argument addresses my main concern." if agrees
+                          else "The proposal underestimates the risks.",
+            }
+        if name == "counter_argument_response":
+            return {
+                "decision": "support_original" if agrees else "agree_with_counter_argument",
+                "reason": "The risks are manageable." if agrees else "The concern is valid.",
+            }
+        if name == "final_decision":
+            return {
+                "agrees": agrees,
+                "reason": "This is a balanced conclusion." if agrees else "Key risks remain unresolved.",
+            }
+        return self._from_schema(schema, rng)
+
+    def _from_schema(self, schema: dict, rng: random.Random):
+        """Generic value satisfying a (strict) JSON schema"""
+        if "enum" in schema:
+            return rng.choice(schema["enum"])
+        schema_type = schema.get("type")
+        if schema_type == "object":
+            return {key: self._from_schema(value, rng) for key, value in schema.get("properties", {}).items()}
+        if schema_type == "array":
+            return [self._from_schema(schema.get("items", {}), rng) for _ in range(rng.randint(1, 3))]
+        if schema_type == "boolean":
+            return rng.random() < self.agreement_rate
+        if schema_type == "integer":
+            return rng.randint(0, 10)
+        if schema_type == "number":
+            return rng.random()
+        return "Mock value"
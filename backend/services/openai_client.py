@@ -1,25 +1,136 @@
 """OpenAI Responses API client"""
 
 import asyncio
-from openai import AsyncOpenAI
+import time
+from contextlib import asynccontextmanager
+from openai import RateLimitError
 from typing import Optional, Callable, Awaitable
+import httpx
 import logging
+from services.rate_limiter import RateLimiter, Priority, estimate_tokens
+from services.response_cache import ResponseCache
+from services.llm_backends import LLMBackend, OpenAIBackend
+from services.metrics import metrics
+from services.tracing import Span, tracer
+from services.usage_tracker import record_usage
 
 logger = logging.getLogger(__name__)
 
+LLM_RETRIES = metrics.counter("llm_retries_total", "LLM calls retried after a failure", label_names=("reason",))
+LLM_QUEUE_WAIT = metrics.histogram(
+    "llm_queue_wait_seconds",
+    "Time spent waiting for a rate limiter slot",
+    label_names=("priority",),
+)
+LLM_TIME_TO_FIRST_TOKEN = metrics.histogram(
+    "llm_time_to_first_token_seconds",
+    "Time from a streaming call's start to its first text delta",
+)
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read the provider's retry-after hint from an API error"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
 
 class OpenAIResponsesClient:
-    """OpenAI Responses API client"""
+    """OpenAI Responses API client
+
+    Calls go through a pluggable LLMBackend (the OpenAI API by default; a local
+    fake for offline load testing).
+    """
 
-    def __init__(self, api_key: str):
-        self.client = AsyncOpenAI(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str,
+        http_client: Optional[httpx.AsyncClient] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        response_cache: Optional[ResponseCache] = None,
+        backend: Optional[LLMBackend] = None,
+    ):
+        # With a rate limiter, retries are owned by create_with_retry so that every 429 reaches the scheduler
+        self.backend = backend or OpenAIBackend(
+            api_key=api_key,
+            http_client=http_client,
+            max_retries=0 if rate_limiter else None,
+        )
         self.model = "gpt-5-nano"  # Latest compact model
+        self.rate_limiter = rate_limiter
+        self.response_cache = response_cache  # Opt-in; None disables caching
+
+        # Request counters (used for connection pool sizing metrics)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.total_requests = 0
+
+    async def close(self):
+        """Close the backend (and its HTTP connection pool)"""
+        await self.backend.close()
+
+    @asynccontextmanager
+    async def _request_slot(self, input_text: str, priority: Priority):
+        """Wait for a rate limiter slot and count the request as in flight
+
+        Yields a dict in which the caller records "used_tokens" once known,
+        so the limiter can reconcile its estimate with actual usage.
+        """
+        permit = None
+        if self.rate_limiter:
+            wait_started_at = time.monotonic()
+            permit = await self.rate_limiter.acquire(estimate_tokens(input_text), priority)
+            queue_wait = time.monotonic() - wait_started_at
+            LLM_QUEUE_WAIT.observe(queue_wait, priority=priority.name.lower())
+            span = tracer.current_span()
+            if span:
+                span.set_attribute("queue_wait", queue_wait)
+
+        slot = {"used_tokens": None}
+        success = False
+        self.in_flight += 1
+        self.total_requests += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            yield slot
+            success = True
+        except RateLimitError as e:
+            if self.rate_limiter:
+                self.rate_limiter.on_rate_limited(_retry_after_seconds(e))
+            raise
+        finally:
+            self.in_flight -= 1
+            if permit:
+                self.rate_limiter.release(permit, slot["used_tokens"], success)
+
+    def _record_usage(self, response, span: Optional[Span]):
+        """Account the response's token usage to the current session"""
+        usage = record_usage(response)
+        if usage and span:
+            span.set_attributes(
+                input_tokens=usage.input_tokens,
+                cached_input_tokens=usage.cached_input_tokens,
+                output_tokens=usage.output_tokens,
+            )
+
+    def _extract_total_tokens(self, response) -> Optional[int]:
+        """Read total token usage from a response (None if unavailable)"""
+        usage = getattr(response, "usage", None)
+        return getattr(usage, "total_tokens", None)
 
     async def create_response(
         self,
         input_text: str,
         previous_response_id: Optional[str] = None,
         store: bool = True,
+        priority: Priority = Priority.NORMAL,
+        text_format: Optional[dict] = None,
     ) -> dict:
         """
         Generate response using OpenAI Responses API
@@ -31,40 +142,69 @@ class OpenAIResponsesClient:
             input_text: Input prompt
             previous_response_id: Previous response_id (for continuing conversation)
             store: Whether to save conversation on server side
+            priority: Rate limiter lane for this call
+            text_format: Structured output format (`text.format`, e.g. a JSON schema)
 
         Returns:
             {"id": response_id, "content": content}
         """
-        try:
-            # Build Responses API parameters
-            params = {
-                "model": self.model,
-                "input": input_text,
-            }
+        with tracer.span(
+            "llm.create_response",
+            prompt_length=len(input_text),
+            priority=priority.name.lower(),
+            continued=previous_response_id is not None,
+        ) as span:
+            cache_key = None
+            if self.response_cache:
+                cache_key = ResponseCache.make_key(self.model, input_text, previous_response_id, text_format, store)
+                cached = await self.response_cache.get(cache_key)
+                span.set_attribute("cache_hit", cached is not None)
+                if cached:
+                    logger.info(f"Response cache hit: {cached['id']}")
+                    span.set_attribute("output_length", len(cached["content"]))
+                    return cached
 
-            # Add previous_response_id if present
-            if previous_response_id:
-                params["previous_response_id"] = previous_response_id
+            try:
+                # Build Responses API parameters
+                params = {
+                    "model": self.model,
+                    "input": input_text,
+                }
 
-            # Add store parameter
-            if store:
-                params["store"] = True
+                # Add previous_response_id if present
+                if previous_response_id:
+                    params["previous_response_id"] = previous_response_id
 
-            # Call Responses API
-            response = await self.client.responses.create(**params)
+                # Sent either way: the API stores responses unless told not to
+                params["store"] = store
 
-            logger.info(f"OpenAI Response ID: {response.id}")
-            content = self._extract_content(response)
-            logger.info(f"Extracted content length: {len(content)}")
+                if text_format:
+                    params["text"] = {"format": text_format}
 
-            return {
-                "id": response.id,
-                "content": content,
-            }
+                # Call Responses API
+                async with self._request_slot(input_text, priority) as slot:
+                    response = await self.backend.create(**params)
+                    slot["used_tokens"] = self._extract_total_tokens(response)
+                self._record_usage(response, span)
 
-        except Exception as e:
-            logger.error(f"OpenAI API error: {e}", exc_info=True)
-            raise
+                logger.info(f"OpenAI Response ID: {response.id}")
+                content = self._extract_content(response)
+                logger.info(f"Extracted content length: {len(content)}")
+                span.set_attributes(response_id=response.id, output_length=len(content))
+
+                result = {
+                    "id": response.id,
+                    "content": content,
+                }
+
+                if cache_key and content:
+                    await self.response_cache.set(cache_key, result)
+
+                return result
+
+            except Exception as e:
+                logger.error(f"OpenAI API error: {e}", exc_info=True)
+                raise
 
     def _extract_content(self, response) -> str:
         """Extract content from response"""
@@ -85,34 +225,63 @@ class OpenAIResponsesClient:
         previous_response_id: Optional[str] = None,
         max_retries: int = 3,
         base_delay: float = 1.0,
+        priority: Priority = Priority.NORMAL,
+        text_format: Optional[dict] = None,
+        store: bool = True,
     ) -> dict:
         """
         Generate response with retry functionality
 
+        On 429 the provider's retry-after hint is used instead of blind exponential
+        backoff; with a rate limiter the wait happens in the limiter, which pauses
+        every lane for that period.
+
         Args:
             input_text: Input prompt
             previous_response_id: Previous response_id
             max_retries: Maximum number of retries
             base_delay: Base wait time (seconds)
+            priority: Rate limiter lane for this call
+            text_format: Structured output format (`text.format`, e.g. a JSON schema)
+            store: Whether to save conversation on server side
 
         Returns:
             {"id": response_id, "content": content}
         """
-        for attempt in range(max_retries):
-            try:
-                return await self.create_response(
-                    input_text=input_text,
-                    previous_response_id=previous_response_id,
-                )
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    raise
-
-                delay = base_delay * (2**attempt)
-                logger.warning(
-                    f"Retry {attempt + 1}/{max_retries}. Retrying after {delay} seconds: {e}"
-                )
-                await asyncio.sleep(delay)
+        with tracer.span("llm.call", prompt_length=len(input_text), streaming=False) as span:
+            for attempt in range(max_retries):
+                span.set_attribute("retries", attempt)
+                try:
+                    result = await self.create_response(
+                        input_text=input_text,
+                        previous_response_id=previous_response_id,
+                        store=store,
+                        priority=priority,
+                        text_format=text_format,
+                    )
+                    span.set_attribute("output_length", len(result["content"]))
+                    return result
+                except Exception as e:
+                    if attempt == max_retries - 1:
+                        raise
+
+                    delay = self._retry_delay(e, attempt, base_delay)
+                    LLM_RETRIES.inc(reason=type(e).__name__)
+                    logger.warning(
+                        f"Retry {attempt + 1}/{max_retries}. Retrying after {delay} seconds: {e}"
+                    )
+                    await asyncio.sleep(delay)
+
+    def _retry_delay(self, error: Exception, attempt: int, base_delay: float) -> float:
+        """Seconds to wait before retrying a failed call"""
+        if isinstance(error, RateLimitError):
+            # The rate limiter already pauses every lane for the retry-after period
+            if self.rate_limiter:
+                return 0
+            retry_after = _retry_after_seconds(error)
+            if retry_after is not None:
+                return retry_after
+        return base_delay * (2**attempt)
 
     async def create_with_streaming(
         self,
@@ -120,56 +289,144 @@ class OpenAIResponsesClient:
         previous_response_id: Optional[str] = None,
         store: bool = True,
         on_chunk: Optional[Callable[[str], Awaitable[None]]] = None,
+        priority: Priority = Priority.NORMAL,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        text_format: Optional[dict] = None,
     ) -> dict:
         """
         Generate response with streaming
 
+        Consumes the Responses API stream events and forwards each
+        `response.output_text.delta` to on_chunk as soon as it arrives.
+        Failures are retried only while no delta has been forwarded yet.
+
         Args:
             input_text: Input prompt
             previous_response_id: Previous response_id
             store: Whether to save conversation on server side
-            on_chunk: Callback function called for each chunk
+            on_chunk: Callback function called with each text delta
+            priority: Rate limiter lane for this call
+            max_retries: Maximum number of attempts before the first delta
+            base_delay: Base wait time (seconds)
+            text_format: Structured output format (`text.format`, e.g. a JSON schema)
 
         Returns:
             {"id": response_id, "content": complete content}
         """
-        try:
-            params = {
-                "model": self.model,
-                "input": input_text,
-                "stream": True,
-            }
+        with tracer.span(
+            "llm.call",
+            prompt_length=len(input_text),
+            streaming=True,
+            priority=priority.name.lower(),
+            continued=previous_response_id is not None,
+        ) as span:
+            cache_key = None
+            if self.response_cache:
+                cache_key = ResponseCache.make_key(self.model, input_text, previous_response_id, text_format, store)
+                cached = await self.response_cache.get(cache_key)
+                span.set_attribute("cache_hit", cached is not None)
+                if cached:
+                    logger.info(f"Response cache hit: {cached['id']}")
+                    span.set_attribute("output_length", len(cached["content"]))
+                    if on_chunk:
+                        await on_chunk(cached["content"])
+                    return cached
+
+            emitted = False
+            started_at = time.monotonic()
+
+            async def forward(delta: str):
+                nonlocal emitted
+                if not emitted:
+                    time_to_first_token = time.monotonic() - started_at
+                    span.set_attribute("time_to_first_token", time_to_first_token)
+                    LLM_TIME_TO_FIRST_TOKEN.observe(time_to_first_token)
+                emitted = True
+                if on_chunk:
+                    await on_chunk(delta)
+
+            for attempt in range(max_retries):
+                span.set_attribute("retries", attempt)
+                try:
+                    result = await self._stream_response(
+                        input_text, previous_response_id, store, forward, priority, text_format
+                    )
+                    break
+                except Exception as e:
+                    if emitted or attempt == max_retries - 1:
+                        logger.error(f"OpenAI API streaming error: {e}", exc_info=True)
+                        raise
+
+                    delay = self._retry_delay(e, attempt, base_delay)
+                    LLM_RETRIES.inc(reason=type(e).__name__)
+                    logger.warning(
+                        f"Streaming retry {attempt + 1}/{max_retries}. Retrying after {delay} seconds: {e}"
+                    )
+                    await asyncio.sleep(delay)
+
+            span.set_attributes(response_id=result["id"], output_length=len(result["content"]))
+            if cache_key and result["content"]:
+                await self.response_cache.set(cache_key, result)
+
+            return result
+
+    async def _stream_response(
+        self,
+        input_text: str,
+        previous_response_id: Optional[str],
+        store: bool,
+        on_delta: Callable[[str], Awaitable[None]],
+        priority: Priority,
+        text_format: Optional[dict] = None,
+    ) -> dict:
+        """Run a single streaming request and assemble the complete response"""
+        params = {
+            "model": self.model,
+            "input": input_text,
+            "stream": True,
+        }
 
-            if previous_response_id:
-                params["previous_response_id"] = previous_response_id
+        if previous_response_id:
+            params["previous_response_id"] = previous_response_id
 
-            if store:
-                params["store"] = True
+        params["store"] = store
 
-            response_stream = await self.client.responses.create(**params)
+        if text_format:
+            params["text"] = {"format": text_format}
 
-            full_content = ""
-            response_id = None
+        full_content = ""
+        response_id = None
 
-            async for chunk in response_stream:
-                if hasattr(chunk, "id") and chunk.id:
-                    response_id = chunk.id
+        async with self._request_slot(input_text, priority) as slot:
+            response_stream = await self.backend.create(**params)
 
-                if hasattr(chunk, "output_text") and chunk.output_text:
-                    chunk_text = chunk.output_text
-                    full_content = chunk_text
+            async for event in response_stream:
+                event_type = getattr(event, "type", "")
 
-                    if on_chunk:
-                        await on_chunk(chunk_text)
+                if event_type == "response.created":
+                    response_id = event.response.id
 
-            logger.info(f"OpenAI Streaming Response ID: {response_id}")
-            logger.info(f"Total content length: {len(full_content)}")
+                elif event_type == "response.output_text.delta":
+                    full_content += event.delta
+                    await on_delta(event.delta)
 
-            return {
-                "id": response_id,
-                "content": full_content,
-            }
+                elif event_type == "response.completed":
+                    response_id = event.response.id
+                    slot["used_tokens"] = self._extract_total_tokens(event.response)
+                    self._record_usage(event.response, tracer.current_span())
+                    # Fall back to the final text if no deltas were received
+                    if not full_content:
+                        full_content = self._extract_content(event.response)
 
-        except Exception as e:
-            logger.error(f"OpenAI API streaming error: {e}", exc_info=True)
-            raise
+                elif event_type in ("response.failed", "error"):
+                    error = getattr(getattr(event, "response", None), "error", None) or getattr(event, "message", "")
+                    raise RuntimeError(f"Streaming response failed: {error}")
+
+        logger.info(f"OpenAI Streaming Response ID: {response_id}")
+        logger.info(f"Total content length: {len(full_content)}")
+
+        return {
+            "id": response_id,
+            "content": full_content,
+        }
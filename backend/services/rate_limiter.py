@@ -0,0 +1,241 @@
+"""Process-wide rate limiter and concurrency governor for LLM calls"""
+import asyncio
+import itertools
+import logging
+import time
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Output allowance reserved for each request until the actual usage is known
+DEFAULT_OUTPUT_TOKENS = 512
+
+
+class Priority(IntEnum):
+    """Scheduling lane (lower value is served first)"""
+    HIGH = 0  # Facilitator and consensus checks
+    NORMAL = 1  # Votes, persuasion and responses
+    LOW = 2  # Bulk opinion generation
+
+
+@dataclass
+class RatePermit:
+    """Grant returned by RateLimiter.acquire"""
+    tokens: int
+    priority: Priority
+
+
+def estimate_tokens(text: str, output_tokens: int = DEFAULT_OUTPUT_TOKENS) -> int:
+    """Rough token estimate for a request (about 4 characters per token plus output allowance)"""
+    return max(1, len(text) // 4) + output_tokens
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-second rate"""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self, rate_factor: float = 1.0):
+        """Add tokens accrued since the last refill"""
+        now = time.monotonic()
+        elapsed = now - self.updated_at
+        self.updated_at = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second * rate_factor)
+
+    def time_until(self, amount: float, rate_factor: float = 1.0) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)"""
+        missing = min(amount, self.capacity) - self.tokens
+        if missing <= 0:
+            return 0.0
+        return missing / (self.refill_per_second * rate_factor)
+
+    def consume(self, amount: float):
+        """Take tokens (the balance may go negative when usage exceeds the estimate)"""
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """Requests-per-minute / tokens-per-minute scheduler with priority lanes
+
+    Waiters are served by priority (then arrival order), so facilitator and
+    consensus calls overtake queued bulk opinion generation. A waiter moves up
+    one lane for every `aging_seconds` it has been queued, so sustained
+    high-priority load delays lower lanes but cannot starve them. The refill rate
+    adapts to provider throttling: a 429 pauses dispatch for the `retry-after`
+    period and halves the rate, which then recovers gradually on success.
+    """
+
+    MIN_RATE_FACTOR = 0.1
+    RECOVERY_STEP = 0.05
+
+    def __init__(
+        self,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        max_concurrency: int = 0,
+        aging_seconds: float = 0.0,
+    ):
+        self.request_bucket = (
+            TokenBucket(requests_per_minute, requests_per_minute / 60) if requests_per_minute > 0 else None
+        )
+        self.token_bucket = (
+            TokenBucket(tokens_per_minute, tokens_per_minute / 60) if tokens_per_minute > 0 else None
+        )
+        self.max_concurrency = max_concurrency
+        self.aging_seconds = aging_seconds  # 0 disables aging (strict priority)
+        self.rate_factor = 1.0
+        self.paused_until = 0.0
+
+        self.in_flight = 0
+        self._queue: List[tuple] = []
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.granted = 0
+        self.rate_limited = 0
+        self.total_wait_seconds = 0.0
+
+    async def acquire(self, estimated_tokens: int = 0, priority: Priority = Priority.NORMAL) -> RatePermit:
+        """Wait for a slot in the given priority lane"""
+        future = asyncio.get_running_loop().create_future()
+        started_at = time.monotonic()
+        self._queue.append((priority, next(self._sequence), started_at, estimated_tokens, future))
+        self._wake()
+
+        try:
+            permit = await future
+        except asyncio.CancelledError:
+            # Granted just before the waiter was cancelled: hand the slot back
+            if future.done() and not future.cancelled():
+                self.release(future.result())
+            raise
+
+        self.total_wait_seconds += time.monotonic() - started_at
+        return permit
+
+    def release(self, permit: RatePermit, used_tokens: Optional[int] = None, success: bool = True):
+        """Return a slot and reconcile the token estimate with actual usage"""
+        self.in_flight -= 1
+
+        if used_tokens is not None and self.token_bucket:
+            self.token_bucket.tokens = min(
+                self.token_bucket.capacity,
+                self.token_bucket.tokens + permit.tokens - used_tokens,
+            )
+
+        if success and self.rate_factor < 1.0:
+            self.rate_factor = min(1.0, self.rate_factor + self.RECOVERY_STEP)
+
+        self._wake()
+
+    def on_rate_limited(self, retry_after: Optional[float] = None):
+        """Back off after a provider 429"""
+        self.rate_limited += 1
+        self.rate_factor = max(self.MIN_RATE_FACTOR, self.rate_factor / 2)
+
+        if retry_after:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+        # Drop any accumulated burst so dispatch resumes at the reduced rate
+        for bucket in (self.request_bucket, self.token_bucket):
+            if bucket:
+                bucket.tokens = min(bucket.tokens, 0)
+
+        logger.warning(
+            f"Rate limited by provider (retry_after={retry_after}); rate factor now {self.rate_factor:.2f}"
+        )
+        self._wake()
+
+    def get_metrics(self) -> dict:
+        """Scheduler metrics"""
+        queued_by_priority = {priority.name.lower(): 0 for priority in Priority}
+        for priority, _, _, _, future in self._queue:
+            if not future.done():
+                queued_by_priority[Priority(priority).name.lower()] += 1
+
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "queued": queued_by_priority,
+            "granted": self.granted,
+            "rate_limited": self.rate_limited,
+            "rate_factor": self.rate_factor,
+            "paused_for": max(0.0, self.paused_until - time.monotonic()),
+            "average_wait_seconds": self.total_wait_seconds / self.granted if self.granted else 0.0,
+        }
+
+    def _wake(self):
+        """Start the dispatcher or wake it up to re-evaluate the queue"""
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        else:
+            self._wakeup.set()
+
+    def _effective_priority(self, priority: Priority, enqueued_at: float, now: float) -> int:
+        """Priority of a waiter after aging (one lane up per `aging_seconds` queued)"""
+        if self.aging_seconds <= 0:
+            return priority
+        return max(Priority.HIGH, priority - int((now - enqueued_at) // self.aging_seconds))
+
+    def _head(self) -> Optional[tuple]:
+        """Next waiter to serve, dropping cancelled ones (None if the queue is empty)"""
+        self._queue = [entry for entry in self._queue if not entry[-1].done()]
+        if not self._queue:
+            return None
+        now = time.monotonic()
+        return min(
+            self._queue,
+            key=lambda entry: (self._effective_priority(entry[0], entry[2], now), entry[1]),
+        )
+
+    def _delay_until_ready(self, tokens: int) -> Optional[float]:
+        """Seconds until the head request may be sent (None = wait for a release)"""
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+
+        if self.max_concurrency and self.in_flight >= self.max_concurrency:
+            return None
+
+        delay = 0.0
+        if self.request_bucket:
+            self.request_bucket.refill(self.rate_factor)
+            delay = max(delay, self.request_bucket.time_until(1, self.rate_factor))
+        if self.token_bucket:
+            self.token_bucket.refill(self.rate_factor)
+            delay = max(delay, self.token_bucket.time_until(tokens, self.rate_factor))
+        return delay
+
+    async def _dispatch(self):
+        """Grant slots to queued waiters in priority order as budgets allow"""
+        while True:
+            head = self._head()
+            if head is None:
+                return
+            priority, _, _, tokens, future = head
+
+            delay = self._delay_until_ready(tokens)
+            if delay == 0:
+                self._queue.remove(head)
+                if self.request_bucket:
+                    self.request_bucket.consume(1)
+                if self.token_bucket:
+                    self.token_bucket.consume(tokens)
+                self.in_flight += 1
+                self.granted += 1
+                future.set_result(RatePermit(tokens=tokens, priority=Priority(priority)))
+                continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
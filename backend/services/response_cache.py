@@ -0,0 +1,174 @@
+"""Content-addressed cache for LLM responses"""
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Two-tier (in-memory LRU + optional SQLite) cache of LLM responses
+
+    Entries are keyed by the hash of (model, input_text, previous_response_id,
+    text_format, store), so identical prompts on the same conversation state
+    skip the network entirely. `store` is part of the key because only a
+    stored response's ID can be continued.
+    Both tiers apply the same TTL; each tier evicts least recently used entries
+    once it exceeds its size limit. Callers always get their own copy of a
+    response, so mutating it cannot corrupt the cached entry.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 86400,
+        sqlite_path: str = "",
+        sqlite_max_entries: int = 100000,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.sqlite_max_entries = sqlite_max_entries
+        self._memory: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        if sqlite_path:
+            Path(sqlite_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_response_cache_accessed_at ON response_cache (accessed_at)"
+            )
+            self._db.commit()
+            logger.info(f"ResponseCache SQLite tier enabled: {sqlite_path}")
+
+        # Counters
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(
+        model: str,
+        input_text: str,
+        previous_response_id: Optional[str] = None,
+        text_format: Optional[dict] = None,
+        store: bool = True,
+    ) -> str:
+        """Hash of the inputs that fully determine a response"""
+        payload = json.dumps(
+            [model, input_text, previous_response_id, text_format, store], ensure_ascii=False, sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[dict]:
+        """Look up a response (memory first, then SQLite)"""
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry:
+            created_at, value = entry
+            if now - created_at <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return copy.deepcopy(value)
+            del self._memory[key]
+
+        if self._db:
+            row = await asyncio.to_thread(self._db_get, key, now)
+            if row:
+                created_at, value = row
+                self._memory_set(key, copy.deepcopy(value), created_at)
+                self.disk_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: dict):
+        """Store a response in both tiers"""
+        now = time.time()
+        self._memory_set(key, copy.deepcopy(value), now)
+        if self._db:
+            await asyncio.to_thread(self._db_set, key, value, now)
+
+    def get_stats(self) -> dict:
+        """Hit/miss counters"""
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "memory_entries": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "sqlite_enabled": self._db is not None,
+        }
+
+    def close(self):
+        """Close the SQLite tier (worker threads still queued find it closed and skip it)"""
+        with self._db_lock:
+            if self._db:
+                self._db.close()
+                self._db = None
+
+    def _memory_set(self, key: str, value: dict, created_at: float):
+        """Insert into the LRU tier, evicting the least recently used entries"""
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _db_get(self, key: str, now: float) -> Optional[tuple[float, dict]]:
+        """Read a live entry from SQLite (runs in a worker thread)"""
+        with self._db_lock:
+            if not self._db:
+                return None
+            row = self._db.execute(
+                "SELECT value, created_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if not row:
+                return None
+
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._db.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+
+            self._db.execute("UPDATE response_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            return created_at, json.loads(value)
+
+    def _db_set(self, key: str, value: dict, now: float):
+        """Write an entry to SQLite and apply TTL / size eviction (runs in a worker thread)"""
+        with self._db_lock:
+            if not self._db:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            expired = self._db.execute(
+                "DELETE FROM response_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+            ).rowcount
+            overflow = self._db.execute(
+                "DELETE FROM response_cache WHERE key IN ("
+                "SELECT key FROM response_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.sqlite_max_entries,),
+            ).rowcount
+            self._db.commit()
+            self.evictions += expired + overflow
@@ -0,0 +1,575 @@
+"""Registry of discussion sessions running as background jobs"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from config import settings
+from services.agent_manager import AgentManager
+from services.checkpoint_store import CheckpointStore, create_checkpoint_store
+from services.client_registry import ClientRegistry
+from services.discussion_engine import DiscussionEngine
+from services.event_bus import EventBus, InMemoryEventBus, create_event_bus
+from services.event_log import EventLog, EventSpill, create_event_spill
+from services.facilitator import Facilitator
+from services.metrics import metrics
+from services.session_store import InMemorySessionStore, SessionStore, create_session_store
+
+logger = logging.getLogger(__name__)
+
+SESSIONS_ADMITTED = metrics.counter("discussion_sessions_admitted_total", "Discussion sessions accepted")
+SESSIONS_REJECTED = metrics.counter(
+    "discussion_sessions_rejected_total",
+    "Discussion sessions refused by admission control",
+)
+SESSIONS_FINISHED = metrics.counter(
+    "discussion_sessions_finished_total",
+    "Discussion sessions that ended",
+    label_names=("status",),
+)
+SESSIONS_TAKEN_OVER = metrics.counter(
+    "discussion_sessions_taken_over_total",
+    "Discussion sessions resumed after the worker running them stopped",
+)
+
+
+# Streamed text deltas: superseded by the final message event, so they are sent to attached
+# clients only, without a seq, and never take room in the replay log or the event bus
+LIVE_ONLY_EVENT_TYPES = ("message_delta",)
+
+
+class SessionStatus(str, Enum):
+    """Lifecycle of a discussion job"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_STATUSES = (SessionStatus.COMPLETED, SessionStatus.FAILED, SessionStatus.CANCELLED)
+FINISHED_STATUS_VALUES = tuple(status.value for status in FINISHED_STATUSES)
+
+
+class AdmissionError(Exception):
+    """Raised when the registry cannot take another session"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DiscussionJob:
+    """A discussion running independently of any client connection
+
+    Every event the engine emits is numbered and kept in an event log, so
+    clients can attach at any time (replaying what they missed) and detach
+    without affecting the run.
+    """
+
+    def __init__(self, job_id: str, topic: str, engine: DiscussionEngine, log: EventLog):
+        self.id = job_id
+        self.topic = topic
+        self.engine = engine
+        self.status = SessionStatus.QUEUED
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.log = log
+        self.task: Optional[asyncio.Task] = None
+        self.finished = asyncio.Event()
+        # Stopped so that another worker (or a later start of this one) continues it:
+        # no cancel event is published and the checkpoint is kept
+        self.handed_off = False
+        # Called with each event after it is recorded (fans it out to attached clients)
+        self._listeners: List[Callable[["DiscussionJob", dict], Awaitable[None]]] = []
+        # The subset that also receives live-only events
+        self._live_listeners: List[Callable[["DiscussionJob", dict], Awaitable[None]]] = []
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def add_listener(self, listener: Callable[["DiscussionJob", dict], Awaitable[None]], live: bool = True):
+        """Receive the recorded events (and, with live, the live-only ones as well)"""
+        self._listeners.append(listener)
+        if live:
+            self._live_listeners.append(listener)
+
+    async def publish(self, event: dict):
+        """Record an event and pass it to the listeners
+
+        Nothing is awaited between numbering the event and handing it to the
+        listeners, so a client that finishes replaying the log and subscribes
+        in between can neither miss nor repeat an event.
+        """
+        if event["type"] in LIVE_ONLY_EVENT_TYPES:
+            listeners = self._live_listeners
+        else:
+            event = self.log.append(event)
+            listeners = self._listeners
+        for listener in listeners:
+            try:
+                await listener(self, event)
+            except Exception as e:
+                logger.error(f"Session {self.id} event listener error: {e}")
+        await self.log.compact()
+
+    def snapshot(self) -> dict:
+        """Current state for polling clients"""
+        session = self.engine.session
+        usage = self.engine.usage
+        return {
+            "discussion_id": self.id,
+            "topic": self.topic,
+            "status": self.status.value,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "last_seq": self.log.last_seq,
+            "phase": session.phase.value if session else None,
+            "current_agenda_index": session.current_agenda_index if session else None,
+            # Per agenda item, since concurrent items are in different phases
+            "agenda_phases": [
+                {"agenda_index": run.index, "phase": run.phase.value if run.phase else None}
+                for run in self.engine.runs
+            ],
+            "agenda": [item.model_dump(mode="json") for item in session.agenda] if session else [],
+            "agents": [agent.model_dump(mode="json") for agent in self.engine.agents],
+            "final_conclusion": session.final_conclusion if session else None,
+            "usage": usage.snapshot() if usage else None,
+        }
+
+
+class SessionRegistry:
+    """Admit, run and look up discussion jobs
+
+    At most max_concurrent sessions run at once; up to max_queued more wait for
+    a slot and anything beyond that is refused with an AdmissionError. Finished
+    sessions stay available for retention_seconds.
+
+    With a checkpoint store, sessions interrupted by a failure or a restart can
+    be resumed from their last completed phase.
+
+    Several workers can serve the same sessions through a shared session store
+    and event bus: the worker running a session holds its lease and renews it
+    with a heartbeat, publishes every event to the bus and keeps the session's
+    record current. Any worker can then answer polling, replay and attach
+    requests, and takes over sessions whose lease expired by resuming them
+    from their checkpoint (which therefore must be shared too).
+    """
+
+    def __init__(
+        self,
+        client_registry: ClientRegistry,
+        max_concurrent: int = 8,
+        max_queued: int = 16,
+        retention_seconds: float = 3600.0,
+        event_log_max_events: int = 2000,
+        event_spill: Optional[EventSpill] = None,
+        checkpoint_store: Optional[CheckpointStore] = None,
+        max_resume_attempts: int = 3,
+        session_store: Optional[SessionStore] = None,
+        event_bus: Optional[EventBus] = None,
+        worker_id: str = "",
+        lease_seconds: float = 15.0,
+        heartbeat_seconds: float = 5.0,
+    ):
+        self.client_registry = client_registry
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queued = max(0, max_queued)
+        self.retention_seconds = retention_seconds
+        self.event_log_max_events = event_log_max_events
+        self.event_spill = event_spill
+        self.checkpoint_store = checkpoint_store
+        self.max_resume_attempts = max_resume_attempts
+        self.session_store = session_store or InMemorySessionStore()
+        self.event_bus = event_bus or InMemoryEventBus(max_events=event_log_max_events)
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self.jobs: Dict[str, DiscussionJob] = {}
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._listeners: List[Callable[[DiscussionJob, dict], Awaitable[None]]] = []
+        # Strong references to cleanup tasks started by _prune; the loop keeps only weak ones
+        self._cleanup_tasks: Set[asyncio.Task] = set()
+
+    @classmethod
+    def from_settings(cls, client_registry: ClientRegistry) -> "SessionRegistry":
+        """Create a registry configured from application settings"""
+        return cls(
+            client_registry,
+            max_concurrent=settings.max_concurrent_sessions,
+            max_queued=settings.max_queued_sessions,
+            retention_seconds=settings.session_retention_seconds,
+            event_log_max_events=settings.event_log_max_events,
+            event_spill=create_event_spill(),
+            checkpoint_store=create_checkpoint_store(),
+            max_resume_attempts=settings.checkpoint_max_resume_attempts,
+            session_store=create_session_store(),
+            event_bus=create_event_bus(),
+            worker_id=settings.worker_id,
+            lease_seconds=settings.session_lease_seconds,
+            heartbeat_seconds=settings.session_heartbeat_seconds,
+        )
+
+    def add_listener(self, listener: Callable[[DiscussionJob, dict], Awaitable[None]]):
+        """Receive the events of every job started from now on"""
+        self._listeners.append(listener)
+
+    def start_heartbeat(self):
+        """Start renewing leases and taking over abandoned sessions in the background"""
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def start(self, topic: str) -> DiscussionJob:
+        """Admit a discussion and run it in the background on this worker
+
+        Raises:
+            AdmissionError: When running and queued sessions of this worker are at capacity
+        """
+        self._prune()
+        active = self.count(SessionStatus.RUNNING) + self.count(SessionStatus.QUEUED)
+        if active >= self.max_concurrent + self.max_queued:
+            SESSIONS_REJECTED.inc()
+            raise AdmissionError(
+                f"Too many discussions in progress ({active}); try again later",
+                retry_after=self._retry_after(),
+            )
+
+        job_id = f"session_{uuid.uuid4().hex[:8]}"
+        await self.session_store.acquire_lease(job_id, self.worker_id, self.lease_seconds)
+        job = self._create_job(job_id, topic)
+        await self._save_record(job)
+        await self._launch(job, lambda: job.engine.start_discussion(topic, session_id=job.id))
+        SESSIONS_ADMITTED.inc()
+        logger.info(f"Discussion admitted: {job.id} ({active + 1} active)")
+        return job
+
+    async def resume(self, job_id: str) -> DiscussionJob:
+        """Continue a discussion from its last checkpoint (resumed sessions skip admission control)
+
+        Raises:
+            LookupError: When no resumable checkpoint exists for the session
+            ValueError: When the session is still queued or running here or on another worker
+        """
+        existing = self.jobs.get(job_id)
+        if existing and not existing.is_finished:
+            raise ValueError(f"Discussion {job_id} is {existing.status.value}")
+        if not await self.session_store.acquire_lease(job_id, self.worker_id, self.lease_seconds):
+            raise ValueError(f"Discussion {job_id} is running on another worker")
+
+        try:
+            checkpoint = await self.checkpoint_store.load(job_id) if self.checkpoint_store else None
+            if checkpoint is None or checkpoint.get("finished"):
+                raise LookupError(f"No resumable checkpoint for {job_id}")
+            if checkpoint.get("resume_attempts", 0) >= self.max_resume_attempts:
+                raise LookupError(f"{job_id} could not be resumed after {self.max_resume_attempts} attempts")
+            # Continue the event numbering of the previous run, wherever it ran (and even if the
+            # in-memory bus was lost with a restart), so reconnecting clients never see a seq twice
+            start_seq = max(await self.event_bus.last_seq(job_id), checkpoint.get("event_seq", 0))
+            if self.event_spill:
+                start_seq = max(start_seq, await self.event_spill.last_seq(job_id))
+        except BaseException:
+            await self.session_store.release_lease(job_id, self.worker_id)
+            raise
+
+        if existing:
+            start_seq = max(start_seq, existing.log.last_seq)
+        job = self._create_job(job_id, checkpoint["session"]["topic"], start_seq=start_seq)
+        await self._save_record(job)
+        await self._launch(job, lambda: job.engine.resume_discussion(checkpoint))
+        logger.info(f"Discussion resumed from checkpoint: {job_id}")
+        return job
+
+    async def resume_unfinished(self) -> List[DiscussionJob]:
+        """Resume every checkpointed session that had not finished (e.g. after a restart)"""
+        if self.checkpoint_store is None:
+            return []
+        jobs = []
+        for job_id in await self.checkpoint_store.list_unfinished():
+            try:
+                jobs.append(await self.resume(job_id))
+            except Exception as e:
+                logger.warning(f"Could not resume {job_id}: {e}")
+        return jobs
+
+    def get(self, job_id: str) -> Optional[DiscussionJob]:
+        """A session run by this worker"""
+        self._prune()
+        return self.jobs.get(job_id)
+
+    async def describe(self, job_id: str) -> Optional[dict]:
+        """Current state of a session run by any worker"""
+        job = self.get(job_id)
+        if job is not None:
+            return job.snapshot()
+        return await self.session_store.get_record(job_id)
+
+    async def list_sessions(self) -> List[dict]:
+        """Summaries of the sessions of all workers (local state wins over the shared records)"""
+        self._prune()
+        summaries = {
+            record["discussion_id"]: {
+                "discussion_id": record["discussion_id"],
+                "topic": record["topic"],
+                "status": record["status"],
+                "created_at": record["created_at"],
+                "owner": record.get("owner"),
+            }
+            for record in await self.session_store.list_records()
+        }
+        for job in self.jobs.values():
+            summaries[job.id] = {
+                "discussion_id": job.id,
+                "topic": job.topic,
+                "status": job.status.value,
+                "created_at": job.created_at,
+                "owner": self.worker_id,
+            }
+        return sorted(summaries.values(), key=lambda summary: summary["created_at"])
+
+    async def read_events(self, job_id: str, after_seq: int = 0, limit: Optional[int] = None) -> List[dict]:
+        """Events with seq > after_seq, from the local log when it has them and from the event bus otherwise"""
+        job = self.get(job_id)
+        if job is None:
+            return await self.event_bus.read(job_id, after_seq=after_seq, limit=limit)
+        if after_seq + 1 < job.log.first_available_seq:
+            # Older than this run's log (e.g. from before a takeover)
+            events = await self.event_bus.read(job_id, after_seq=after_seq, limit=limit)
+            if events:
+                return events
+        return await job.log.read(after_seq=after_seq, limit=limit)
+
+    async def first_available_seq(self, job_id: str) -> int:
+        """Oldest seq of a session that can still be replayed"""
+        oldest = [event["seq"] for event in await self.event_bus.read(job_id, limit=1)]
+        job = self.get(job_id)
+        if job is not None:
+            oldest.append(job.log.first_available_seq)
+        return min(oldest, default=1)
+
+    def list(self) -> List[DiscussionJob]:
+        self._prune()
+        return list(self.jobs.values())
+
+    def count(self, status: SessionStatus) -> int:
+        return sum(1 for job in self.jobs.values() if job.status == status)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job (False if unknown or already finished)"""
+        job = self.jobs.get(job_id)
+        if job is None or job.is_finished or job.task is None:
+            return False
+        job.task.cancel()
+        return True
+
+    async def request_cancel(self, job_id: str) -> bool:
+        """Cancel a session here, or ask the worker running it to (False if unknown or already finished)"""
+        if job_id in self.jobs:
+            return self.cancel(job_id)
+        record = await self.session_store.get_record(job_id)
+        if record is None or record["status"] in FINISHED_STATUS_VALUES:
+            return False
+        await self.session_store.request_cancel(job_id)
+        return True
+
+    async def shutdown(self):
+        """Stop all unfinished jobs and release them to other workers (their checkpoints are kept for resuming)"""
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+            await asyncio.gather(self._heartbeat_task, return_exceptions=True)
+        tasks = []
+        for job in self.jobs.values():
+            if job.task and not job.task.done():
+                job.handed_off = True
+                job.task.cancel()
+                tasks.append(job.task)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Let pending cleanups finish before their stores are closed
+        await asyncio.gather(*self._cleanup_tasks, return_exceptions=True)
+        if self.event_spill:
+            self.event_spill.close()
+        if self.checkpoint_store:
+            self.checkpoint_store.close()
+        await self.event_bus.close()
+        await self.session_store.close()
+
+    def get_stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            **{status.value: self.count(status) for status in SessionStatus},
+        }
+
+    def _create_job(self, job_id: str, topic: str, start_seq: int = 0) -> DiscussionJob:
+        openai_client = self.client_registry.openai_client
+        agent_manager = AgentManager(openai_client)
+        engine = DiscussionEngine(
+            facilitator=Facilitator(openai_client, agent_manager),
+            agent_manager=agent_manager,
+            message_callback=lambda event: job.publish(event),
+            checkpoint_store=self.checkpoint_store,
+            event_seq=lambda: log.last_seq,
+        )
+        log = EventLog(job_id, max_events=self.event_log_max_events, spill=self.event_spill, start_seq=start_seq)
+        job = DiscussionJob(job_id, topic, engine, log)
+        for listener in self._listeners:
+            job.add_listener(listener)
+        # Last, so local subscribers get each event before anything is awaited
+        job.add_listener(lambda job, event: self.event_bus.publish(job.id, event), live=False)
+        self.jobs[job_id] = job
+        return job
+
+    async def _launch(self, job: DiscussionJob, run_engine: Callable[[], Awaitable[Any]]):
+        """Run a job in the background once its task has entered _run"""
+        job.task = asyncio.create_task(self._run(job, run_engine))
+        # A task cancelled before its first step never runs, so _run could not record
+        # the cancellation and the job would stay queued; let it start first
+        await asyncio.sleep(0)
+
+    async def _run(self, job: DiscussionJob, run_engine: Callable[[], Awaitable[Any]]):
+        try:
+            async with self._slots:
+                job.status = SessionStatus.RUNNING
+                job.started_at = time.time()
+                logger.info(f"Starting discussion {job.id}: {job.topic}")
+                await self._save_record(job)
+                await run_engine()
+            job.status = SessionStatus.COMPLETED
+            logger.info(f"Discussion completed: {job.id}")
+        except asyncio.CancelledError:
+            job.status = SessionStatus.CANCELLED
+            if job.handed_off:
+                logger.info(f"Discussion stopped for another worker to continue: {job.id}")
+            else:
+                logger.info(f"Discussion cancelled: {job.id}")
+                await job.publish({"type": "discussion_cancelled", "data": {"discussion_id": job.id}})
+        except Exception as e:
+            job.status = SessionStatus.FAILED
+            job.error = str(e)
+            logger.error(f"Discussion {job.id} failed: {e}")
+            await job.publish({"type": "error", "data": {"message": str(e)}})
+        finally:
+            job.finished_at = time.time()
+            SESSIONS_FINISHED.inc(status=job.status.value)
+            if job.engine.usage:
+                job.engine.usage.close()
+            if job.handed_off:
+                # The shared record keeps saying "running", so whoever continues it takes over from there
+                if self.jobs.get(job.id) is job:
+                    del self.jobs[job.id]
+            else:
+                # Failed sessions keep their checkpoint for resuming
+                if self.checkpoint_store and job.status != SessionStatus.FAILED:
+                    try:
+                        await self.checkpoint_store.delete(job.id)
+                    except Exception as e:
+                        logger.warning(f"Could not delete checkpoint of {job.id}: {e}")
+                await self._save_record(job)
+            try:
+                await self.session_store.release_lease(job.id, self.worker_id)
+            except Exception as e:
+                logger.warning(f"Could not release the lease of {job.id}: {e}")
+            job.finished.set()
+
+    async def _save_record(self, job: DiscussionJob):
+        """Publish a job's state to the session store (finished records expire after the retention period)"""
+        record = {**job.snapshot(), "owner": self.worker_id, "updated_at": time.time()}
+        try:
+            await self.session_store.put_record(
+                job.id, record, ttl_seconds=self.retention_seconds if job.is_finished else None
+            )
+        except Exception as e:
+            logger.warning(f"Could not save the record of {job.id}: {e}")
+
+    async def _heartbeat_loop(self):
+        while True:
+            try:
+                await self._heartbeat()
+                await self._take_over_abandoned()
+            except Exception as e:
+                logger.warning(f"Session heartbeat failed: {e}")
+            await asyncio.sleep(self.heartbeat_seconds)
+
+    async def _heartbeat(self):
+        """Renew the leases of running jobs, refresh their records and apply cancel requests"""
+        for job in list(self.jobs.values()):
+            if job.is_finished or job.handed_off or job.task is None:
+                continue
+            if not await self.session_store.acquire_lease(job.id, self.worker_id, self.lease_seconds):
+                # Our heartbeat came too late and another worker resumed it from its checkpoint
+                logger.warning(f"Lost the lease of {job.id}; leaving it to the worker that took it over")
+                job.handed_off = True
+                job.task.cancel()
+                continue
+            if await self.session_store.cancel_requested(job.id):
+                self.cancel(job.id)
+                continue
+            await self._save_record(job)
+
+    async def _take_over_abandoned(self):
+        """Resume unfinished sessions whose worker stopped renewing their lease"""
+        for record in await self.session_store.list_records():
+            job_id = record["discussion_id"]
+            if record["status"] in FINISHED_STATUS_VALUES or job_id in self.jobs:
+                continue
+            if not await self.session_store.acquire_lease(job_id, self.worker_id, self.lease_seconds):
+                continue
+            logger.info(f"Taking over {job_id} from {record.get('owner')}")
+            try:
+                await self.resume(job_id)
+                SESSIONS_TAKEN_OVER.inc()
+            except LookupError as e:
+                await self._abandon(record, str(e))
+            except Exception as e:
+                logger.warning(f"Could not take over {job_id}: {e}")
+                await self.session_store.release_lease(job_id, self.worker_id)
+
+    async def _abandon(self, record: dict, reason: str):
+        """Mark a session that nobody can continue as failed, ending the streams of its followers"""
+        job_id = record["discussion_id"]
+        message = f"Worker {record.get('owner')} stopped and the discussion cannot be resumed: {reason}"
+        logger.warning(message)
+        event = {"type": "error", "data": {"message": message}, "seq": await self.event_bus.last_seq(job_id) + 1}
+        await self.event_bus.publish(job_id, event)
+        await self.session_store.put_record(
+            job_id,
+            {**record, "status": SessionStatus.FAILED.value, "error": message, "finished_at": time.time(),
+             "owner": self.worker_id, "updated_at": time.time()},
+            ttl_seconds=self.retention_seconds,
+        )
+        await self.session_store.release_lease(job_id, self.worker_id)
+
+    def _retry_after(self) -> float:
+        """Rough wait until a slot frees up: the mean duration of finished sessions"""
+        durations = [
+            job.finished_at - job.started_at
+            for job in self.jobs.values()
+            if job.started_at and job.finished_at
+        ]
+        return round(sum(durations) / len(durations)) if durations else 60
+
+    def _prune(self):
+        """Forget sessions that finished more than retention_seconds ago"""
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            job = self.jobs.pop(job_id)
+            if job.log.spill:
+                self._start_cleanup(job.log.delete())
+            self._start_cleanup(self.event_bus.delete(job_id))
+
+    def _start_cleanup(self, coro: Awaitable[None]):
+        task = asyncio.get_running_loop().create_task(coro)
+        self._cleanup_tasks.add(task)
+        task.add_done_callback(self._cleanup_tasks.discard)
@@ -0,0 +1,182 @@
+"""Session records and ownership leases shared by the workers serving discussions"""
+import json
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore:
+    """Where workers publish the state of their sessions and claim ownership of them
+
+    A session is run by the worker holding its lease. The owner renews the
+    lease with a heartbeat; once a lease expires any worker may acquire it and
+    take the session over. Records carry the latest status and snapshot, so
+    any worker can answer polling requests for any session.
+    """
+
+    async def put_record(self, session_id: str, record: dict, ttl_seconds: Optional[float] = None):
+        """Store a session's record (expiring after ttl_seconds if given)"""
+        raise NotImplementedError
+
+    async def get_record(self, session_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def list_records(self) -> List[dict]:
+        raise NotImplementedError
+
+    async def acquire_lease(self, session_id: str, owner: str, ttl_seconds: float) -> bool:
+        """Take the lease if it is free or already ours (renewing it for ttl_seconds)"""
+        raise NotImplementedError
+
+    async def release_lease(self, session_id: str, owner: str):
+        """Give up the lease if we hold it"""
+        raise NotImplementedError
+
+    async def request_cancel(self, session_id: str):
+        """Ask the owner of a session to cancel it"""
+        raise NotImplementedError
+
+    async def cancel_requested(self, session_id: str) -> bool:
+        raise NotImplementedError
+
+    async def close(self):
+        """Release store resources"""
+
+
+class InMemorySessionStore(SessionStore):
+    """Single-process store (leases only arbitrate between registries of the same process)"""
+
+    def __init__(self):
+        # session_id -> (expires_at, record)
+        self._records: Dict[str, Tuple[Optional[float], dict]] = {}
+        # session_id -> (owner, expires_at)
+        self._leases: Dict[str, Tuple[str, float]] = {}
+        self._cancel_requests: set = set()
+
+    async def put_record(self, session_id: str, record: dict, ttl_seconds: Optional[float] = None):
+        expires_at = time.monotonic() + ttl_seconds if ttl_seconds else None
+        self._records[session_id] = (expires_at, record)
+
+    async def get_record(self, session_id: str) -> Optional[dict]:
+        self._prune()
+        entry = self._records.get(session_id)
+        return entry[1] if entry else None
+
+    async def list_records(self) -> List[dict]:
+        self._prune()
+        return [record for _, record in self._records.values()]
+
+    async def acquire_lease(self, session_id: str, owner: str, ttl_seconds: float) -> bool:
+        now = time.monotonic()
+        lease = self._leases.get(session_id)
+        if lease and lease[0] != owner and lease[1] > now:
+            return False
+        self._leases[session_id] = (owner, now + ttl_seconds)
+        return True
+
+    async def release_lease(self, session_id: str, owner: str):
+        lease = self._leases.get(session_id)
+        if lease and lease[0] == owner:
+            del self._leases[session_id]
+
+    async def request_cancel(self, session_id: str):
+        self._cancel_requests.add(session_id)
+
+    async def cancel_requested(self, session_id: str) -> bool:
+        return session_id in self._cancel_requests
+
+    def _prune(self):
+        now = time.monotonic()
+        expired = [
+            session_id for session_id, (expires_at, _) in self._records.items()
+            if expires_at is not None and expires_at <= now
+        ]
+        for session_id in expired:
+            del self._records[session_id]
+            self._cancel_requests.discard(session_id)
+
+
+# Extend or delete a key only while it still holds our value
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisSessionStore(SessionStore):
+    """Store on a Redis-compatible server (Redis, Valkey, KeyDB, ...) shared by all workers"""
+
+    def __init__(self, url: str, key_prefix: str = "pangaea"):
+        # Optional dependency: only needed when SESSION_STORE=redis
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url, decode_responses=True)
+        self.key_prefix = key_prefix
+        self._renew = self._redis.register_script(_RENEW_SCRIPT)
+        self._release = self._redis.register_script(_RELEASE_SCRIPT)
+        logger.info(f"Session store: Redis ({url})")
+
+    def _key(self, kind: str, session_id: str = "") -> str:
+        return f"{self.key_prefix}:{kind}:{session_id}" if session_id else f"{self.key_prefix}:{kind}"
+
+    async def put_record(self, session_id: str, record: dict, ttl_seconds: Optional[float] = None):
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.set(
+                self._key("session", session_id),
+                json.dumps(record, ensure_ascii=False),
+                px=int(ttl_seconds * 1000) if ttl_seconds else None,
+            )
+            pipe.sadd(self._key("sessions"), session_id)
+            await pipe.execute()
+
+    async def get_record(self, session_id: str) -> Optional[dict]:
+        value = await self._redis.get(self._key("session", session_id))
+        return json.loads(value) if value else None
+
+    async def list_records(self) -> List[dict]:
+        session_ids = sorted(await self._redis.smembers(self._key("sessions")))
+        if not session_ids:
+            return []
+        values = await self._redis.mget([self._key("session", session_id) for session_id in session_ids])
+        expired = [session_id for session_id, value in zip(session_ids, values) if value is None]
+        if expired:
+            await self._redis.srem(self._key("sessions"), *expired)
+        return [json.loads(value) for value in values if value]
+
+    async def acquire_lease(self, session_id: str, owner: str, ttl_seconds: float) -> bool:
+        key = self._key("lease", session_id)
+        if await self._redis.set(key, owner, nx=True, px=int(ttl_seconds * 1000)):
+            return True
+        return bool(await self._renew(keys=[key], args=[owner, int(ttl_seconds * 1000)]))
+
+    async def release_lease(self, session_id: str, owner: str):
+        await self._release(keys=[self._key("lease", session_id)], args=[owner])
+
+    async def request_cancel(self, session_id: str):
+        await self._redis.set(self._key("cancel", session_id), 1, ex=int(settings.session_retention_seconds))
+
+    async def cancel_requested(self, session_id: str) -> bool:
+        return bool(await self._redis.exists(self._key("cancel", session_id)))
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+def create_session_store() -> SessionStore:
+    """Create the store selected by settings.session_store"""
+    if settings.session_store == "memory":
+        return InMemorySessionStore()
+    if settings.session_store == "redis":
+        return RedisSessionStore(settings.redis_url, key_prefix=settings.redis_key_prefix)
+    raise ValueError(f"Unknown session store: {settings.session_store}")
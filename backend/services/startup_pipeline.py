@@ -0,0 +1,74 @@
+"""Dependency-graph runner for discussion startup stages"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List
+from services.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PipelineStage:
+    """A named startup stage and the stages it depends on"""
+    name: str
+    func: Callable[..., Awaitable[Any]]
+    depends_on: List[str] = field(default_factory=list)
+
+
+class StartupPipeline:
+    """Run startup stages concurrently, starting each one as soon as its dependencies finish
+
+    Each stage function is called with its dependencies' results as keyword
+    arguments (named after the dependency). Dependencies must be registered
+    before the stages that use them, which keeps the graph acyclic.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, PipelineStage] = {}
+        self.durations: Dict[str, float] = {}
+
+    def add_stage(
+        self,
+        name: str,
+        func: Callable[..., Awaitable[Any]],
+        depends_on: List[str] = None,
+    ):
+        """Register a stage"""
+        depends_on = depends_on or []
+        if name in self.stages:
+            raise ValueError(f"Duplicate pipeline stage: {name}")
+        for dependency in depends_on:
+            if dependency not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dependency}'")
+        self.stages[name] = PipelineStage(name=name, func=func, depends_on=depends_on)
+
+    async def run(self) -> Dict[str, Any]:
+        """Run all stages and return their results by name"""
+        tasks: Dict[str, asyncio.Task] = {}
+        started_at = time.monotonic()
+
+        async def run_stage(stage: PipelineStage) -> Any:
+            dependencies = {name: await tasks[name] for name in stage.depends_on}
+            stage_started_at = time.monotonic()
+            with tracer.span(f"startup.{stage.name}", phase=stage.name):
+                result = await stage.func(**dependencies)
+            self.durations[stage.name] = time.monotonic() - stage_started_at
+            return result
+
+        for stage in self.stages.values():
+            tasks[stage.name] = asyncio.create_task(run_stage(stage))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+
+        logger.info(
+            f"Startup pipeline finished in {time.monotonic() - started_at:.2f}s: "
+            + ", ".join(f"{name}={duration:.2f}s" for name, duration in self.durations.items())
+        )
+        return {name: task.result() for name, task in tasks.items()}
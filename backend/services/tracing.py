@@ -0,0 +1,281 @@
+"""Lightweight OpenTelemetry-style tracing
+
+Spans are nested through a context variable, so tasks created inside a span
+(gathered agent calls, startup stages) become its children. Session-level
+attributes such as session_id are inherited by every descendant span. Finished
+spans are batched to a pluggable exporter and their durations are recorded in
+the `span_duration_seconds` Prometheus histogram.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional
+import httpx
+from config import settings
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Attributes copied from a parent span to its children
+INHERITED_ATTRIBUTES = ("session_id", "agenda_index", "agent_id", "phase")
+
+SPAN_DURATION = metrics.histogram(
+    "span_duration_seconds",
+    "Duration of traced operations",
+    label_names=("span", "status"),
+)
+
+
+@dataclass
+class Span:
+    """A timed operation"""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str] = None
+    start_time_ns: int = 0
+    end_time_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Duration in seconds (None while the span is open)"""
+        if self.end_time_ns is None:
+            return None
+        return (self.end_time_ns - self.start_time_ns) / 1e9
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "duration": self.duration}
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class SpanExporter:
+    """Destination for finished spans"""
+
+    async def export(self, spans: List[Span]):
+        raise NotImplementedError
+
+    async def shutdown(self):
+        """Release exporter resources"""
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Keep the most recent spans in memory (served by /api/traces)"""
+
+    def __init__(self, max_spans: int = 10000):
+        self.spans: Deque[Span] = deque(maxlen=max_spans)
+
+    async def export(self, spans: List[Span]):
+        self.spans.extend(spans)
+
+    def get_spans(self, session_id: Optional[str] = None, limit: int = 100) -> List[Span]:
+        """Most recent spans, optionally for one session"""
+        spans = [
+            span for span in self.spans
+            if session_id is None or span.attributes.get("session_id") == session_id
+        ]
+        return spans[-limit:] if limit else spans
+
+
+class JsonlSpanExporter(SpanExporter):
+    """Append spans to a JSON Lines file"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    async def export(self, spans: List[Span]):
+        lines = "".join(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n" for span in spans)
+        await asyncio.to_thread(self._append, lines)
+
+    def _append(self, lines: str):
+        with self.path.open("a", encoding="utf-8") as file:
+            file.write(lines)
+
+
+class OtlpHttpSpanExporter(SpanExporter):
+    """Send spans to an OpenTelemetry collector using OTLP/HTTP with JSON encoding"""
+
+    def __init__(self, endpoint: str, service_name: str, timeout: float = 10.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self._client = httpx.AsyncClient(timeout=timeout)
+
+    async def export(self, spans: List[Span]):
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": self._attributes({"service.name": self.service_name})},
+                "scopeSpans": [{
+                    "scope": {"name": "pangaea-kaigi"},
+                    "spans": [self._span(span) for span in spans],
+                }],
+            }],
+        }
+        response = await self._client.post(self.endpoint, json=payload)
+        response.raise_for_status()
+
+    async def shutdown(self):
+        await self._client.aclose()
+
+    def _span(self, span: Span) -> dict:
+        otlp_span = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(span.start_time_ns),
+            "endTimeUnixNano": str(span.end_time_ns),
+            "attributes": self._attributes(span.attributes),
+            # STATUS_CODE_OK = 1, STATUS_CODE_ERROR = 2
+            "status": {"code": 2, "message": span.error or ""} if span.status == "error" else {"code": 1},
+        }
+        if span.parent_span_id:
+            otlp_span["parentSpanId"] = span.parent_span_id
+        return otlp_span
+
+    def _attributes(self, attributes: Dict[str, Any]) -> List[dict]:
+        converted = []
+        for key, value in attributes.items():
+            if isinstance(value, bool):
+                otlp_value = {"boolValue": value}
+            elif isinstance(value, int):
+                otlp_value = {"intValue": str(value)}
+            elif isinstance(value, float):
+                otlp_value = {"doubleValue": value}
+            else:
+                otlp_value = {"stringValue": str(value)}
+            converted.append({"key": key, "value": otlp_value})
+        return converted
+
+
+class Tracer:
+    """Create spans and batch finished ones to the configured exporter"""
+
+    def __init__(
+        self,
+        exporter: Optional[SpanExporter] = None,
+        export_interval: float = 2.0,
+        max_queue_size: int = 10000,
+    ):
+        self.exporter = exporter
+        self.export_interval = export_interval
+        self._pending: Deque[Span] = deque(maxlen=max_queue_size)
+        self._flush_task: Optional[asyncio.Task] = None
+        self.dropped_spans = 0
+
+    def configure(self, exporter: Optional[SpanExporter], export_interval: float = 2.0):
+        """Replace the exporter"""
+        self.exporter = exporter
+        self.export_interval = export_interval
+
+    @staticmethod
+    def current_span() -> Optional[Span]:
+        return _current_span.get()
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """Time the enclosed block as a child of the current span"""
+        parent = _current_span.get()
+        inherited = {
+            key: parent.attributes[key]
+            for key in INHERITED_ATTRIBUTES
+            if parent and key in parent.attributes
+        }
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else os.urandom(16).hex(),
+            span_id=os.urandom(8).hex(),
+            parent_span_id=parent.span_id if parent else None,
+            start_time_ns=time.time_ns(),
+            attributes={**inherited, **attributes},
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_time_ns = time.time_ns()
+            self._on_end(span)
+
+    def _on_end(self, span: Span):
+        SPAN_DURATION.observe(span.duration, span=span.name, status=span.status)
+        if self.exporter is None:
+            return
+
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped_spans += 1
+        self._pending.append(span)
+
+        if self._flush_task is None or self._flush_task.done():
+            try:
+                self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+            except RuntimeError:
+                # No running loop; the spans go out with the next flush
+                pass
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.export_interval)
+        await self.flush()
+
+    async def flush(self):
+        """Export all pending spans now"""
+        if not self.exporter or not self._pending:
+            return
+        batch = list(self._pending)
+        self._pending.clear()
+        try:
+            await self.exporter.export(batch)
+        except Exception as e:
+            logger.warning(f"Span export failed ({len(batch)} spans dropped): {e}")
+
+    async def shutdown(self):
+        """Flush pending spans and close the exporter"""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush()
+        if self.exporter:
+            await self.exporter.shutdown()
+
+
+# Process-wide tracer (exporter configured in the app lifespan)
+tracer = Tracer()
+
+
+def configure_tracing() -> Optional[SpanExporter]:
+    """Install the exporter selected by settings.tracing_exporter"""
+    exporter_name = settings.tracing_exporter
+    if exporter_name == "memory":
+        exporter = InMemorySpanExporter(max_spans=settings.tracing_memory_max_spans)
+    elif exporter_name == "jsonl":
+        exporter = JsonlSpanExporter(settings.tracing_jsonl_path)
+    elif exporter_name == "otlp":
+        exporter = OtlpHttpSpanExporter(settings.tracing_otlp_endpoint, settings.tracing_service_name)
+    elif exporter_name in ("", "none"):
+        exporter = None
+    else:
+        raise ValueError(f"Unknown tracing exporter: {exporter_name}")
+
+    tracer.configure(exporter, export_interval=settings.tracing_export_interval_seconds)
+    logger.info(f"Tracing exporter: {exporter_name or 'none'}")
+    return exporter
@@ -0,0 +1,198 @@
+"""Token usage and cost accounting per discussion session"""
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Iterator, Optional
+from config import settings
+from services.metrics import metrics
+from services.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+LLM_TOKENS = metrics.counter("llm_tokens_total", "Tokens used by LLM calls", label_names=("kind",))
+
+
+@dataclass
+class TokenUsage:
+    """Token counts for one or more LLM calls"""
+    input_tokens: int = 0
+    cached_input_tokens: int = 0
+    output_tokens: int = 0
+    calls: int = 0
+
+    @classmethod
+    def from_response(cls, response) -> Optional["TokenUsage"]:
+        """Read the `usage` object of a Responses API response (None if absent)"""
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return None
+        details = getattr(usage, "input_tokens_details", None)
+        return cls(
+            input_tokens=getattr(usage, "input_tokens", 0) or 0,
+            cached_input_tokens=getattr(details, "cached_tokens", 0) or 0,
+            output_tokens=getattr(usage, "output_tokens", 0) or 0,
+            calls=1,
+        )
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    @property
+    def cached_input_ratio(self) -> float:
+        """Share of input tokens served from the provider's prompt cache"""
+        return self.cached_input_tokens / self.input_tokens if self.input_tokens else 0.0
+
+    @property
+    def cost_usd(self) -> float:
+        """Estimated cost from the configured per-million-token prices"""
+        uncached_input_tokens = self.input_tokens - self.cached_input_tokens
+        return (
+            uncached_input_tokens * settings.llm_input_cost_per_million
+            + self.cached_input_tokens * settings.llm_cached_input_cost_per_million
+            + self.output_tokens * settings.llm_output_cost_per_million
+        ) / 1_000_000
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TokenUsage":
+        """Inverse of to_dict"""
+        return cls(
+            input_tokens=data.get("input_tokens", 0),
+            cached_input_tokens=data.get("cached_input_tokens", 0),
+            output_tokens=data.get("output_tokens", 0),
+            calls=data.get("calls", 0),
+        )
+
+    def add(self, other: "TokenUsage"):
+        self.input_tokens += other.input_tokens
+        self.cached_input_tokens += other.cached_input_tokens
+        self.output_tokens += other.output_tokens
+        self.calls += other.calls
+
+    def to_dict(self) -> dict:
+        return {
+            "input_tokens": self.input_tokens,
+            "cached_input_tokens": self.cached_input_tokens,
+            "cached_input_ratio": round(self.cached_input_ratio, 4),
+            "output_tokens": self.output_tokens,
+            "total_tokens": self.total_tokens,
+            "calls": self.calls,
+            "cost_usd": round(self.cost_usd, 6),
+        }
+
+
+class UsageTracker:
+    """Aggregate token usage of a session by agent, agenda item and phase
+
+    Calls are attributed using the attributes of the span they run in
+    (agent_id, agenda_index, phase). Updates are coalesced into at most one
+    `on_update` call per update interval.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        token_budget: int = 0,
+        on_update: Optional[Callable[[dict], Awaitable[None]]] = None,
+        update_interval: float = 1.0,
+    ):
+        self.session_id = session_id
+        self.token_budget = token_budget  # 0 = unlimited
+        self.on_update = on_update
+        self.update_interval = update_interval
+        self.total = TokenUsage()
+        self.by_agent: Dict[str, TokenUsage] = {}
+        self.by_agenda_item: Dict[str, TokenUsage] = {}
+        self.by_phase: Dict[str, TokenUsage] = {}
+        self._update_task: Optional[asyncio.Task] = None
+
+    @property
+    def budget_exceeded(self) -> bool:
+        return bool(self.token_budget) and self.total.total_tokens >= self.token_budget
+
+    def record(self, usage: TokenUsage):
+        """Add a call's usage, attributed to the current span's agent, agenda item and phase"""
+        span = tracer.current_span()
+        attributes = span.attributes if span else {}
+        self.total.add(usage)
+        for breakdown, key in (
+            (self.by_agent, attributes.get("agent_id")),
+            (self.by_agenda_item, attributes.get("agenda_index")),
+            (self.by_phase, attributes.get("phase")),
+        ):
+            key = "unattributed" if key is None else str(key)
+            breakdown.setdefault(key, TokenUsage()).add(usage)
+
+        if self.on_update and (self._update_task is None or self._update_task.done()):
+            self._update_task = asyncio.create_task(self._send_update_later())
+
+    def snapshot(self) -> dict:
+        """Current totals and breakdowns"""
+        return {
+            "session_id": self.session_id,
+            "total": self.total.to_dict(),
+            "token_budget": self.token_budget or None,
+            "budget_exceeded": self.budget_exceeded,
+            "by_agent": {key: usage.to_dict() for key, usage in self.by_agent.items()},
+            "by_agenda_item": {key: usage.to_dict() for key, usage in self.by_agenda_item.items()},
+            "by_phase": {key: usage.to_dict() for key, usage in self.by_phase.items()},
+        }
+
+    def restore(self, snapshot: dict):
+        """Continue counting from a snapshot (e.g. of a session resumed from a checkpoint)"""
+        if not snapshot:
+            return
+        self.total = TokenUsage.from_dict(snapshot["total"])
+        self.by_agent = {key: TokenUsage.from_dict(usage) for key, usage in snapshot["by_agent"].items()}
+        self.by_agenda_item = {key: TokenUsage.from_dict(usage) for key, usage in snapshot["by_agenda_item"].items()}
+        self.by_phase = {key: TokenUsage.from_dict(usage) for key, usage in snapshot["by_phase"].items()}
+
+    async def flush(self):
+        """Send an update now (e.g. at the end of the session)"""
+        if self._update_task and not self._update_task.done():
+            self._update_task.cancel()
+        if self.on_update:
+            await self.on_update(self.snapshot())
+
+    def close(self):
+        """Drop a pending update (the session stopped)"""
+        if self._update_task and not self._update_task.done():
+            self._update_task.cancel()
+
+    async def _send_update_later(self):
+        await asyncio.sleep(self.update_interval)
+        try:
+            await self.on_update(self.snapshot())
+        except Exception as e:
+            logger.warning(f"Usage update failed: {e}")
+
+
+_current_tracker: ContextVar[Optional[UsageTracker]] = ContextVar("usage_tracker", default=None)
+
+
+@contextmanager
+def track_usage(tracker: UsageTracker) -> Iterator[UsageTracker]:
+    """Attribute LLM calls made in this context (and tasks it starts) to the tracker"""
+    token = _current_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _current_tracker.reset(token)
+
+
+def record_usage(response) -> Optional[TokenUsage]:
+    """Record a response's usage with the current session's tracker and global counters"""
+    usage = TokenUsage.from_response(response)
+    if usage is None:
+        return None
+
+    LLM_TOKENS.inc(usage.input_tokens - usage.cached_input_tokens, kind="input")
+    LLM_TOKENS.inc(usage.cached_input_tokens, kind="cached_input")
+    LLM_TOKENS.inc(usage.output_tokens, kind="output")
+
+    tracker = _current_tracker.get()
+    if tracker:
+        tracker.record(usage)
+    return usage
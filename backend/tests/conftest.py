@@ -0,0 +1,26 @@
+"""Shared fixtures: every test runs against the offline mock LLM backend"""
+import pytest
+from config import settings
+
+
+@pytest.fixture
+def mock_settings(monkeypatch, tmp_path):
+    """Mock LLM, no rate limits, checkpoints in a temporary SQLite file, in-memory session store and events"""
+    for name, value in {
+        "llm_backend": "mock",
+        "openai_api_key": "test",
+        "mock_llm_latency_ms": 5,
+        "mock_llm_jitter_ms": 0,
+        "mock_llm_latency_distribution": "fixed",
+        "llm_requests_per_minute": 0,
+        "llm_tokens_per_minute": 0,
+        "llm_cache_enabled": False,
+        "checkpoint_store": "sqlite",
+        "checkpoint_sqlite_path": str(tmp_path / "checkpoints.sqlite3"),
+        "event_log_spill": "",
+        # Long discussions must not push their first events out of the in-memory log
+        "event_log_max_events": 100000,
+        "session_store": "memory",
+        "agenda_concurrency": 1,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
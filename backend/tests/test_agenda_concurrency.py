@@ -0,0 +1,37 @@
+"""Progress reporting while several agenda items are discussed at once"""
+import asyncio
+from config import settings
+from models.discussion import DiscussionPhase
+from services.client_registry import ClientRegistry
+from services.session_registry import SessionRegistry
+
+
+def test_concurrent_agenda_items_report_their_own_phase(mock_settings, monkeypatch):
+    monkeypatch.setattr(settings, "checkpoint_store", "none")
+    monkeypatch.setattr(settings, "agenda_concurrency", 3)
+
+    async def scenario():
+        clients = ClientRegistry.from_settings()
+        registry = SessionRegistry.from_settings(clients)
+        snapshots = []
+        try:
+            job = await registry.start("Should we expand overseas?")
+            while not job.finished.is_set():
+                snapshots.append(job.snapshot())
+                await asyncio.sleep(0.005)
+            snapshots.append(job.snapshot())
+        finally:
+            await registry.shutdown()
+            await clients.aclose()
+        return snapshots
+
+    snapshots = asyncio.run(scenario())
+
+    for snap in snapshots:
+        unfinished = [p for p in snap["agenda_phases"] if p["phase"] != DiscussionPhase.COMPLETED.value]
+        if unfinished and unfinished[0]["phase"] is not None:
+            # The session follows the earliest agenda item that is still being discussed
+            assert snap["current_agenda_index"] == unfinished[0]["agenda_index"]
+            assert snap["phase"] == unfinished[0]["phase"]
+    assert all(p["phase"] == DiscussionPhase.COMPLETED.value for p in snapshots[-1]["agenda_phases"])
+    assert snapshots[-1]["phase"] == DiscussionPhase.COMPLETED.value
@@ -0,0 +1,148 @@
+"""Agent conversation state: server chains, local transcripts and compaction"""
+import asyncio
+import pytest
+from services.agent_manager import AgentManager
+from services.mock_llm_backend import MockLLMBackend
+from services.openai_client import OpenAIResponsesClient
+
+
+class RecordingBackend(MockLLMBackend):
+    """Mock backend remembering the parameters of every request"""
+
+    def __init__(self):
+        super().__init__(latency_ms=0, jitter_ms=0, latency_distribution="fixed")
+        self.calls = []
+
+    async def create(self, **params):
+        self.calls.append(params)
+        return await super().create(**params)
+
+
+def _manager(**kwargs) -> tuple[AgentManager, RecordingBackend]:
+    backend = RecordingBackend()
+    return AgentManager(OpenAIResponsesClient(api_key="test", backend=backend), **kwargs), backend
+
+
+async def _opinions(manager: AgentManager, agent, count: int):
+    for index in range(count):
+        await manager.generate_independent_opinion(agent, f"Question {index}", "Pick an option")
+
+
+def test_compaction_is_off_by_default():
+    async def scenario():
+        manager, _ = _manager(conversation_state="server")
+        agent = manager.create_agent("Alice", "Finance")
+        await _opinions(manager, agent, 3)
+        return manager, agent
+
+    manager, agent = asyncio.run(scenario())
+
+    assert not manager.needs_compaction(agent)
+    # Server chains without compaction keep no local transcript
+    assert agent.transcript == []
+
+
+def test_compaction_replaces_summarized_turns_and_starts_a_new_chain():
+    async def scenario():
+        manager, backend = _manager(conversation_state="server", compaction_tokens=50, summary_chars=200)
+        agent = manager.create_agent("Alice", "Finance")
+        await _opinions(manager, agent, 2)
+        assert manager.needs_compaction(agent)
+
+        manager.start_compaction(agent)
+        # Not applied until the summary is ready; the agent keeps working meanwhile
+        manager.apply_compactions([agent])
+        assert len(agent.transcript) == 2
+        await _opinions(manager, agent, 1)
+        (_, _, task), = manager._compactions.values()
+        await task
+        manager.apply_compactions([agent])
+        after_compaction = (agent.notes, len(agent.transcript), agent.response_id)
+
+        calls_before = len(backend.calls)
+        await _opinions(manager, agent, 1)
+        return after_compaction, backend.calls[calls_before]
+
+    (notes, turns_left, response_id), next_call = asyncio.run(scenario())
+
+    assert notes and len(notes) <= 203
+    # The turn made while the summary was being written is kept
+    assert turns_left == 1
+    assert response_id is None
+    # The new chain is seeded with the summary instead of continuing the old one
+    assert next_call.get("previous_response_id") is None
+    assert notes in next_call["input"]
+
+
+def test_cancelled_compaction_leaves_the_agent_unchanged():
+    async def scenario():
+        manager, _ = _manager(conversation_state="server", compaction_tokens=50)
+        agent = manager.create_agent("Alice", "Finance")
+        await _opinions(manager, agent, 2)
+        response_id = agent.response_id
+        manager.start_compaction(agent)
+        manager.cancel_compactions()
+        await asyncio.sleep(0)
+        manager.apply_compactions([agent])
+        return agent, response_id
+
+    agent, response_id = asyncio.run(scenario())
+
+    assert agent.notes == ""
+    assert len(agent.transcript) == 2
+    assert agent.response_id == response_id
+
+
+def test_server_mode_continues_each_agents_stored_chain():
+    async def scenario():
+        manager, backend = _manager(conversation_state="server")
+        agent = manager.create_agent("Alice", "Finance")
+        await _opinions(manager, agent, 2)
+        return backend.calls
+
+    first, second = asyncio.run(scenario())
+
+    assert first["store"] and second["store"]
+    assert first.get("previous_response_id") is None
+    assert second["previous_response_id"]
+
+
+def test_local_mode_sends_the_history_with_every_stateless_call():
+    async def scenario():
+        manager, backend = _manager(conversation_state="local")
+        agent = manager.create_agent("Alice", "Finance")
+        await _opinions(manager, agent, 2)
+        return agent, backend.calls
+
+    agent, (first, second) = asyncio.run(scenario())
+
+    assert not first["store"] and not second["store"]
+    assert second.get("previous_response_id") is None
+    assert agent.response_id is None
+    # The second prompt carries the persona and the first exchange
+    assert "Finance" in second["input"]
+    assert agent.transcript[0].response in second["input"]
+    assert "Question 0" in second["input"]
+
+
+def test_local_turns_beyond_the_window_are_folded_into_labelled_notes():
+    async def scenario():
+        manager, _ = _manager(conversation_state="local", transcript_window=2, note_chars=10, notes_max_lines=2)
+        agent = manager.create_agent("Alice", "Finance")
+        await _opinions(manager, agent, 6)
+        return agent
+
+    agent = asyncio.run(scenario())
+
+    assert len(agent.transcript) <= 2
+    notes = agent.notes.splitlines()
+    # Only the newest notes are kept, each labelled with its turn and capped in length
+    assert len(notes) == 2
+    assert all(note.startswith('- Opinion on "Question') for note in notes)
+    assert all(len(note.split(": ", 1)[1]) <= 13 for note in notes)
+    assert 'Question 0"' not in agent.notes
+
+
+def test_unknown_conversation_state_is_rejected():
+    with pytest.raises(ValueError):
+        _manager(conversation_state="shared")
@@ -0,0 +1,56 @@
+"""Shared LLM clients: one pooled client for every discussion session"""
+import asyncio
+
+from services.client_registry import ClientRegistry
+from services.llm_backends import OpenAIBackend
+from services.session_registry import SessionRegistry, SessionStatus
+
+
+def test_concurrent_discussions_share_one_client(mock_settings):
+    async def scenario():
+        clients = ClientRegistry.from_settings()
+        registry = SessionRegistry.from_settings(clients)
+        try:
+            jobs = [await registry.start(f"Topic {index}") for index in range(2)]
+            await asyncio.wait_for(asyncio.gather(*(job.finished.wait() for job in jobs)), timeout=60)
+        finally:
+            await registry.shutdown()
+            await clients.aclose()
+        return clients, jobs
+
+    clients, jobs = asyncio.run(scenario())
+
+    assert all(job.status == SessionStatus.COMPLETED for job in jobs)
+    for job in jobs:
+        assert job.engine.agent_manager.openai_client is clients.openai_client
+        assert job.engine.facilitator.openai_client is clients.openai_client
+    # Both discussions went through the same client and backend
+    assert clients.openai_client.total_requests == clients.openai_client.backend.requests
+    assert clients.openai_client.peak_in_flight > 1
+
+
+def test_openai_backend_uses_the_pooled_http_client():
+    async def scenario():
+        clients = ClientRegistry(api_key="test", max_connections=7, max_keepalive_connections=3, http2=False)
+        backend = clients.openai_client.backend
+        metrics = clients.get_metrics()
+        await clients.aclose()
+        return clients, backend, metrics
+
+    clients, backend, metrics = asyncio.run(scenario())
+
+    assert isinstance(backend, OpenAIBackend)
+    assert backend.client._client is clients.http_client
+    assert metrics["max_connections"] == 7
+    assert metrics["max_keepalive_connections"] == 3
+    assert metrics["http2"] is False
+    # Closing the registry closes the shared pool
+    assert clients.http_client.is_closed
+
+
+def test_injected_backend_opens_no_http_pool(mock_settings):
+    clients = ClientRegistry.from_settings()
+
+    assert clients.http_client is None
+    assert clients.get_metrics()["backend"] == "MockLLMBackend"
+    asyncio.run(clients.aclose())
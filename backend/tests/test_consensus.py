@@ -0,0 +1,86 @@
+"""Consensus tracking and the early end of persuasion"""
+import asyncio
+from collections import Counter
+import pytest
+from config import settings
+from models.message import Opinion
+from services.client_registry import ClientRegistry
+from services.consensus_tracker import ConsensusTracker
+from services.session_registry import SessionRegistry
+
+
+def _opinion(opinion_id: str, agent_id: str, votes: int) -> Opinion:
+    return Opinion(id=opinion_id, agent_id=agent_id, agent_name=agent_id, content=opinion_id, votes=votes)
+
+
+def test_round_changed_only_when_a_stance_differs():
+    tracker = ConsensusTracker(["a", "b"])
+    tracker.record("op1", "a", True)
+
+    tracker.start_round()
+    assert not tracker.round_changed()
+    # Re-recording the same stance is not a change
+    tracker.record("op1", "a", True)
+    assert not tracker.round_changed()
+    tracker.record("op1", "b", False)
+    assert tracker.round_changed()
+
+    tracker.start_round()
+    tracker.record("op1", "b", True)
+    tracker.record("op1", "b", False)
+    # Only the stances at the end of the round count
+    assert not tracker.round_changed()
+
+
+def test_leading_opinion_prefers_agreement_then_votes():
+    tracker = ConsensusTracker(["a", "b", "c"])
+    first, second, third = _opinion("op1", "a", 1), _opinion("op2", "b", 3), _opinion("op3", "c", 2)
+
+    # No stances yet: the most voted opinion leads
+    assert tracker.leading_opinion([first, second, third]) is second
+
+    tracker.record("op1", "a", True)
+    tracker.record("op1", "c", True)
+    tracker.record("op2", "b", True)
+    assert tracker.leading_opinion([first, second, third]) is first
+    assert tracker.agreeing("op1") == ["a", "c"]
+    assert tracker.unresolved("op1") == ["b"]
+    assert not tracker.is_unanimous("op1")
+
+
+def _persuasion_rounds(events: list) -> int:
+    """Rounds of the first agenda item: each round has one persuasion message per remaining opinion"""
+    persuasions = [
+        event["data"] for event in events
+        if event["type"] == "message"
+        and event["data"]["message_type"] == "persuasion"
+        and event["data"]["agenda_index"] == 0
+    ]
+    per_round = len({message["agent_id"] for message in persuasions})
+    return len(persuasions) // per_round
+
+
+@pytest.mark.parametrize("stalemate_rounds, expected_rounds", [(1, 2), (2, 3), (0, 10)])
+def test_persuasion_ends_after_consecutive_rounds_without_change(
+    mock_settings, monkeypatch, stalemate_rounds, expected_rounds,
+):
+    # Nobody ever agrees, so only the first round changes any stance
+    monkeypatch.setattr(settings, "mock_llm_agreement_rate", 0.0)
+    monkeypatch.setattr(settings, "checkpoint_store", "none")
+    monkeypatch.setattr(settings, "persuasion_stalemate_rounds", stalemate_rounds)
+
+    async def scenario():
+        clients = ClientRegistry.from_settings()
+        registry = SessionRegistry.from_settings(clients)
+        try:
+            job = await registry.start("Should we expand overseas?")
+            await asyncio.wait_for(job.finished.wait(), timeout=60)
+            return await job.log.read()
+        finally:
+            await registry.shutdown()
+            await clients.aclose()
+
+    events = asyncio.run(scenario())
+
+    assert Counter(event["type"] for event in events)["discussion_completed"] == 1
+    assert _persuasion_rounds(events) == expected_rounds
@@ -0,0 +1,84 @@
+"""Context cache: key normalization, TTL and stale windows, persistence"""
+import asyncio
+
+from services.context_cache import ContextCache
+from services.context_retriever import ContextItem, ContextRetriever
+
+ITEMS = [{"source": "notion", "title": "Plan", "content": "Budget plan", "url": None, "metadata": None}]
+
+
+def test_key_ignores_case_spacing_and_keyword_order():
+    key = ContextCache.make_key("notion", "Budget  Plan", ["Cost", "budget"])
+
+    assert key == ContextCache.make_key("notion", "budget plan", ["BUDGET", " cost "])
+    assert key != ContextCache.make_key("slack", "budget plan", ["budget", "cost"])
+    assert key != ContextCache.make_key("notion", "budget plans", ["budget", "cost"])
+
+
+def test_entries_are_fresh_then_stale_then_missing():
+    async def scenario():
+        fresh = ContextCache(ttl_seconds={"notion": 60})
+        stale = ContextCache(ttl_seconds={"notion": 0}, stale_seconds=60)
+        expired = ContextCache(ttl_seconds={"notion": 0}, stale_seconds=0)
+        results = []
+        for cache in (fresh, stale, expired):
+            await cache.set("notion", "key", ITEMS)
+            results.append(await cache.get("notion", "key"))
+        return results
+
+    fresh, stale, expired = asyncio.run(scenario())
+
+    assert fresh == (ITEMS, False)
+    assert stale == (ITEMS, True)
+    assert expired is None
+
+
+def test_sqlite_cache_survives_a_restart(tmp_path):
+    path = str(tmp_path / "context.sqlite3")
+
+    async def scenario():
+        await ContextCache(ttl_seconds={}, sqlite_path=path).set("notion", "key", ITEMS)
+        return await ContextCache(ttl_seconds={}, sqlite_path=path).get("notion", "key")
+
+    assert asyncio.run(scenario()) == (ITEMS, False)
+
+
+def test_stale_entry_is_served_and_refreshed_in_the_background():
+    async def scenario():
+        cache = ContextCache(ttl_seconds={"notion": 0}, stale_seconds=60)
+        retriever = ContextRetriever(use_mock=False, cache=cache)
+        versions = iter(["Old plan", "New plan"])
+
+        async def fetch(topic, keywords):
+            return [ContextItem(source="notion", title="Plan", content=next(versions))]
+
+        first, _ = await retriever._fetch_source_cached("notion", fetch, "topic", [])
+        served, status = await retriever._fetch_source_cached("notion", fetch, "topic", [])
+        await asyncio.gather(*retriever._refresh_tasks)
+        refreshed, _ = await cache.get("notion", ContextCache.make_key("notion", "topic", []))
+        return first, served, status, refreshed
+
+    first, served, status, refreshed = asyncio.run(scenario())
+
+    assert first[0].content == "Old plan"
+    # The stale result is returned at once; the refresh lands in the cache
+    assert status == "stale"
+    assert served[0].content == "Old plan"
+    assert refreshed[0]["content"] == "New plan"
+
+
+def test_empty_results_are_not_cached():
+    async def scenario():
+        cache = ContextCache(ttl_seconds={"notion": 60})
+        retriever = ContextRetriever(use_mock=False, cache=cache)
+        fetches = []
+
+        async def fetch(topic, keywords):
+            fetches.append(topic)
+            return []
+
+        for _ in range(2):
+            await retriever._fetch_source_cached("notion", fetch, "topic", [])
+        return fetches
+
+    assert len(asyncio.run(scenario())) == 2
@@ -0,0 +1,57 @@
+"""Context packing: BM25 ranking, chunking and the token budget"""
+from services.context_packer import ContextPacker, estimate_prompt_tokens, tokenize
+from services.context_retriever import ContextItem, ContextRetriever
+
+CONTEXTS = [
+    ContextItem(source="notion", title="Office move", content="The office lease ends in March.\nMovers are booked."),
+    ContextItem(source="slack", title="Pricing thread", content="Overseas pricing should match local competitors."),
+    ContextItem(source="notion", title="Overseas expansion", content="Overseas expansion budget is 2M.\nHiring starts in Q3."),
+]
+
+
+def test_tokenize_splits_words_and_cjk_bigrams():
+    assert tokenize("Overseas BUDGET, 2024") == ["overseas", "budget", "2024"]
+    assert tokenize("海外展開") == ["海外", "外展", "展開"]
+
+
+def test_relevant_chunks_are_kept_within_the_budget():
+    packer = ContextPacker(chunk_chars=40)
+    chunks = packer.chunk(CONTEXTS)
+    budget = sum(chunk.tokens for chunk in chunks if chunk.item_index == 2)
+
+    selected = packer.pack(CONTEXTS, "overseas expansion budget", budget)
+
+    assert sum(chunk.tokens for chunk in selected) <= budget
+    # The item matching the query (by title and content) wins over the office move
+    assert {chunk.item_index for chunk in selected} == {2}
+
+
+def test_selected_chunks_keep_document_order():
+    packer = ContextPacker(chunk_chars=40)
+
+    selected = packer.pack(CONTEXTS, "overseas pricing expansion budget hiring", token_budget=10_000)
+
+    positions = [(chunk.item_index, chunk.chunk_index) for chunk in selected]
+    assert positions == sorted(positions)
+    assert len(selected) == len(packer.chunk(CONTEXTS))
+
+
+def test_long_paragraphs_are_hard_wrapped():
+    packer = ContextPacker(chunk_chars=10)
+    chunks = packer.chunk([ContextItem(source="notion", title="Long", content="x" * 25)])
+
+    assert [len(chunk.text) for chunk in chunks] == [10, 10, 5]
+
+
+def test_prompt_packs_only_relevant_context():
+    retriever = ContextRetriever(use_mock=True)
+    retriever.packer = ContextPacker(chunk_chars=40)
+    budget = estimate_prompt_tokens(CONTEXTS[2].content)
+
+    packed = retriever.format_contexts_for_prompt(CONTEXTS, query="overseas expansion budget", token_budget=budget)
+    unpacked = retriever.format_contexts_for_prompt(CONTEXTS, query="overseas expansion budget", token_budget=0)
+
+    assert "Overseas expansion budget is 2M." in packed
+    assert "Office move" not in packed
+    # A budget of 0 disables packing
+    assert all(ctx.title in unpacked for ctx in CONTEXTS)
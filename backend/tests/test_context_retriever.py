@@ -0,0 +1,175 @@
+"""Background knowledge retrieval: source selection, deadlines, late results and caching"""
+import asyncio
+import pytest
+from config import settings
+from models.discussion import AgendaItem, DiscussionPhase, DiscussionSession
+from services.context_cache import ContextCache
+from services.context_retriever import ContextItem, ContextRetriever
+from services.discussion_engine import AgendaItemRun, DiscussionEngine
+
+
+@pytest.fixture
+def two_sources(monkeypatch):
+    """Notion answers at once, Slack only after its deadline"""
+    monkeypatch.setattr(settings, "enable_context_retrieval", True)
+    monkeypatch.setattr(settings, "context_cache_enabled", False)
+    monkeypatch.setattr(settings, "notion_token", "notion")
+    monkeypatch.setattr(settings, "slack_bot_token", "slack")
+    monkeypatch.setattr(settings, "atlassian_api_token", "")
+    monkeypatch.setattr(settings, "context_notion_deadline_seconds", 1.0)
+    monkeypatch.setattr(settings, "context_slack_deadline_seconds", 0.05)
+    monkeypatch.setattr(settings, "context_late_results_timeout_seconds", 5.0)
+
+
+def _retriever(cache=None, slack_delay: float = 0.2) -> ContextRetriever:
+    retriever = ContextRetriever(use_mock=False, cache=cache)
+    # Stands in for the Dedalus client, which the fake sources below never use
+    retriever.dedalus_client = object()
+    retriever.fetches = []
+
+    async def notion(topic, keywords):
+        retriever.fetches.append("notion")
+        return [ContextItem(source="notion", title="Plan", content="Budget plan")]
+
+    async def slack(topic, keywords):
+        retriever.fetches.append("slack")
+        await asyncio.sleep(slack_delay)
+        return [ContextItem(source="slack", title="Thread", content="Late thread")]
+
+    retriever._retrieve_from_notion = notion
+    retriever._retrieve_from_slack = slack
+    return retriever
+
+
+def test_source_selection_follows_settings(monkeypatch):
+    monkeypatch.setattr(settings, "dedalus_api_key", "")
+    monkeypatch.setattr(settings, "context_retrieval_source", "auto")
+    assert ContextRetriever.from_settings().use_mock
+
+    monkeypatch.setattr(settings, "dedalus_api_key", "key")
+    monkeypatch.setattr(settings, "notion_token", "token")
+    assert not ContextRetriever.from_settings().use_mock
+
+    monkeypatch.setattr(settings, "context_retrieval_source", "mock")
+    assert ContextRetriever.from_settings().use_mock
+
+    monkeypatch.setattr(settings, "context_retrieval_source", "elsewhere")
+    with pytest.raises(ValueError):
+        ContextRetriever.from_settings()
+
+
+def test_slow_source_is_delivered_after_its_deadline(two_sources):
+    async def scenario():
+        retriever = _retriever()
+        late = asyncio.Event()
+        delivered = []
+
+        async def on_late_results(items):
+            delivered.extend(items)
+            late.set()
+
+        on_time = await retriever.retrieve_context("topic", ["budget"], on_late_results=on_late_results)
+        await asyncio.wait_for(late.wait(), timeout=5)
+        return on_time, delivered
+
+    on_time, delivered = asyncio.run(scenario())
+
+    assert [item.source for item in on_time] == ["notion"]
+    assert [item.source for item in delivered] == ["slack"]
+
+
+def test_slow_source_is_dropped_without_a_late_callback(two_sources):
+    async def scenario():
+        retriever = _retriever()
+        on_time = await retriever.retrieve_context("topic", ["budget"])
+        await asyncio.sleep(0.3)
+        return on_time, retriever._late_tasks
+
+    on_time, late_tasks = asyncio.run(scenario())
+
+    assert [item.source for item in on_time] == ["notion"]
+    assert not late_tasks
+
+
+def test_cancelled_late_results_are_never_delivered(two_sources):
+    async def scenario():
+        retriever = _retriever()
+        delivered = []
+
+        async def on_late_results(items):
+            delivered.extend(items)
+
+        await retriever.retrieve_context("topic", ["budget"], on_late_results=on_late_results)
+        retriever.cancel_late_results()
+        await asyncio.sleep(0.3)
+        return delivered
+
+    assert asyncio.run(scenario()) == []
+
+
+def test_cached_sources_are_not_fetched_again(two_sources):
+    async def scenario():
+        cache = ContextCache(ttl_seconds={"notion": 60, "slack": 60})
+        retriever = _retriever(cache=cache, slack_delay=0)
+        first = await retriever.retrieve_context("Budget  plan", ["budget"])
+        # Same query up to case and spacing
+        second = await retriever.retrieve_context("budget plan", ["BUDGET"])
+        return retriever.fetches, first, second, cache
+
+    fetches, first, second, cache = asyncio.run(scenario())
+
+    assert sorted(fetches) == ["notion", "slack"]
+    assert second == first
+    assert cache.hits == 2
+
+
+def test_late_context_only_reaches_items_awaiting_opinions():
+    async def scenario():
+        engine = DiscussionEngine(
+            facilitator=None, agent_manager=None, message_callback=None,
+            context_retriever=ContextRetriever(use_mock=True, cache=None),
+        )
+        engine.facilitator = type("NoFacilitator", (), {"agent": None})()
+        agenda = [
+            AgendaItem(id=f"agenda_{index}", title=f"Question {index}", description="Budget", order=index + 1)
+            for index in range(3)
+        ]
+        engine.session = DiscussionSession(id="session", topic="topic", agenda=agenda)
+        engine.agenda_context_items = [[] for _ in agenda]
+        engine.agenda_contexts = ["" for _ in agenda]
+        engine.runs = [AgendaItemRun(index, item, []) for index, item in enumerate(agenda)]
+        engine.runs[0].step = "completed"
+        # Opinions of the second item are being generated
+        engine._set_phase(engine.runs[1], DiscussionPhase.INDEPENDENT_OPINIONS)
+
+        await engine._on_late_context([ContextItem(source="slack", title="Thread", content="Budget thread")])
+        return engine
+
+    engine = asyncio.run(scenario())
+
+    assert engine.agenda_contexts[0] == engine.agenda_contexts[1] == ""
+    assert "Budget thread" in engine.agenda_contexts[2]
+    assert [item.title for item in engine.context_items] == ["Thread"]
+
+
+def test_sources_are_queried_concurrently(two_sources, monkeypatch):
+    monkeypatch.setattr(settings, "context_slack_deadline_seconds", 1.0)
+
+    async def scenario():
+        retriever = _retriever(slack_delay=0.2)
+        notion = retriever._retrieve_from_notion
+
+        async def slow_notion(topic, keywords):
+            await asyncio.sleep(0.2)
+            return await notion(topic, keywords)
+
+        retriever._retrieve_from_notion = slow_notion
+        started_at = asyncio.get_running_loop().time()
+        contexts = await retriever.retrieve_context("topic", ["budget"])
+        return contexts, asyncio.get_running_loop().time() - started_at
+
+    contexts, elapsed = asyncio.run(scenario())
+
+    assert sorted(item.source for item in contexts) == ["notion", "slack"]
+    # Both sources take 0.2s; one after the other would take 0.4s
+    assert elapsed < 0.35
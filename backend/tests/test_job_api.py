@@ -0,0 +1,91 @@
+"""HTTP job API: detached discussions, admission control, polling and cancellation"""
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from api.routes import router
+from config import settings
+from services.client_registry import ClientRegistry
+from services.session_registry import SessionRegistry
+
+
+async def _run_with_app(scenario, **registry_kwargs):
+    """Run scenario(client) against an app with its registries (no WebSocket is ever opened)"""
+    app = FastAPI()
+    app.include_router(router)
+    app.state.client_registry = ClientRegistry.from_settings()
+    app.state.session_registry = SessionRegistry(app.state.client_registry, **registry_kwargs)
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await scenario(client)
+    finally:
+        await app.state.session_registry.shutdown()
+        await app.state.client_registry.aclose()
+
+
+async def _wait_for_status(client: httpx.AsyncClient, discussion_id: str, statuses: tuple) -> dict:
+    for _ in range(600):
+        snapshot = (await client.get(f"/api/discussions/{discussion_id}")).json()
+        if snapshot["status"] in statuses:
+            return snapshot
+        await asyncio.sleep(0.05)
+    raise AssertionError(f"{discussion_id} never reached {statuses}")
+
+
+def test_detached_discussion_runs_to_completion_and_can_be_polled(mock_settings):
+    async def scenario(client):
+        started = await client.post("/api/discussions/start", json={"topic": "Should we expand overseas?"})
+        discussion_id = started.json()["discussion_id"]
+        snapshot = await _wait_for_status(client, discussion_id, ("completed", "failed"))
+        events = (await client.get(f"/api/discussions/{discussion_id}/events", params={"limit": 10000})).json()
+        later = (await client.get(f"/api/discussions/{discussion_id}/events", params={"after_seq": 5})).json()
+        missing = await client.get("/api/discussions/session_missing")
+        listed = (await client.get("/api/discussions")).json()
+        return started, snapshot, events, later, missing, listed
+
+    started, snapshot, events, later, missing, listed = asyncio.run(_run_with_app(scenario))
+
+    assert started.status_code == 202
+    assert started.json()["websocket_url"] == f"/ws/discussion/{started.json()['discussion_id']}"
+    assert snapshot["status"] == "completed"
+    seqs = [event["seq"] for event in events["events"]]
+    assert seqs == list(range(1, events["last_seq"] + 1))
+    assert events["events"][-1]["type"] == "discussion_completed"
+    assert [event["seq"] for event in later["events"]][0] == 6
+    assert missing.status_code == 404
+    assert [item["discussion_id"] for item in listed["discussions"]] == [started.json()["discussion_id"]]
+
+
+def test_discussions_beyond_capacity_are_rejected_with_retry_after(mock_settings, monkeypatch):
+    monkeypatch.setattr(settings, "mock_llm_latency_ms", 200)
+
+    async def scenario(client):
+        first = await client.post("/api/discussions/start", json={"topic": "First"})
+        second = await client.post("/api/discussions/start", json={"topic": "Second"})
+        return first, second
+
+    first, second = asyncio.run(_run_with_app(scenario, max_concurrent=1, max_queued=0))
+
+    assert first.status_code == 202
+    assert second.status_code == 429
+    assert int(second.headers["retry-after"]) >= 0
+
+
+def test_running_discussion_can_be_cancelled_once(mock_settings, monkeypatch):
+    monkeypatch.setattr(settings, "mock_llm_latency_ms", 200)
+
+    async def scenario(client):
+        started = await client.post("/api/discussions/start", json={"topic": "Should we expand overseas?"})
+        discussion_id = started.json()["discussion_id"]
+        cancelled = await client.post(f"/api/discussions/{discussion_id}/cancel")
+        snapshot = await _wait_for_status(client, discussion_id, ("cancelled", "completed", "failed"))
+        again = await client.post(f"/api/discussions/{discussion_id}/cancel")
+        return cancelled, snapshot, again
+
+    cancelled, snapshot, again = asyncio.run(_run_with_app(scenario))
+
+    assert cancelled.json()["status"] == "cancelling"
+    assert snapshot["status"] == "cancelled"
+    assert again.status_code == 409
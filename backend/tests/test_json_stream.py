@@ -0,0 +1,96 @@
+"""Incremental parsing of streamed JSON arrays"""
+import asyncio
+import json
+import pytest
+from services.agent_manager import AgentManager
+from services.facilitator import Facilitator
+from utils.json_stream import JsonArrayStreamParser
+
+AGENDA = [
+    {"title": "Cost", "description": "Is the {budget} realistic?", "order": 1},
+    {"title": "Say \"no\"", "description": "Back\\slash and ] bracket", "order": 2},
+]
+
+
+def _feed_in_chunks(parser: JsonArrayStreamParser, text: str, size: int) -> list:
+    items = []
+    for start in range(0, len(text), size):
+        items.extend(parser.feed(text[start:start + size]))
+    return items
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+def test_objects_split_across_chunks(size):
+    text = f"```json\n{json.dumps(AGENDA)}\n```"
+    parser = JsonArrayStreamParser()
+
+    assert _feed_in_chunks(parser, text, size) == AGENDA
+    assert parser.finished and parser.complete
+    assert parser.items == AGENDA
+
+
+def test_escaped_quotes_do_not_end_strings():
+    parser = JsonArrayStreamParser()
+    # The escaped quote comes right before a brace that would close the object if the string ended there
+    text = '[{"title": "a \\"quoted}\\" word", "description": "d"}]'
+
+    assert _feed_in_chunks(parser, text, 2) == [{"title": 'a "quoted}" word', "description": "d"}]
+    assert parser.complete
+
+
+def test_malformed_element_is_skipped_and_reported():
+    parser = JsonArrayStreamParser()
+    text = '[{"title": "A"}, {"title": "B" "oops"}, {"title": "C"}]'
+
+    assert _feed_in_chunks(parser, text, 5) == [{"title": "A"}, {"title": "C"}]
+    assert parser.finished
+    assert parser.skipped == 1
+    assert not parser.complete
+    # Given the array parsed as a whole, the elements the stream did not return are picked out
+    assert parser.missing([{"title": "A"}, {"title": "B"}, {"title": "C"}]) == [{"title": "B"}]
+
+
+def test_cut_off_stream_is_incomplete():
+    parser = JsonArrayStreamParser()
+
+    assert parser.feed('[{"title": "A"}, {"title": "B", "desc') == [{"title": "A"}]
+    assert not parser.complete
+    assert parser.missing([{"title": "A"}, {"title": "B"}]) == [{"title": "B"}]
+
+
+class _StreamingClient:
+    """Streams a fixed response text in small chunks"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+    async def create_with_streaming(self, on_chunk, **kwargs):
+        for start in range(0, len(self.text), 4):
+            await on_chunk(self.text[start:start + 4])
+        return {"id": "resp_1", "content": self.text}
+
+
+def _facilitator(text: str) -> Facilitator:
+    client = _StreamingClient(text)
+    return Facilitator(client, AgentManager(client))
+
+
+def test_agenda_streamed_items_are_delivered_once():
+    streamed = []
+
+    async def on_item(item):
+        streamed.append(item.title)
+
+    agenda = asyncio.run(_facilitator(json.dumps(AGENDA)).create_agenda_with_context("topic", "", on_item=on_item))
+
+    assert [item.title for item in agenda] == streamed == ["Cost", 'Say "no"']
+
+
+def test_agenda_with_an_unparsable_item_is_not_silently_shortened():
+    text = '[{"title": "A", "description": "a"}, {"title": "B" "description": "b"}, {"title": "C", "description": "c"}]'
+
+    async def on_item(item):
+        pass
+
+    with pytest.raises(json.JSONDecodeError):
+        asyncio.run(_facilitator(text).create_agenda_with_context("topic", "", on_item=on_item))
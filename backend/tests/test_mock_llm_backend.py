@@ -0,0 +1,98 @@
+"""Offline mock backend: response chaining, determinism, latency and fault injection"""
+import asyncio
+import time
+
+import pytest
+from openai import BadRequestError, InternalServerError, RateLimitError
+
+from services.mock_llm_backend import MockLLMBackend
+
+
+def _backend(**kwargs) -> MockLLMBackend:
+    return MockLLMBackend(**{"latency_ms": 0, "jitter_ms": 0, "latency_distribution": "fixed", **kwargs})
+
+
+def test_only_stored_responses_can_be_continued():
+    async def scenario():
+        backend = _backend()
+        stored = await backend.create(model="m", input="Question", store=True)
+        await backend.create(model="m", input="Follow-up", previous_response_id=stored.id, store=True)
+        unstored = await backend.create(model="m", input="Question", store=False)
+        with pytest.raises(BadRequestError):
+            await backend.create(model="m", input="Follow-up", previous_response_id=unstored.id, store=True)
+
+    asyncio.run(scenario())
+
+
+def test_outputs_depend_only_on_the_seed_and_the_request():
+    async def outputs(seed: int):
+        backend = _backend(seed=seed)
+        return [(await backend.create(model="m", input=f"Question {index}", store=False)).output_text
+                for index in range(10)]
+
+    async def scenario():
+        return await outputs(0), await outputs(0), await outputs(1)
+
+    first, repeated, other_seed = asyncio.run(scenario())
+
+    assert first == repeated
+    assert first != other_seed
+
+
+def test_fixed_latency_is_simulated():
+    async def scenario():
+        backend = _backend(latency_ms=100)
+        started_at = time.monotonic()
+        await backend.create(model="m", input="Question", store=False)
+        return time.monotonic() - started_at
+
+    assert asyncio.run(scenario()) >= 0.1
+
+
+def test_injected_429s_carry_retry_after():
+    async def scenario():
+        backend = _backend(rate_limit_rate=1.0, retry_after_seconds=2.5)
+        with pytest.raises(RateLimitError) as error:
+            await backend.create(model="m", input="Question", store=False)
+        return backend, error.value
+
+    backend, error = asyncio.run(scenario())
+
+    assert error.response.headers["retry-after"] == "2.5"
+    assert backend.get_stats()["injected_rate_limits"] == 1
+
+
+def test_error_rate_is_applied_per_request():
+    async def scenario():
+        backend = _backend(error_rate=0.3, seed=7)
+        failures = 0
+        for _ in range(500):
+            try:
+                await backend.create(model="m", input="Question", store=False)
+            except InternalServerError:
+                failures += 1
+        return backend, failures
+
+    backend, failures = asyncio.run(scenario())
+
+    assert failures == backend.injected_errors
+    assert 100 < failures < 200
+
+
+def test_structured_outputs_follow_the_agreement_rate():
+    text_format = {"type": "json_schema", "name": "final_decision", "schema": {}}
+
+    async def decisions(agreement_rate: float):
+        backend = _backend(agreement_rate=agreement_rate)
+        return [
+            (await backend.create(model="m", input=f"Agree? {index}", store=False, text={"format": text_format})).output_text
+            for index in range(5)
+        ]
+
+    async def scenario():
+        return await decisions(1.0), await decisions(0.0)
+
+    always, never = asyncio.run(scenario())
+
+    assert all('"agrees": true' in output for output in always)
+    assert all('"agrees": false' in output for output in never)
@@ -0,0 +1,88 @@
+"""Several workers sharing a session store, event bus and checkpoints"""
+import asyncio
+from collections import Counter
+
+from config import settings
+from services.checkpoint_store import create_checkpoint_store
+from services.client_registry import ClientRegistry
+from services.event_bus import InMemoryEventBus
+from services.session_registry import SessionRegistry, SessionStatus
+from services.session_store import InMemorySessionStore
+
+
+def _worker(name: str, clients: ClientRegistry, store: InMemorySessionStore, bus: InMemoryEventBus) -> SessionRegistry:
+    return SessionRegistry(
+        clients,
+        checkpoint_store=create_checkpoint_store(),
+        session_store=store,
+        event_bus=bus,
+        worker_id=name,
+    )
+
+
+async def _wait_for_events(bus: InMemoryEventBus, job_id: str, count: int):
+    for _ in range(600):
+        if await bus.last_seq(job_id) >= count:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"{job_id} published fewer than {count} events")
+
+
+def test_any_worker_can_poll_and_cancel_a_session(mock_settings, monkeypatch):
+    monkeypatch.setattr(settings, "mock_llm_latency_ms", 50)
+
+    async def scenario():
+        clients, store, bus = ClientRegistry.from_settings(), InMemorySessionStore(), InMemoryEventBus()
+        owner, other = _worker("a", clients, store, bus), _worker("b", clients, store, bus)
+        try:
+            job = await owner.start("Should we expand overseas?")
+            await _wait_for_events(bus, job.id, 3)
+            running = await other.describe(job.id)
+            events = await other.read_events(job.id)
+            assert await other.request_cancel(job.id)
+            # The owner applies the request on its next heartbeat
+            await owner._heartbeat()
+            await asyncio.wait_for(job.finished.wait(), timeout=10)
+            return job, running, events, await other.describe(job.id)
+        finally:
+            await owner.shutdown()
+            await other.shutdown()
+            await clients.aclose()
+
+    job, running, events, finished = asyncio.run(scenario())
+
+    assert running["status"] == "running"
+    assert running["owner"] == "a"
+    assert [event["seq"] for event in events][:3] == [1, 2, 3]
+    assert job.status == SessionStatus.CANCELLED
+    assert finished["status"] == "cancelled"
+
+
+def test_session_of_a_stopped_worker_is_taken_over(mock_settings, monkeypatch):
+    monkeypatch.setattr(settings, "mock_llm_latency_ms", 20)
+
+    async def scenario():
+        clients, store, bus = ClientRegistry.from_settings(), InMemorySessionStore(), InMemoryEventBus()
+        first, second = _worker("a", clients, store, bus), _worker("b", clients, store, bus)
+        try:
+            job = await first.start("Should we expand overseas?")
+            await _wait_for_events(bus, job.id, 20)
+            # Stopping hands unfinished sessions over: the record keeps saying "running"
+            await first.shutdown()
+            await second._take_over_abandoned()
+            resumed = second.get(job.id)
+            await asyncio.wait_for(resumed.finished.wait(), timeout=60)
+            return resumed, await bus.read(job.id), await second.describe(job.id)
+        finally:
+            await second.shutdown()
+            await clients.aclose()
+
+    resumed, events, record = asyncio.run(scenario())
+
+    assert resumed.status == SessionStatus.COMPLETED
+    assert record["status"] == "completed"
+    seqs = [event["seq"] for event in events]
+    assert seqs == sorted(set(seqs))
+    types = Counter(event["type"] for event in events)
+    assert types["discussion_completed"] == 1
+    assert types["discussion_cancelled"] == 0
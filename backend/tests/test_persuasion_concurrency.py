@@ -0,0 +1,67 @@
+"""Concurrent persuasion responses keep each agent's conversation linear"""
+import asyncio
+from collections import Counter
+import pytest
+from config import settings
+from services.agent_manager import AgentManager
+from services.client_registry import ClientRegistry
+from services.session_registry import SessionRegistry
+
+
+@pytest.mark.parametrize("conversation_state", ["server", "local"])
+def test_concurrent_persuasion_never_overlaps_calls_of_one_agent(mock_settings, monkeypatch, conversation_state):
+    monkeypatch.setattr(settings, "persuasion_concurrency", 4)
+    monkeypatch.setattr(settings, "conversation_state", conversation_state)
+    monkeypatch.setattr(settings, "checkpoint_store", "none")
+    # Mostly counter-arguments, so persuaders rebut several of them per opinion
+    monkeypatch.setattr(settings, "mock_llm_agreement_rate", 0.2)
+
+    in_flight: Counter = Counter()
+    peak_per_agent = 0
+    peak_total = 0
+    call = AgentManager._call
+
+    async def tracked_call(self, operation, agent, *args, **kwargs):
+        nonlocal peak_per_agent, peak_total
+        in_flight[agent.id] += 1
+        peak_per_agent = max(peak_per_agent, in_flight[agent.id])
+        peak_total = max(peak_total, sum(in_flight.values()))
+        try:
+            return await call(self, operation, agent, *args, **kwargs)
+        finally:
+            in_flight[agent.id] -= 1
+
+    monkeypatch.setattr(AgentManager, "_call", tracked_call)
+
+    async def scenario():
+        clients = ClientRegistry.from_settings()
+        backend = clients.openai_client.backend
+        create = backend.create
+        continued = []
+
+        async def recording_create(**params):
+            if params.get("previous_response_id"):
+                continued.append(params["previous_response_id"])
+            return await create(**params)
+
+        backend.create = recording_create
+        registry = SessionRegistry.from_settings(clients)
+        try:
+            job = await registry.start("Should we expand overseas?")
+            await asyncio.wait_for(job.finished.wait(), timeout=60)
+            return job.status.value, continued
+        finally:
+            await registry.shutdown()
+            await clients.aclose()
+
+    status, continued = asyncio.run(scenario())
+
+    assert status == "completed"
+    # Responses of different agents still run concurrently
+    assert peak_total > 1
+    # but no agent's conversation is ever continued by two calls at once
+    assert peak_per_agent == 1
+    # and no stored response is continued twice (a forked turn would be lost from the chain)
+    assert len(continued) == len(set(continued))
+    if conversation_state == "local":
+        assert not continued
@@ -0,0 +1,68 @@
+"""Prompt ordering for provider prompt caching and cached token reporting"""
+import asyncio
+import os
+
+from services.agent_manager import AgentManager
+from services.mock_llm_backend import MockLLMBackend
+from services.openai_client import OpenAIResponsesClient
+from utils.prompt_builder import build_prompt
+
+CONTEXT = "## Background Knowledge\n" + "The overseas expansion budget is 2M. " * 40
+
+
+class RecordingBackend(MockLLMBackend):
+    """Mock backend remembering every prompt and its usage"""
+
+    def __init__(self, **kwargs):
+        super().__init__(latency_ms=0, jitter_ms=0, latency_distribution="fixed", **kwargs)
+        self.prompts = []
+        self.cached_tokens = []
+
+    async def create(self, **params):
+        response = await super().create(**params)
+        self.prompts.append(params["input"])
+        self.cached_tokens.append(response.usage.input_tokens_details.cached_tokens)
+        return response
+
+
+def test_sections_go_from_most_shared_to_most_specific():
+    prompt = build_prompt(rules="Rules", request="Request", context="Context", agenda="  ", history="History")
+
+    assert prompt == "Rules\n\nContext\n\nHistory\n\nRequest"
+
+
+def test_mock_reports_cached_tokens_for_a_repeated_prefix():
+    backend = MockLLMBackend(prompt_cache_min_tokens=64, prompt_cache_block_tokens=16)
+    shared = "x" * 1024
+
+    first = backend._usage(shared + " first request", "answer")
+    second = backend._usage(shared + " second request", "answer")
+    different = backend._usage("y" + shared, "answer")
+    short = MockLLMBackend(prompt_cache_min_tokens=1024)._usage(shared, "answer")
+
+    assert first.input_tokens_details.cached_tokens == 0
+    assert second.input_tokens_details.cached_tokens == len(shared) // 4
+    # Caching needs an identical prefix from the first character
+    assert different.input_tokens_details.cached_tokens == 0
+    # Prefixes under the minimum length are not cached
+    assert short.input_tokens_details.cached_tokens == 0
+
+
+def test_opinion_prompts_share_everything_before_the_speaker():
+    async def scenario():
+        backend = RecordingBackend(prompt_cache_min_tokens=64, prompt_cache_block_tokens=16)
+        manager = AgentManager(OpenAIResponsesClient(api_key="test", backend=backend))
+        agents = [manager.create_agent("Alice", "Finance"), manager.create_agent("Bob", "Engineering")]
+        for agent in agents:
+            await manager.generate_independent_opinion(agent, "Expansion", "Should we expand overseas?", CONTEXT)
+        return backend
+
+    backend = asyncio.run(scenario())
+
+    first, second = backend.prompts
+    shared = os.path.commonprefix([first, second])
+    assert CONTEXT.strip() in shared
+    assert "Should we expand overseas?" in shared
+    assert "Alice" not in shared and "Bob" not in shared
+    assert backend.cached_tokens[0] == 0
+    assert backend.cached_tokens[1] >= len(CONTEXT) // 4 - 16
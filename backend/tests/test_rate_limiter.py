@@ -0,0 +1,153 @@
+"""Rate limiter: token accounting, provider 429 back-off and priority aging"""
+import asyncio
+import time
+
+import pytest
+
+from services.mock_llm_backend import MockLLMBackend
+from services.openai_client import OpenAIResponsesClient
+from services.rate_limiter import Priority, RateLimiter
+
+
+class ThrottledBackend(MockLLMBackend):
+    """Mock backend answering the first request with a 429 and `retry-after`"""
+
+    def __init__(self, retry_after_seconds: float):
+        super().__init__(
+            latency_ms=0,
+            jitter_ms=0,
+            latency_distribution="fixed",
+            rate_limit_rate=1.0,
+            retry_after_seconds=retry_after_seconds,
+        )
+
+    async def create(self, **params):
+        if self.injected_rate_limits:
+            self.rate_limit_rate = 0.0
+        return await super().create(**params)
+
+
+def test_token_estimate_is_reserved_and_reconciled_with_usage():
+    async def scenario():
+        limiter = RateLimiter(tokens_per_minute=6000)
+        permit = await limiter.acquire(estimated_tokens=1000)
+        reserved = limiter.token_bucket.tokens
+        limiter.release(permit, used_tokens=400)
+        return limiter, reserved
+
+    limiter, reserved = asyncio.run(scenario())
+
+    assert reserved == pytest.approx(5000, abs=1)
+    # The unused 600 tokens of the estimate are returned to the bucket
+    assert limiter.token_bucket.tokens == pytest.approx(5600, abs=1)
+    assert limiter.in_flight == 0
+    assert limiter.granted == 1
+
+
+def test_requests_beyond_the_budget_wait_for_the_refill():
+    async def scenario():
+        # Two requests in the bucket, refilled at one per 0.1s
+        limiter = RateLimiter(requests_per_minute=2)
+        limiter.request_bucket.refill_per_second = 10
+        started_at = time.monotonic()
+        for _ in range(3):
+            limiter.release(await limiter.acquire())
+        return time.monotonic() - started_at
+
+    assert asyncio.run(scenario()) >= 0.09
+
+
+def test_rate_limit_pauses_every_lane_for_retry_after():
+    async def scenario():
+        limiter = RateLimiter(requests_per_minute=600)
+        limiter.on_rate_limited(retry_after=0.2)
+        assert limiter.rate_factor == 0.5
+        assert limiter.request_bucket.tokens <= 0
+
+        started_at = time.monotonic()
+        permit = await limiter.acquire(priority=Priority.HIGH)
+        waited = time.monotonic() - started_at
+        limiter.release(permit)
+        return limiter, waited
+
+    limiter, waited = asyncio.run(scenario())
+
+    assert waited >= 0.2
+    assert limiter.rate_limited == 1
+    # Each successful call recovers part of the halved rate
+    assert limiter.rate_factor == pytest.approx(0.55)
+
+
+def test_client_retries_a_429_after_the_limiter_pause():
+    async def scenario():
+        limiter = RateLimiter(max_concurrency=4)
+        backend = ThrottledBackend(retry_after_seconds=0.2)
+        client = OpenAIResponsesClient(api_key="test", backend=backend, rate_limiter=limiter)
+        started_at = time.monotonic()
+        # A base delay this long would fail the timing check if it were used instead
+        result = await client.create_with_retry("Question", base_delay=5.0)
+        return limiter, backend, result, time.monotonic() - started_at
+
+    limiter, backend, result, elapsed = asyncio.run(scenario())
+
+    assert result["content"]
+    assert backend.requests == 2
+    assert limiter.rate_limited == 1
+    assert 0.2 <= elapsed < 2.0
+
+
+def test_client_without_a_limiter_sleeps_for_retry_after():
+    async def scenario():
+        client = OpenAIResponsesClient(api_key="test", backend=ThrottledBackend(retry_after_seconds=0.2))
+        started_at = time.monotonic()
+        await client.create_with_retry("Question", base_delay=5.0)
+        return time.monotonic() - started_at
+
+    assert 0.2 <= asyncio.run(scenario()) < 2.0
+
+
+async def _low_priority_grant_time(aging_seconds: float, duration: float) -> float:
+    """Seconds until a LOW waiter is served while HIGH calls keep arriving"""
+    limiter = RateLimiter(max_concurrency=1, aging_seconds=aging_seconds)
+    started_at = time.monotonic()
+    low_granted_at = None
+
+    async def call(priority: Priority):
+        permit = await limiter.acquire(priority=priority)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            limiter.release(permit)
+
+    async def low():
+        nonlocal low_granted_at
+        await call(Priority.LOW)
+        low_granted_at = time.monotonic() - started_at
+
+    async def high_stream():
+        # Keep several HIGH calls queued at all times
+        tasks = set()
+        while time.monotonic() - started_at < duration:
+            while len(tasks) < 3:
+                tasks.add(asyncio.create_task(call(Priority.HIGH)))
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        await asyncio.gather(*tasks)
+
+    high = asyncio.create_task(high_stream())
+    await asyncio.sleep(0)
+    await low()
+    await high
+    return low_granted_at
+
+
+def test_aging_serves_low_priority_under_sustained_high_load():
+    granted_at = asyncio.run(_low_priority_grant_time(aging_seconds=0.05, duration=1.0))
+
+    # LOW reaches the HIGH lane after two aging intervals, well before the HIGH stream ends
+    assert granted_at < 0.5
+
+
+def test_strict_priority_without_aging_starves_low_priority():
+    granted_at = asyncio.run(_low_priority_grant_time(aging_seconds=0, duration=0.3))
+
+    assert granted_at >= 0.3
@@ -0,0 +1,29 @@
+"""Response cache isolation and shutdown"""
+import asyncio
+from services.response_cache import ResponseCache
+
+
+def test_cached_responses_are_copies(tmp_path):
+    async def scenario():
+        cache = ResponseCache(sqlite_path=str(tmp_path / "cache.sqlite3"))
+        response = {"output": [{"text": "yes"}]}
+        await cache.set("key", response)
+        response["output"].append({"text": "changed by the caller"})
+        (await cache.get("key"))["output"].clear()
+        cached = await cache.get("key")
+        cache.close()
+        return cached
+
+    assert asyncio.run(scenario()) == {"output": [{"text": "yes"}]}
+
+
+def test_close_while_a_write_is_queued(tmp_path):
+    async def scenario():
+        cache = ResponseCache(sqlite_path=str(tmp_path / "cache.sqlite3"))
+        write = asyncio.create_task(cache.set("key", {"output": []}))
+        await asyncio.sleep(0)
+        cache.close()
+        await write
+        return await cache.get("other")
+
+    assert asyncio.run(scenario()) is None
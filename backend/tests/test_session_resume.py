@@ -0,0 +1,100 @@
+"""Resuming checkpointed discussions after a process restart"""
+import asyncio
+from config import settings
+from services.client_registry import ClientRegistry
+from services.session_registry import SessionRegistry
+
+
+async def _crash_after_first_agenda_item(registry: SessionRegistry) -> tuple[str, int]:
+    """Returns the session ID and the event seq saved with its last checkpoint"""
+    job = await registry.start("Should we expand overseas?")
+    while True:
+        await asyncio.sleep(0.01)
+        checkpoint = await registry.checkpoint_store.load(job.id)
+        if checkpoint and checkpoint["runs"][0]["step"] == "completed":
+            break
+    # A crash publishes nothing more and keeps the checkpoint
+    job.handed_off = True
+    job.task.cancel()
+    await asyncio.gather(job.task, return_exceptions=True)
+    checkpoint = await registry.checkpoint_store.load(job.id)
+    assert 0 < checkpoint["event_seq"] <= job.log.last_seq
+    return job.id, checkpoint["event_seq"]
+
+
+def test_resume_after_restart_continues_event_numbering(mock_settings):
+    async def scenario():
+        # Shared by both registries: it holds the mock provider's stored responses, which outlive a restart
+        clients = ClientRegistry.from_settings()
+        registry = SessionRegistry.from_settings(clients)
+        job_id, checkpointed_seq = await _crash_after_first_agenda_item(registry)
+        await registry.shutdown()
+
+        # A new process: empty in-memory event bus and session store, same checkpoint store
+        registry = SessionRegistry.from_settings(clients)
+        try:
+            jobs = await registry.resume_unfinished()
+            assert [job.id for job in jobs] == [job_id]
+            await asyncio.wait_for(jobs[0].finished.wait(), timeout=60)
+            events = await jobs[0].log.read()
+        finally:
+            await registry.shutdown()
+            await clients.aclose()
+        return checkpointed_seq, events
+
+    checkpointed_seq, events = asyncio.run(scenario())
+
+    assert events[0]["type"] == "discussion_resumed"
+    # Numbering continues after the checkpoint instead of restarting at 1
+    assert events[0]["seq"] == checkpointed_seq + 1
+    assert [event["seq"] for event in events] == list(range(events[0]["seq"], events[0]["seq"] + len(events)))
+    assert events[-1]["type"] == "discussion_completed"
+
+
+def test_resume_mid_persuasion_continues_from_last_round(mock_settings, monkeypatch):
+    # Few agreements, so persuasion takes several rounds
+    monkeypatch.setattr(settings, "mock_llm_agreement_rate", 0.1)
+
+    async def scenario():
+        clients = ClientRegistry.from_settings()
+        registry = SessionRegistry.from_settings(clients)
+        try:
+            store = registry.checkpoint_store
+            save = store.save
+            crashed = asyncio.Event()
+
+            async def save_then_crash(session_id, checkpoint):
+                # Crash right after the first mid-persuasion checkpoint, before the item can finish
+                await save(session_id, checkpoint)
+                if not crashed.is_set() and checkpoint["runs"][0]["persuasion_round"] >= 1:
+                    crashed.set()
+                    job.handed_off = True
+                    job.task.cancel()
+
+            monkeypatch.setattr(store, "save", save_then_crash)
+            job = await registry.start("Should we expand overseas?")
+            await asyncio.wait_for(crashed.wait(), timeout=60)
+            await asyncio.gather(job.task, return_exceptions=True)
+            monkeypatch.setattr(store, "save", save)
+            checkpoint = await store.load(job.id)
+
+            resumed = await registry.resume(job.id)
+            await asyncio.wait_for(resumed.finished.wait(), timeout=60)
+            events = await resumed.log.read(after_seq=resumed.log.start_seq)
+        finally:
+            await registry.shutdown()
+            await clients.aclose()
+        return checkpoint, resumed, events
+
+    checkpoint, resumed, events = asyncio.run(scenario())
+
+    assert resumed.status.value == "completed"
+    # The first agenda item goes straight back to persuasion, without repeating its earlier phases
+    first_item_phases = [
+        event["data"]["phase"] for event in events
+        if event["type"] == "phase_changed" and event["data"]["agenda_index"] == 0
+    ]
+    assert first_item_phases == ["persuasion"]
+    # Progress after the resume clears the attempt counter
+    assert resumed.engine.resume_attempts == 0
+    assert checkpoint["resume_attempts"] == 0
@@ -0,0 +1,7 @@
+"""Defaults that cost money or write files stay opt-in"""
+from config import Settings
+
+
+def test_checkpoints_and_resume_on_startup_are_opt_in():
+    assert Settings.model_fields["checkpoint_store"].default == ""
+    assert Settings.model_fields["checkpoint_resume_on_startup"].default is False
@@ -0,0 +1,136 @@
+"""Token streaming: delta forwarding, retries and failure events"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from services.agent_manager import AgentManager
+from services.mock_llm_backend import MockLLMBackend
+from services.openai_client import OpenAIResponsesClient
+
+
+class FlakyStreamingBackend(MockLLMBackend):
+    """Mock backend whose first stream fails, before or after its first delta"""
+
+    def __init__(self, fail_after_deltas: int):
+        super().__init__(latency_ms=0, jitter_ms=0, latency_distribution="fixed", stream_chunk_chars=4)
+        self.fail_after_deltas = fail_after_deltas
+
+    async def create(self, **params):
+        stream = await super().create(**params)
+        if self.requests > 1:
+            return stream
+        return self._failing(stream)
+
+    async def _failing(self, stream):
+        deltas = 0
+        async for event in stream:
+            if event.type == "response.output_text.delta":
+                if deltas == self.fail_after_deltas:
+                    raise ConnectionError("stream interrupted")
+                deltas += 1
+            yield event
+
+
+class FailedResponseBackend(MockLLMBackend):
+    """Mock backend whose stream ends with a response.failed event"""
+
+    async def create(self, **params):
+        async def stream():
+            yield SimpleNamespace(type="response.created", response=SimpleNamespace(id="resp_failed"))
+            yield SimpleNamespace(
+                type="response.failed",
+                response=SimpleNamespace(id="resp_failed", error="model overloaded"),
+            )
+
+        return stream()
+
+
+def _client(backend: MockLLMBackend) -> OpenAIResponsesClient:
+    return OpenAIResponsesClient(api_key="test", backend=backend)
+
+
+def test_deltas_are_forwarded_as_they_arrive():
+    async def scenario():
+        backend = MockLLMBackend(latency_ms=0, jitter_ms=0, latency_distribution="fixed", stream_chunk_chars=4)
+        client = _client(backend)
+        chunks = []
+
+        async def on_chunk(delta: str):
+            chunks.append(delta)
+
+        result = await client.create_with_streaming("Give your opinion", on_chunk=on_chunk)
+        # A stored streamed response can be continued like any other
+        follow_up = await client.create_with_streaming("And why?", previous_response_id=result["id"])
+        return chunks, result, follow_up
+
+    chunks, result, follow_up = asyncio.run(scenario())
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 4 for chunk in chunks)
+    assert "".join(chunks) == result["content"]
+    assert result["id"].startswith("resp_mock_")
+    assert follow_up["content"]
+
+
+def test_failure_before_the_first_delta_is_retried():
+    async def scenario():
+        backend = FlakyStreamingBackend(fail_after_deltas=0)
+        chunks = []
+
+        async def on_chunk(delta: str):
+            chunks.append(delta)
+
+        result = await _client(backend).create_with_streaming("Question", on_chunk=on_chunk, base_delay=0)
+        return backend, chunks, result
+
+    backend, chunks, result = asyncio.run(scenario())
+
+    assert backend.requests == 2
+    # Nothing from the failed attempt reached the callback
+    assert "".join(chunks) == result["content"]
+
+
+def test_failure_after_a_delta_is_not_retried():
+    async def scenario():
+        backend = FlakyStreamingBackend(fail_after_deltas=2)
+        chunks = []
+
+        async def on_chunk(delta: str):
+            chunks.append(delta)
+
+        with pytest.raises(ConnectionError):
+            await _client(backend).create_with_streaming("Question", on_chunk=on_chunk, base_delay=0)
+        return backend, chunks
+
+    backend, chunks = asyncio.run(scenario())
+
+    assert backend.requests == 1
+    assert len(chunks) == 2
+
+
+def test_failed_response_event_raises():
+    async def scenario():
+        await _client(FailedResponseBackend()).create_with_streaming("Question", max_retries=1)
+
+    with pytest.raises(RuntimeError, match="model overloaded"):
+        asyncio.run(scenario())
+
+
+def test_agent_opinion_streams_to_the_callback():
+    async def scenario():
+        backend = MockLLMBackend(latency_ms=0, jitter_ms=0, latency_distribution="fixed")
+        manager = AgentManager(_client(backend))
+        agent = manager.create_agent("Alice", "Finance")
+        chunks = []
+
+        async def on_stream(delta: str):
+            chunks.append(delta)
+
+        content, _ = await manager.generate_independent_opinion(agent, "Question", "Pick an option", on_stream=on_stream)
+        return chunks, content
+
+    chunks, content = asyncio.run(scenario())
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == content
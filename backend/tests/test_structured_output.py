@@ -0,0 +1,107 @@
+"""Structured outputs for votes and decisions, and the free-text fallbacks"""
+import asyncio
+
+import pytest
+
+from models.decision import FinalDecision, PersuasionResponse, VoteDecision
+from models.message import Opinion
+from services.agent_manager import AgentManager
+from services.mock_llm_backend import MockLLMBackend
+from services.openai_client import OpenAIResponsesClient
+from utils.structured_output import json_schema_format, parse_structured
+
+
+class ScriptedBackend(MockLLMBackend):
+    """Mock backend answering every request with a fixed text"""
+
+    def __init__(self, reply: str):
+        super().__init__(latency_ms=0, jitter_ms=0, latency_distribution="fixed")
+        self.reply = reply
+        self.formats = []
+
+    async def create(self, **params):
+        self.formats.append((params.get("text") or {}).get("format"))
+        return await super().create(**params)
+
+    def _script(self, input_text, previous_response_id, text_format):
+        return self.reply
+
+
+def _manager(reply: str) -> tuple[AgentManager, ScriptedBackend]:
+    backend = ScriptedBackend(reply)
+    return AgentManager(OpenAIResponsesClient(api_key="test", backend=backend)), backend
+
+
+def test_schema_is_strict_with_inlined_enums():
+    text_format = json_schema_format(PersuasionResponse, "persuasion_response")
+    schema = text_format["schema"]
+
+    assert text_format["strict"] is True
+    assert schema["additionalProperties"] is False
+    assert schema["required"] == ["decision", "reason"]
+    assert schema["properties"]["decision"]["enum"] == ["agree", "counter_argue"]
+    assert "$defs" not in schema and "title" not in schema
+
+
+def test_vote_schema_only_admits_the_presented_opinions():
+    schema = json_schema_format(VoteDecision, "vote", enums={"opinion_id": ["op_1", "op_2"]})["schema"]
+
+    assert schema["properties"]["opinion_id"]["enum"] == ["op_1", "op_2"]
+
+
+def test_parse_tolerates_text_around_the_object():
+    assert parse_structured('{"agrees": true, "reason": "ok"}', FinalDecision).agrees is True
+    assert parse_structured('Sure:\n{"agrees": false, "reason": "risky"}\nThanks', FinalDecision).agrees is False
+    assert parse_structured('{"agrees": "maybe"}', FinalDecision) is None
+    assert parse_structured("Yes", FinalDecision) is None
+
+
+def test_vote_is_read_from_the_structured_reply():
+    opinions = [
+        Opinion(id="op_1", agent_id="a", agent_name="Alice", content="Expand"),
+        Opinion(id="op_2", agent_id="b", agent_name="Bob", content="Wait"),
+    ]
+
+    async def scenario():
+        manager, backend = _manager('{"opinion_id": "op_2", "reason": "Lower risk"}')
+        vote = await manager.vote_for_opinion(manager.create_agent("Carol", "Legal"), opinions)
+        return vote, backend.formats[0]
+
+    vote, text_format = asyncio.run(scenario())
+
+    assert vote == "op_2"
+    assert text_format["schema"]["properties"]["opinion_id"]["enum"] == ["op_1", "op_2"]
+
+
+@pytest.mark.parametrize("reply, agrees", [
+    ('{"decision": "agree", "reason": "Convinced"}', True),
+    ('{"decision": "counter_argue", "reason": "I agree the cost is low, but the risk is high"}', False),
+    # Free-text fallbacks
+    ("I agree with this proposal.", True),
+    ("I disagree with this proposal.", False),
+    ("Counter-argue: I agree on cost but not on risk.", False),
+])
+def test_persuasion_response_decision(reply, agrees):
+    async def scenario():
+        manager, _ = _manager(reply)
+        agent = manager.create_agent("Carol", "Legal")
+        return await manager.respond_to_persuasion(agent, "Please agree", "Wait", ["Expand"])
+
+    _, _, is_agreement = asyncio.run(scenario())
+
+    assert is_agreement is agrees
+
+
+@pytest.mark.parametrize("reply, agrees", [
+    ('{"agrees": false, "reason": "Yes, the risks remain"}', False),
+    ("Yes, this is acceptable.", True),
+    ("No. Eyes on the risk instead.", False),
+])
+def test_final_decision(reply, agrees):
+    async def scenario():
+        manager, _ = _manager(reply)
+        return await manager.make_final_decision(manager.create_agent("Carol", "Legal"), "Expand")
+
+    decision, _ = asyncio.run(scenario())
+
+    assert decision is agrees
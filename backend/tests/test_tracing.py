@@ -0,0 +1,92 @@
+"""Span tracing and Prometheus metrics"""
+import asyncio
+
+import pytest
+
+from services.agent_manager import AgentManager
+from services.metrics import MetricsRegistry
+from services.mock_llm_backend import MockLLMBackend
+from services.openai_client import OpenAIResponsesClient
+from services.tracing import InMemorySpanExporter, Tracer, tracer
+
+
+def test_spans_nest_across_tasks_and_inherit_session_attributes():
+    async def scenario():
+        local_tracer = Tracer(InMemorySpanExporter())
+
+        async def agent_call(agent_id: str):
+            with local_tracer.span("agent.call", agent_id=agent_id):
+                await asyncio.sleep(0)
+
+        with local_tracer.span("discussion", session_id="s1") as root:
+            with local_tracer.span("phase", phase="opinions"):
+                await asyncio.gather(agent_call("a"), agent_call("b"))
+        await local_tracer.flush()
+        return root, list(local_tracer.exporter.spans)
+
+    root, spans = asyncio.run(scenario())
+
+    by_name = {}
+    for span in spans:
+        by_name.setdefault(span.name, []).append(span)
+    phase = by_name["phase"][0]
+    calls = by_name["agent.call"]
+    assert len(spans) == 4
+    assert {span.trace_id for span in spans} == {root.trace_id}
+    assert root.parent_span_id is None
+    assert phase.parent_span_id == root.span_id
+    assert all(call.parent_span_id == phase.span_id for call in calls)
+    assert {call.attributes["agent_id"] for call in calls} == {"a", "b"}
+    assert all(call.attributes["session_id"] == "s1" and call.attributes["phase"] == "opinions" for call in calls)
+    assert all(span.duration >= 0 for span in spans)
+
+
+def test_failed_span_records_the_error():
+    local_tracer = Tracer()
+
+    with pytest.raises(ValueError):
+        with local_tracer.span("llm.call") as span:
+            raise ValueError("bad request")
+
+    assert span.status == "error"
+    assert span.error == "ValueError: bad request"
+    assert span.end_time_ns is not None
+
+
+def test_llm_calls_are_traced_under_the_current_span(monkeypatch):
+    exporter = InMemorySpanExporter()
+    monkeypatch.setattr(tracer, "exporter", exporter)
+
+    async def scenario():
+        backend = MockLLMBackend(latency_ms=0, jitter_ms=0, latency_distribution="fixed")
+        manager = AgentManager(OpenAIResponsesClient(api_key="test", backend=backend))
+        agent = manager.create_agent("Alice", "Finance")
+        with tracer.span("discussion", session_id="s1") as root:
+            await manager.generate_independent_opinion(agent, "Question", "Pick an option")
+        await tracer.flush()
+        return root
+
+    root = asyncio.run(scenario())
+
+    llm_calls = [span for span in exporter.get_spans(session_id="s1") if span.name == "llm.call"]
+    assert llm_calls
+    assert all(span.trace_id == root.trace_id for span in llm_calls)
+    assert all(span.attributes["output_length"] > 0 for span in llm_calls)
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("call_seconds", "Call latency", label_names=("kind",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, kind="llm")
+    registry.counter("calls_total", "Calls").inc(3)
+
+    lines = registry.render().splitlines()
+
+    assert 'call_seconds_bucket{kind="llm",le="0.1"} 1' in lines
+    assert 'call_seconds_bucket{kind="llm",le="1"} 2' in lines
+    assert 'call_seconds_bucket{kind="llm",le="+Inf"} 3' in lines
+    assert 'call_seconds_sum{kind="llm"} 5.55' in lines
+    assert "calls_total 3" in lines
+    with pytest.raises(ValueError):
+        histogram.observe(1.0, model="gpt")
@@ -0,0 +1,117 @@
+"""Token usage and cost accounting"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from config import settings
+from services.client_registry import ClientRegistry
+from services.session_registry import SessionRegistry
+from services.tracing import tracer
+from services.usage_tracker import TokenUsage, UsageTracker, record_usage, track_usage
+
+
+def _response(input_tokens: int, cached_tokens: int, output_tokens: int) -> SimpleNamespace:
+    return SimpleNamespace(usage=SimpleNamespace(
+        input_tokens=input_tokens,
+        input_tokens_details=SimpleNamespace(cached_tokens=cached_tokens),
+        output_tokens=output_tokens,
+    ))
+
+
+def test_cost_prices_cached_input_separately(monkeypatch):
+    monkeypatch.setattr(settings, "llm_input_cost_per_million", 1.0)
+    monkeypatch.setattr(settings, "llm_cached_input_cost_per_million", 0.1)
+    monkeypatch.setattr(settings, "llm_output_cost_per_million", 10.0)
+
+    usage = TokenUsage.from_response(_response(1_000_000, 400_000, 100_000))
+
+    assert usage.total_tokens == 1_100_000
+    assert usage.cached_input_ratio == pytest.approx(0.4)
+    assert usage.cost_usd == pytest.approx(0.6 + 0.04 + 1.0)
+    assert TokenUsage.from_response(SimpleNamespace()) is None
+
+
+def test_calls_are_attributed_to_the_current_span():
+    async def scenario():
+        tracker = UsageTracker("s1")
+        with track_usage(tracker):
+            with tracer.span("phase", agenda_index=0, phase="opinions"):
+                with tracer.span("agent", agent_id="alice"):
+                    record_usage(_response(100, 0, 10))
+                with tracer.span("agent", agent_id="bob"):
+                    record_usage(_response(200, 50, 20))
+            record_usage(_response(10, 0, 1))
+        # Outside track_usage nothing is recorded
+        record_usage(_response(1000, 0, 100))
+        return tracker.snapshot()
+
+    snapshot = asyncio.run(scenario())
+
+    assert snapshot["total"]["total_tokens"] == 341
+    assert snapshot["total"]["calls"] == 3
+    assert snapshot["by_agent"]["alice"]["total_tokens"] == 110
+    assert snapshot["by_agent"]["bob"]["cached_input_tokens"] == 50
+    assert snapshot["by_agent"]["unattributed"]["total_tokens"] == 11
+    assert snapshot["by_agenda_item"]["0"]["calls"] == 2
+    assert snapshot["by_phase"]["opinions"]["total_tokens"] == 330
+
+
+def test_updates_are_coalesced_per_interval():
+    async def scenario():
+        updates = []
+
+        async def on_update(snapshot):
+            updates.append(snapshot["total"]["calls"])
+
+        tracker = UsageTracker("s1", on_update=on_update, update_interval=0.05)
+        for _ in range(5):
+            tracker.record(TokenUsage(input_tokens=10, output_tokens=1, calls=1))
+        await asyncio.sleep(0.1)
+        tracker.record(TokenUsage(input_tokens=10, output_tokens=1, calls=1))
+        await tracker.flush()
+        return updates
+
+    assert asyncio.run(scenario()) == [5, 6]
+
+
+def test_restored_tracker_continues_counting():
+    tracker = UsageTracker("s1", token_budget=100)
+    tracker.record(TokenUsage(input_tokens=60, output_tokens=10, calls=1))
+
+    restored = UsageTracker("s1", token_budget=100)
+    restored.restore(tracker.snapshot())
+    assert not restored.budget_exceeded
+    restored.record(TokenUsage(input_tokens=25, output_tokens=5, calls=1))
+
+    assert restored.total.total_tokens == 100
+    assert restored.by_agent["unattributed"].calls == 2
+    assert restored.budget_exceeded
+
+
+def test_token_budget_ends_persuasion_early(mock_settings, monkeypatch):
+    monkeypatch.setattr(settings, "mock_llm_agreement_rate", 0.0)
+    monkeypatch.setattr(settings, "checkpoint_store", "none")
+    # Used up by agenda and agent generation and the opinions
+    monkeypatch.setattr(settings, "session_token_budget", 1)
+
+    async def scenario():
+        clients = ClientRegistry.from_settings()
+        registry = SessionRegistry.from_settings(clients)
+        try:
+            job = await registry.start("Should we expand overseas?")
+            await asyncio.wait_for(job.finished.wait(), timeout=60)
+            return await job.log.read()
+        finally:
+            await registry.shutdown()
+            await clients.aclose()
+
+    events = asyncio.run(scenario())
+
+    messages = [event["data"] for event in events if event["type"] == "message"]
+    assert not any(message["message_type"] == "persuasion" for message in messages)
+    assert any("token budget" in message["content"] for message in messages)
+    usage = [event["data"] for event in events if event["type"] == "usage_update"][-1]
+    assert usage["budget_exceeded"]
+    assert usage["total"]["calls"] > 0
+    assert events[-1]["type"] == "discussion_completed"
@@ -0,0 +1,151 @@
+"""Following discussions over WebSockets: replay on attach and fan-out to subscribers"""
+import asyncio
+import json
+from api import routes
+from api.websocket import TRY_AGAIN_LATER, ConnectionManager, manager
+from config import settings
+from services.client_registry import ClientRegistry
+from services.session_registry import SessionRegistry
+
+
+class FakeWebSocket:
+    """Records what the server sends; the client never sends anything"""
+
+    def __init__(self):
+        self.sent = []
+        self.closed_with = None
+
+    async def send_json(self, data: dict):
+        self.sent.append(data)
+
+    async def send_text(self, text: str):
+        self.sent.append(json.loads(text))
+
+    async def receive_json(self):
+        await asyncio.Event().wait()
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+
+def _registry(clients: ClientRegistry) -> SessionRegistry:
+    registry = SessionRegistry.from_settings(clients)
+    registry.add_listener(lambda job, event: manager.send_message(event, job.id))
+    return registry
+
+
+def test_reconnect_older_than_the_checkpoint_after_a_restart(mock_settings):
+    async def scenario():
+        clients = ClientRegistry.from_settings()
+        registry = _registry(clients)
+        job = await registry.start("Should we expand overseas?")
+        while True:
+            await asyncio.sleep(0.01)
+            checkpoint = await registry.checkpoint_store.load(job.id)
+            if checkpoint and checkpoint["runs"][0]["step"] == "completed":
+                break
+        job.handed_off = True
+        job.task.cancel()
+        await asyncio.gather(job.task, return_exceptions=True)
+        await registry.shutdown()
+
+        # After the restart the events up to the checkpoint exist nowhere
+        registry = _registry(clients)
+        read_events = registry.read_events
+        reads = 0
+
+        async def counted_read_events(*args, **kwargs):
+            nonlocal reads
+            reads += 1
+            assert reads < 1000, "replay loop does not advance"
+            return await read_events(*args, **kwargs)
+
+        registry.read_events = counted_read_events
+        websocket = FakeWebSocket()
+        try:
+            resumed = await registry.resume(job.id)
+            # The client saw a few events of the lost run
+            await asyncio.wait_for(routes._attach(websocket, resumed, registry, last_seq=3), timeout=60)
+        finally:
+            await registry.shutdown()
+            await clients.aclose()
+        return resumed.log.start_seq, websocket.sent
+
+    start_seq, sent = asyncio.run(scenario())
+
+    assert sent[0] == {"type": "events_missed", "data": {"from_seq": 4, "to_seq": start_seq}}
+    assert sent[1]["type"] == "discussion_resumed"
+    seqs = [event["seq"] for event in sent[1:] if event["type"] != "message_delta"]
+    assert seqs == list(range(start_seq + 1, start_seq + 1 + len(seqs)))
+    assert sent[-1]["type"] == "discussion_completed"
+
+
+def test_reconnect_replays_every_message_of_a_streamed_discussion(mock_settings, monkeypatch):
+    monkeypatch.setattr(settings, "enable_streaming", True)
+    monkeypatch.setattr(settings, "checkpoint_store", "none")
+    # Room for the recorded events of a discussion, not for its streamed deltas as well
+    monkeypatch.setattr(settings, "event_log_max_events", 150)
+
+    async def scenario():
+        clients = ClientRegistry.from_settings()
+        registry = _registry(clients)
+        live, reconnected = FakeWebSocket(), FakeWebSocket()
+        try:
+            job = await registry.start("Should we expand overseas?")
+            await asyncio.wait_for(routes._attach(live, job, registry), timeout=60)
+            await routes._attach(reconnected, job, registry, last_seq=0)
+        finally:
+            await registry.shutdown()
+            await clients.aclose()
+        return live.sent, reconnected.sent
+
+    live, reconnected = asyncio.run(scenario())
+
+    deltas = [event for event in live if event["type"] == "message_delta"]
+    assert deltas and all("seq" not in event for event in deltas)
+    assert not any(event["type"] in ("message_delta", "events_missed") for event in reconnected)
+    assert [event["data"]["id"] for event in reconnected if event["type"] == "message"] == [
+        event["data"]["id"] for event in live if event["type"] == "message"
+    ]
+    assert {delta["data"]["id"] for delta in deltas} <= {event["data"]["id"] for event in reconnected if event["type"] == "message"}
+
+
+def test_slow_subscriber_is_disconnected_with_try_again_later():
+    class StalledWebSocket(FakeWebSocket):
+        async def send_text(self, text: str):
+            await asyncio.Event().wait()
+
+    async def scenario():
+        manager = ConnectionManager(max_queue=2, slow_consumer_policy="disconnect")
+        websocket = StalledWebSocket()
+        subscriber = manager.subscribe(websocket, "discussion")
+        for seq in range(1, 6):
+            await manager.send_message({"type": "message", "seq": seq}, "discussion")
+            await asyncio.sleep(0)
+        await subscriber.closer
+        manager.disconnect(websocket, "discussion")
+        return subscriber, websocket
+
+    subscriber, websocket = asyncio.run(scenario())
+
+    assert subscriber.closed
+    assert websocket.closed_with == TRY_AGAIN_LATER
+
+
+def test_drop_policy_keeps_the_newest_events():
+    async def scenario():
+        manager = ConnectionManager(max_queue=2, slow_consumer_policy="drop")
+        websocket = FakeWebSocket()
+        subscriber = manager.subscribe(websocket, "discussion")
+        # Nothing is sent until the writer gets to run, so the queue overflows
+        for seq in range(1, 6):
+            await manager.send_message({"type": "message", "seq": seq}, "discussion")
+        await subscriber.drain(timeout=5)
+        manager.disconnect(websocket, "discussion")
+        return subscriber, websocket
+
+    subscriber, websocket = asyncio.run(scenario())
+
+    assert subscriber.dropped == 3
+    assert [event["seq"] for event in websocket.sent] == [4, 5]
+    assert websocket.closed_with is None
@@ -0,0 +1,108 @@
+"""Incremental JSON parsing for streamed LLM output"""
+import json
+import logging
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+
+class JsonArrayStreamParser:
+    """Incrementally extract the objects of a JSON array from a token stream
+
+    Feed text chunks as they arrive; each call returns the objects whose closing
+    brace has been received since the previous call. Text before the first `[`
+    (e.g. a markdown code fence) is ignored, and scanning stops at the matching `]`.
+    An element that cannot be parsed on its own is skipped; once the stream
+    ends, `complete` tells whether every element was returned, and `missing`
+    picks the others from the array parsed as a whole.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._position = 0
+        self._in_array = False
+        self._finished = False
+        self._depth = 0  # Nesting depth inside the array
+        self._in_string = False
+        self._escaped = False
+        self._object_start = -1
+        self._element_index = 0  # Position of the current top-level element
+        self._delivered: List[int] = []  # Positions of the elements returned so far
+        self.skipped = 0
+        self.items: List[dict] = []
+
+    @property
+    def finished(self) -> bool:
+        """Whether the closing bracket of the array has been seen"""
+        return self._finished
+
+    @property
+    def complete(self) -> bool:
+        """Whether the whole array was seen and every object in it returned"""
+        return self._finished and not self.skipped
+
+    def missing(self, elements: list) -> list:
+        """The elements of the complete array (parsed from the full text) that feed did not return"""
+        delivered = set(self._delivered)
+        return [element for index, element in enumerate(elements) if index not in delivered]
+
+    def feed(self, chunk: str) -> List[dict]:
+        """Consume a chunk and return the objects completed by it"""
+        if self._finished:
+            return []
+
+        self._buffer += chunk
+        completed = []
+
+        while self._position < len(self._buffer) and not self._finished:
+            char = self._buffer[self._position]
+
+            if not self._in_array:
+                if char == "[":
+                    self._in_array = True
+            elif self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "," and self._depth == 0:
+                self._element_index += 1
+            elif char in "{[":
+                if self._depth == 0 and char == "{":
+                    self._object_start = self._position
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 0 and char == "]":
+                    self._finished = True
+                else:
+                    self._depth -= 1
+                    if self._depth == 0 and self._object_start != -1:
+                        item = self._parse_object(self._buffer[self._object_start:self._position + 1])
+                        if item is None:
+                            self.skipped += 1
+                        else:
+                            completed.append(item)
+                            self._delivered.append(self._element_index)
+                        self._object_start = -1
+
+            self._position += 1
+
+        # Drop text that can no longer be part of an object
+        if self._object_start == -1:
+            self._buffer = self._buffer[self._position:]
+            self._position = 0
+
+        self.items.extend(completed)
+        return completed
+
+    def _parse_object(self, text: str):
+        """Parse one top-level array element"""
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Skipping unparsable streamed JSON object: {e}")
+            return None
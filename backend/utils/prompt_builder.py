@@ -0,0 +1,22 @@
+"""Prompt assembly ordered for provider-side prompt caching
+
+Providers reuse the computation for the longest prompt prefix they have seen
+recently, which only helps when shared material comes before anything that
+varies. Prompts are therefore assembled from the most widely shared section
+to the most specific one:
+
+1. rules: fixed instructions for the kind of call
+2. context: background knowledge shared by the session
+3. agenda: the agenda item shared by every participant discussing it
+4. history: the agent's own earlier turns (local conversation state only),
+   which only grows between calls
+5. request: who is speaking and the per-call material (opinions, arguments)
+"""
+
+SECTION_SEPARATOR = "\n\n"
+
+
+def build_prompt(rules: str, request: str, context: str = "", agenda: str = "", history: str = "") -> str:
+    """Join prompt sections, most stable first (empty sections are skipped)"""
+    sections = (rules, context, agenda, history, request)
+    return SECTION_SEPARATOR.join(section.strip() for section in sections if section and section.strip())
@@ -1,8 +1,12 @@
-"""Prompt Templates"""
+"""Prompt Templates
 
-FACILITATOR_CREATE_AGENDA = """You are an experienced facilitator. Please create an agenda of specific questions to reach the goal for the following topic.
+Each prompt is split into `*_RULES`, fixed for every call of its kind, and a
+request template holding the per-call values. `utils.prompt_builder` places
+the rules first and the request last, with any shared background context and
+agenda in between, so calls share the longest possible prompt prefix.
+"""
 
-Topic: {topic}
+FACILITATOR_CREATE_AGENDA_RULES = """You are an experienced facilitator. Please create an agenda of specific questions to reach the goal for the topic given at the end.
 
 **Important Constraints**:
 - The agenda must NOT include any content about "how to discuss" or "how to proceed" with the discussion. The agenda should solicit opinions. It is the facilitator's responsibility to manage the process, not something to ask participants about.
@@ -16,15 +20,16 @@ Agenda Creation Guidelines:
 4. Design the sequence of questions logically so that the final goal can be reached
 5. Include an explanation for each question that clarifies what participants should answer
 6. The final topic should be one that produces the ultimate answer to the main topic of this meeting
+7. If background knowledge is provided, take it into consideration
 
 Output Format (JSON):
-[{{"title": "Title in the form of a specific question", "description": "The specific content participants should address in their answers to this question", "order": 1, "conclusion": "The final answer to this question"}}, ...]
+[{"title": "Title in the form of a specific question", "description": "The specific content participants should address in their answers to this question", "order": 1, "conclusion": "The final answer to this question"}, ...]
 
 Please output in JSON format."""
 
-FACILITATOR_GENERATE_AGENTS = """You are an experienced facilitator. Please generate 4-6 appropriate participants to conduct a multi-faceted and thorough discussion on the following topic.
+FACILITATOR_CREATE_AGENDA = """Topic: {topic}"""
 
-Topic: {topic}
+FACILITATOR_GENERATE_AGENTS_RULES = """You are an experienced facilitator. Please generate 4-6 appropriate participants to conduct a multi-faceted and thorough discussion on the topic given at the end.
 
 **Participant Roles**:
 - Each participant provides specific answers and opinions to the presented questions from their own perspective
@@ -38,65 +43,102 @@ Participant Generation Guidelines:
 4. Select individuals who can provide practical and logical opinions
 
 Output Format (JSON):
-[{{"name": "Participant's name", "perspective": "Participant's specific perspective, expertise, and position"}}, ...]
+[{"name": "Participant's name", "perspective": "Participant's specific perspective, expertise, and position"}, ...]
 
 Please output in JSON format."""
 
-AGENT_INDEPENDENT_OPINION = """You are participating in this discussion as {name} with the following perspective:
-{perspective}
+FACILITATOR_GENERATE_AGENTS = """Topic: {topic}"""
 
-{background_context}
+# Sent with stateless calls, which do not continue the agenda creation response
+FACILITATOR_AGENDA = """Agenda:
+{agenda}"""
 
-Current agenda (question): {agenda_title}
-{agenda_description}
+AGENT_INDEPENDENT_OPINION_RULES = """You are a participant in a discussion. Answer the current agenda question from your own perspective.
 
 **Important Constraints**:
 - Do NOT discuss the "process of discussion" or "how to proceed" at all
 - The facilitator manages the meeting process
 - You should only state specific answers and opinions regarding the agenda topic
 - Provide concrete and actionable answers, not abstract proposals
-- If background knowledge is provided above, refer to it to give more accurate opinions
+- If background knowledge is provided, refer to it to give more accurate opinions
 
-Please state your specific answer to this topic from your perspective:
+Answer in this format:
 
 Conclusion: [Your specific answer to this question]
 Rationale: [Logical reasons supporting your answer]
 
 Please speak briefly and concisely, focusing on key points."""
 
-AGENT_VOTE = """You are {name}.
+AGENDA_ITEM = """Current agenda (question): {agenda_title}
+{agenda_description}"""
+
+AGENT_INDEPENDENT_OPINION = """You are participating in this discussion as {name} with the following perspective:
+{perspective}
+
+Please state your specific answer to this topic from your perspective."""
 
-The following opinions have been presented:
+AGENT_VOTE_RULES = """Several opinions have been presented. Please think logically and select the one opinion you believe is the best.
+Answer with the ID of the selected opinion (opinion_id) and a brief reason (reason)."""
+
+AGENT_VOTE = """The following opinions have been presented:
 {opinions}
 
-Please think logically and select the one opinion you believe is the best.
-Respond only with the ID of the selected opinion. Example: opinion_001"""
+You are {name}."""
+
+AGENT_PERSUASION_RULES = """Please explain to other participants why the opinion you supported is logically the best.
+Provide a brief, concise, and compelling persuasive argument."""
 
 AGENT_PERSUASION = """You are {name}.
 
-The opinion you supported: {your_opinion}
+The opinion you supported: {your_opinion}"""
 
-Please explain to other participants why this opinion is logically the best.
-Provide a brief, concise, and compelling persuasive argument."""
+AGENT_RESPOND_TO_PERSUASION_RULES = """Another participant has tried to persuade you. Please state your thoughts regarding this persuasion.
+Indicate whether you can agree or wish to counter-argue, and if you agree, state your reasons; if you counter-argue, state your reasons for persuading the other party.
+
+Answer with your decision (decision: "agree" or "counter_argue") and a brief reason (reason)."""
 
 AGENT_RESPOND_TO_PERSUASION = """You are {name}.
 
 The opinion you supported: {your_opinion}
 The opinion other participants supported: {other_opinions}
-The following persuasion was presented: {persuasion_message}
+The following persuasion was presented: {persuasion_message}"""
 
-Please state your thoughts regarding this persuasion.
-Indicate whether you can agree or wish to counter-argue, and if you agree, state your reasons; if you counter-argue, state your reasons for persuading the other party.
+AGENT_RESPOND_TO_COUNTER_ARGUMENT_RULES = """Another participant has made a counter-argument to your opinion. Please state your thoughts on this counter-argument.
+Indicate whether you will continue to support your original opinion or agree with the counter-argument, and state your reasons.
+
+Answer with your decision (decision: "support_original" or "agree_with_counter_argument") and a brief reason (reason)."""
+
+AGENT_RESPOND_TO_COUNTER_ARGUMENT = """You are {name}.
+
+Your original opinion: {original_opinion}
+
+The following counter-argument was made: {counter_argument}"""
 
-Output Format:
-Decision: [Agree/Counter-argue]
-Reason: [Please briefly state your thoughts]"""
+AGENT_FINAL_DECISION_RULES = """An opinion has been proposed as the conclusion. Do you agree with this opinion?
+
+Answer whether you agree (agrees: true or false) and a brief reason (reason)."""
 
 AGENT_FINAL_DECISION = """You are {name}.
 
-Proposed opinion: {proposed_opinion}
+Proposed opinion: {proposed_opinion}"""
+
+# Local conversation state: what an agent remembers, sent before each request
+AGENT_HISTORY = """Your role in this discussion: {name}, with the following perspective:
+{perspective}"""
+
+AGENT_HISTORY_NOTES = """Notes on your earlier turns:
+{notes}"""
+
+AGENT_HISTORY_TURN = """[You were asked]
+{prompt}
+[You answered]
+{response}"""
+
+# Context compaction: condenses an agent's history into the notes that replace it
+AGENT_SUMMARIZE_RULES = """You are condensing your own record of an ongoing discussion into notes you will rely on instead of the full record.
+Keep the positions you took, which opinions you supported or opposed and why, what you agreed to, and the disagreements still open.
+Leave out anything else.
 
-Do you agree with this opinion?
+Answer with plain, brief notes of at most {max_chars} characters."""
 
-Decision: Yes/No
-Reason: [Briefly state your reason]"""
+AGENT_SUMMARIZE = """Write your notes now."""
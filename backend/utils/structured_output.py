@@ -0,0 +1,77 @@
+"""JSON-schema structured outputs for the Responses API"""
+import copy
+from typing import Any, Dict, List, Optional, Type, TypeVar
+from pydantic import BaseModel, ValidationError
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def _inline_refs(node: Any, definitions: Dict[str, Any]) -> Any:
+    """Replace $ref pointers with the referenced definitions"""
+    if isinstance(node, dict):
+        if "$ref" in node:
+            resolved = copy.deepcopy(definitions[node["$ref"].split("/")[-1]])
+            siblings = {key: value for key, value in node.items() if key != "$ref"}
+            return _inline_refs({**resolved, **siblings}, definitions)
+        return {key: _inline_refs(value, definitions) for key, value in node.items() if key != "$defs"}
+    if isinstance(node, list):
+        return [_inline_refs(value, definitions) for value in node]
+    return node
+
+
+def _strict(node: Any) -> Any:
+    """Apply strict-mode requirements: every property required, no additional properties, no titles"""
+    if isinstance(node, dict):
+        properties = node.get("properties")
+        node = {key: _strict(value) for key, value in node.items() if key not in ("title", "properties")}
+        if properties is not None:
+            node["properties"] = {key: _strict(value) for key, value in properties.items()}
+        if node.get("type") == "object":
+            node["additionalProperties"] = False
+            node["required"] = list(node.get("properties", {}))
+        return node
+    if isinstance(node, list):
+        return [_strict(value) for value in node]
+    return node
+
+
+def json_schema_format(
+    model: Type[BaseModel],
+    name: str,
+    enums: Optional[Dict[str, List[str]]] = None,
+) -> dict:
+    """Build a Responses API `text.format` for a pydantic model
+
+    Args:
+        model: Response model
+        name: Schema name
+        enums: Property name -> allowed values (e.g. the opinion IDs a vote may name)
+    """
+    schema = model.model_json_schema()
+    schema = _strict(_inline_refs(schema, schema.get("$defs", {})))
+    for property_name, values in (enums or {}).items():
+        schema["properties"][property_name]["enum"] = values
+
+    return {
+        "type": "json_schema",
+        "name": name,
+        "schema": schema,
+        "strict": True,
+    }
+
+
+def parse_structured(content: str, model: Type[ModelT]) -> Optional[ModelT]:
+    """Validate a structured output, tolerating text around the JSON object (None if invalid)"""
+    try:
+        return model.model_validate_json(content)
+    except ValidationError:
+        pass
+
+    start = content.find("{")
+    end = content.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        return model.model_validate_json(content[start:end + 1])
+    except ValidationError:
+        return None
@@ -9,6 +9,7 @@ import { AgendaItem } from '@/types/discussion';
 interface WebSocketMessage {
   type: string;
   data: any;
+  seq?: number;
 }
 
 interface VoteDetail {
@@ -25,6 +26,26 @@ interface OpinionDetail {
   votes: number;
 }
 
+interface TokenUsage {
+  input_tokens: number;
+  cached_input_tokens: number;
+  cached_input_ratio: number;
+  output_tokens: number;
+  total_tokens: number;
+  calls: number;
+  cost_usd: number;
+}
+
+export interface UsageSummary {
+  session_id: string;
+  total: TokenUsage;
+  token_budget: number | null;
+  budget_exceeded: boolean;
+  by_agent: Record<string, TokenUsage>;
+  by_agenda_item: Record<string, TokenUsage>;
+  by_phase: Record<string, TokenUsage>;
+}
+
 interface VotingResult {
   votes: Record<string, number>;
   vote_details: VoteDetail[];
@@ -44,6 +65,7 @@ export interface DiscussionState {
   votingResult: VotingResult | null;
   finalConclusion: string | null;
   agendaStreaming: string | null;
+  usage: UsageSummary | null;
   error: string | null;
 }
 
@@ -60,17 +82,24 @@ export function useWebSocket(url: string) {
     votingResult: null,
     finalConclusion: null,
     agendaStreaming: null,
+    usage: null,
     error: null,
   });
 
   const wsRef = useRef<WebSocket | null>(null);
+  // 再接続時に続きから受信するための状態
+  const discussionIdRef = useRef<string | null>(null);
+  const lastSeqRef = useRef(0);
+  const finishedRef = useRef(false);
+  const closingRef = useRef(false);
 
-  const connect = useCallback(() => {
+  const connect = useCallback((resumeUrl?: string) => {
     if (wsRef.current?.readyState === WebSocket.OPEN) {
       return;
     }
 
-    const ws = new WebSocket(url);
+    closingRef.current = false;
+    const ws = new WebSocket(resumeUrl ?? url);
 
     ws.onopen = () => {
       console.log('WebSocket接続成功');
@@ -80,6 +109,13 @@ export function useWebSocket(url: string) {
     ws.onmessage = (event) => {
       try {
         const message: WebSocketMessage = JSON.parse(event.data);
+        if (message.seq !== undefined) {
+          // 再送で重複したイベントは無視 (チェックポイントから再開した実行は、それ以前に受信した番号より小さくても受け入れる)
+          if (message.seq <= lastSeqRef.current && message.type !== 'discussion_resumed') {
+            return;
+          }
+          lastSeqRef.current = message.seq;
+        }
         handleMessage(message);
       } catch (error) {
         console.error('メッセージ解析エラー:', error);
@@ -94,6 +130,14 @@ export function useWebSocket(url: string) {
     ws.onclose = () => {
       console.log('WebSocket切断');
       setState(prev => ({ ...prev, connected: false }));
+
+      // 議論はサーバー側で継続しているため、最後に受信したイベントの続きから再接続
+      const discussionId = discussionIdRef.current;
+      if (!closingRef.current && discussionId && !finishedRef.current) {
+        setTimeout(() => {
+          connect(`${url}/${discussionId}?last_seq=${lastSeqRef.current}`);
+        }, 1000);
+      }
     };
 
     wsRef.current = ws;
@@ -104,6 +148,9 @@ export function useWebSocket(url: string) {
 
     switch (message.type) {
       case 'discussion_started':
+      case 'discussion_resumed':
+        // 再開時はチェックポイント以降のイベントのみ届く
+        discussionIdRef.current = message.data.discussion_id;
         setState(prev => ({
           ...prev,
           discussionId: message.data.discussion_id,
@@ -118,6 +165,26 @@ export function useWebSocket(url: string) {
         }));
         break;
 
+      case 'agenda_item_created':
+        // アジェンダ項目を生成され次第追加
+        setState(prev => ({
+          ...prev,
+          agenda: prev.agenda.some(item => item.id === message.data.agenda_item.id)
+            ? prev.agenda
+            : [...prev.agenda, message.data.agenda_item],
+        }));
+        break;
+
+      case 'agent_created':
+        // 参加者を生成され次第追加
+        setState(prev => ({
+          ...prev,
+          agents: prev.agents.some(agent => agent.id === message.data.agent.id)
+            ? prev.agents
+            : [...prev.agents, message.data.agent],
+        }));
+        break;
+
       case 'agenda_created':
         setState(prev => ({
           ...prev,
@@ -162,6 +229,38 @@ export function useWebSocket(url: string) {
         });
         break;
 
+      case 'message_delta':
+        // ストリーミング中のメッセージに差分を追記（完了時は同じIDの'message'で置き換え）
+        setState(prev => {
+          const existingIndex = prev.messages.findIndex(m => m.id === message.data.id);
+          if (existingIndex !== -1) {
+            const updatedMessages = [...prev.messages];
+            updatedMessages[existingIndex] = {
+              ...updatedMessages[existingIndex],
+              content: updatedMessages[existingIndex].content + message.data.delta,
+            };
+            return {
+              ...prev,
+              messages: updatedMessages,
+            };
+          }
+          return {
+            ...prev,
+            messages: [
+              ...prev.messages,
+              {
+                id: message.data.id,
+                agent_id: message.data.agent_id,
+                agent_name: message.data.agent_name,
+                content: message.data.delta,
+                message_type: message.data.message_type,
+                timestamp: new Date().toISOString(),
+              },
+            ],
+          };
+        });
+        break;
+
       case 'voting_result':
         setState(prev => ({
           ...prev,
@@ -173,14 +272,34 @@ export function useWebSocket(url: string) {
         // アジェンダ完了の処理
         break;
 
+      case 'usage_update':
+        // トークン使用量（セッション・エージェント・アジェンダ・フェーズ別）
+        setState(prev => ({
+          ...prev,
+          usage: message.data,
+        }));
+        break;
+
       case 'discussion_completed':
+        finishedRef.current = true;
         setState(prev => ({
           ...prev,
           finalConclusion: message.data.final_conclusion,
+          usage: message.data.usage ?? prev.usage,
         }));
         break;
 
+      case 'discussion_cancelled':
+        finishedRef.current = true;
+        break;
+
+      case 'events_missed':
+        // サーバーが保持していない範囲は再送されない
+        console.warn('取得できなかったイベント:', message.data.from_seq, '-', message.data.to_seq);
+        break;
+
       case 'error':
+        finishedRef.current = true;
         setState(prev => ({
           ...prev,
           error: message.data.message,
@@ -198,6 +317,9 @@ export function useWebSocket(url: string) {
       return;
     }
 
+    discussionIdRef.current = null;
+    lastSeqRef.current = 0;
+    finishedRef.current = false;
     wsRef.current.send(JSON.stringify({
       type: 'start_discussion',
       data: { topic },
@@ -206,6 +328,7 @@ export function useWebSocket(url: string) {
 
   const disconnect = useCallback(() => {
     if (wsRef.current) {
+      closingRef.current = true;
       wsRef.current.close();
       wsRef.current = null;
     }
@@ -18,6 +18,7 @@ export interface Message {
   content: string;
   message_type: MessageType;
   timestamp: string;
+  agenda_index?: number | null;
 }
 
 export interface Opinion {